@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Cat OS 1.X - Audio synthesis benchmark
+By Team Flames / Samsoft
+
+Times the procedural audio engine headlessly (dummy SDL video and audio
+drivers, no window, nothing played) across durations and sample rates,
+then writes the results as JSON so runs from different commits can be
+diffed:
+
+    python bench_audio.py --output before.json
+    python bench_audio.py --compare before.json
+"""
+
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from bench_common import compare, git_commit, load_cat_os
+
+SAMPLE_RATES = (22050, 44100, 48000)
+DURATIONS = (0.05, 0.5, 3.5)
+
+def measure(func, repeat):
+    """Median/min wall time over `repeat` runs, then peak traced memory"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), min(times), peak
+
+def cases(cat):
+    """(name, sample_rate, duration, samples, callable) for every benchmark"""
+    for rate in SAMPLE_RATES:
+        for duration in DURATIONS:
+            samples = int(rate * duration)
+            wave = cat.generate_sine_wave(440.0, duration, 0.3, rate)
+            yield ('generate_sine_wave', rate, duration, samples,
+                   lambda d=duration, r=rate: cat.generate_sine_wave(440.0, d, 0.3, r))
+            yield ('generate_envelope', rate, duration, samples,
+                   lambda w=wave: cat.generate_envelope(w, 0.1, 0.2, 0.5, 0.3))
+            yield ('mix_waves', rate, duration, samples * 4,
+                   lambda w=wave: cat.mix_waves(w, w, w, w))
+
+        chime = dict(cat.VISTA_CHIME, sample_rate=rate)
+        length = max(start + frames for start, frames, _, _, _ in cat.chime_voices(chime))
+        yield ('generate_vista_chime', rate, length / rate, length,
+               lambda p=chime: cat.generate_vista_chime(p))
+
+        if hasattr(cat, 'generate_click_sound'):
+            click = dict(cat.CLICK_SOUND, sample_rate=rate)
+            duration = click['tone'][1]
+            yield ('generate_click_sound', rate, duration, int(rate * duration),
+                   lambda p=click: cat.generate_click_sound(p))
+
+def run(args):
+    cat = load_cat_os(args.target)
+    cat.pygame.display.quit()  # Synthesis doesn't need a window either
+    if args.no_numpy:
+        cat.NUMPY_AVAILABLE = False
+
+    results = []
+    for name, rate, duration, samples, func in cases(cat):
+        if args.only and name not in args.only:
+            continue
+        median, best, peak = measure(func, args.repeat)
+        results.append({
+            'name': name,
+            'sample_rate': rate,
+            'duration': round(duration, 4),
+            'samples': samples,
+            'wall_s': median,
+            'wall_s_min': best,
+            'samples_per_s': samples / median if median else None,
+            'peak_bytes': peak,
+        })
+        print(f"{name:22} {rate:6d} Hz {duration:6.2f} s  {median * 1000:9.2f} ms  "
+              f"{samples / median / 1e6:8.2f} Msamples/s  {peak / 1024:9.0f} KiB")
+
+    return {
+        'target': args.target,
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'numpy': cat.np.__version__ if cat.NUMPY_AVAILABLE else None,
+        'repeat': args.repeat,
+        'results': results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Cat OS audio synthesis')
+    parser.add_argument('--target', default='ntv0.a.py', help='Cat OS script to benchmark')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per case')
+    parser.add_argument('--only', nargs='+', help='benchmark only these functions')
+    parser.add_argument('--no-numpy', action='store_true', help='force the pure-Python path')
+    parser.add_argument('--output', default='bench_audio.json', help='where to write JSON results')
+    parser.add_argument('--compare', metavar='JSON', help='baseline results to diff against')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='slowdown counted as a regression (default 0.10 = 10%%)')
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("  CAT OS 1.X - Audio Synthesis Benchmark")
+    print("=" * 50)
+    report = run(args)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold,
+                   key=lambda r: (r['name'], r['sample_rate'], r['duration']),
+                   label=lambda r: f"{r['name']:22} {r['sample_rate']:6d} Hz {r['duration']:6.2f} s",
+                   metrics=(('', 'wall_s'),)):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
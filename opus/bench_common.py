@@ -0,0 +1,58 @@
+"""
+Cat OS 1.X - Shared helpers for the benchmark and smoke-run tools
+By Team Flames / Samsoft
+
+bench_audio.py, bench_render.py and smoke_run.py all import the Cat OS
+scripts by path, and the benchmarks stamp their JSON reports with the
+current commit and diff them against a baseline the same way.
+"""
+
+import importlib.util
+import os
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def load_cat_os(filename):
+    """Import a Cat OS script by path (ntv0.a.py isn't a valid module name)"""
+    path = os.path.join(HERE, filename)
+    spec = importlib.util.spec_from_file_location('catos_bench', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    # The tools never play anything: no open audio device, no chime render
+    # thread competing for the GIL, no sounds
+    module.pygame.mixer.quit()
+    module.AUDIO_AVAILABLE = False
+    return module
+
+def git_commit():
+    """Short hash of the checked-out commit, or None outside a git checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(report, baseline, threshold, key, label, metrics):
+    """Print per-result ratios against a baseline; return regressions.
+
+    Results are matched on key(result) and printed as label(result), one
+    `title x ratio` column per (title, field) in metrics. The first metric
+    decides regressions: a ratio above 1 + threshold counts as one.
+    """
+    old = {key(r): r for r in baseline['results']}
+    regressions = 0
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} "
+          f"(regression threshold {threshold:.0%}):")
+    for result in report['results']:
+        before = old.get(key(result))
+        if not before:
+            continue
+        ratios = [result[field] / before[field] for _, field in metrics]
+        flag = ''
+        if ratios[0] > 1 + threshold:
+            flag = '  <-- REGRESSION'
+            regressions += 1
+        columns = '  '.join(f"{title}x{ratio:6.2f}" for (title, _), ratio in zip(metrics, ratios))
+        print(f"{label(result)}  {columns}{flag}")
+    return regressions
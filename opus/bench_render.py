@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Cat OS 1.X - Desktop rendering benchmark
+By Team Flames / Samsoft
+
+Drives the real CatOS.run() loop headlessly (dummy SDL video and audio
+drivers) through scripted scenarios: boot, opening windows, dragging (solid
+and outline), typing into the terminal and notepad, calculator bursts. Input
+is fed one frame at a time on a virtual 60 fps clock, so every run sees
+exactly the same frames.
+A session recorded with CATOS_RECORD=path can be added as a scenario with
+--replay path. Reports frames per second, a frame-time histogram and
+allocations per frame, then writes the results as JSON so runs from
+different commits can be diffed:
+
+    python bench_render.py --output before.json
+    python bench_render.py --compare before.json
+"""
+
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import argparse
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from bench_common import compare, git_commit, load_cat_os
+
+FRAME_DT = 1 / 60  # Virtual seconds per frame
+VIRTUAL_START = 1_000_000.0  # CLOCK reading scripted scenarios start at
+HISTOGRAM_MS = (0.25, 0.5, 1, 2, 4, 8, 16.7, 33.3)  # Bucket upper bounds
+APPS = (('Terminal', 'terminal'), ('Notepad', 'notepad'), ('Calculator', 'calculator'),
+        ('Cat Facts', 'catfacts'), ('Settings', 'settings'), ('Documents', 'default'))
+
+class BenchPacer:
+    """Replaces CatOS.pacer: feeds scripted input and times each frame.
+
+    The script yields either a list of events per frame, played FRAME_DT
+    apart, or recorded (clock, mouse_pos, events) frames. The next frame is
+    pulled at the end of the previous one so none of that is timed.
+    """
+    def __init__(self, module, script, trace=False, start=VIRTUAL_START):
+        self.module = module
+        self.script = script
+        self.trace = trace
+        self.start_time = start
+        self.now = start
+        self.pos = (400, 300)
+        self.mouse_pos = self.pos
+        self.events = []
+        self.frame_times = []
+        self.alloc_bytes = []  # Peak traced memory above the frame's start
+        self.retained_bytes = []  # Traced memory left behind by the frame
+        self.frame_start = None
+        self.mem_start = 0
+        self.next_frame()
+
+    def start(self):
+        self.module.CLOCK.now = self.start_time
+        return self.start_time
+
+    def get_events(self):
+        self.module.pygame.event.get()  # Drop anything SDL queued itself
+        self.module.CLOCK.now = self.now
+        self.mouse_pos = self.pos
+        events, self.events = self.events, []
+        return events
+
+    def close(self):
+        pass
+
+    def wait(self, active, wake_at=None):
+        now = time.perf_counter()
+        self.frame_times.append(now - self.frame_start)
+        if self.trace:
+            current, peak = tracemalloc.get_traced_memory()
+            self.alloc_bytes.append(peak - self.mem_start)
+            self.retained_bytes.append(current - self.mem_start)
+        self.now += FRAME_DT
+        self.next_frame()
+
+    def next_frame(self):
+        pygame = self.module.pygame
+        try:
+            frame = next(self.script)
+        except StopIteration:
+            frame = [pygame.event.Event(pygame.QUIT)]
+        if isinstance(frame, tuple):
+            self.now, self.pos, self.events = frame
+        else:
+            self.events = frame
+            for event in frame:
+                if hasattr(event, 'pos'):
+                    self.pos = event.pos
+        if self.trace:
+            tracemalloc.reset_peak()
+            self.mem_start = tracemalloc.get_traced_memory()[0]
+        self.frame_start = time.perf_counter()
+
+# ============== SCENARIOS ==============
+# Each scenario is a generator yielding one list of pygame events per frame.
+# It may also call into `cat` directly (open_app) between frames.
+
+def click(pygame, pos):
+    return pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=pos, button=1)
+
+def release(pygame, pos):
+    return pygame.event.Event(pygame.MOUSEBUTTONUP, pos=pos, button=1)
+
+def motion(pygame, pos):
+    return pygame.event.Event(pygame.MOUSEMOTION, pos=pos, rel=(0, 0), buttons=(1, 0, 0))
+
+def key(pygame, char):
+    if char == '\n':
+        return pygame.event.Event(pygame.KEYDOWN, key=pygame.K_RETURN, unicode='\r', mod=0)
+    return pygame.event.Event(pygame.KEYDOWN, key=ord(char.lower()), unicode=char, mod=0)
+
+def idle(frames):
+    for _ in range(frames):
+        yield []
+
+def open_window(cat, index):
+    """Open the index-th app the way the script supports (open_app or an icon)"""
+    if hasattr(cat, 'open_app'):
+        cat.open_app(*APPS[index % len(APPS)])
+    else:
+        cat.open_icon(cat.icons[index % len(cat.icons)])
+    return cat.windows[-1]
+
+def scenario_boot(cat, pygame, args):
+    cat.state = 'boot'
+    while cat.state == 'boot':
+        yield []
+    yield from idle(30)
+
+def scenario_open_windows(cat, pygame, args):
+    for i in range(args.windows):
+        open_window(cat, i)
+        yield from idle(5)
+    yield from idle(30)
+
+def scenario_drag(cat, pygame, args):
+    win = open_window(cat, 1)
+    yield []
+    x, y = win.rect.x + 60, win.rect.y + 10
+    yield [click(pygame, (x, y))]
+    for i in range(180):
+        angle = i / 180 * 2 * math.pi
+        yield [motion(pygame, (int(x + 150 * math.sin(angle)), int(y + 100 - 100 * math.cos(angle))))]
+    yield [release(pygame, (x, y))]
+
+def scenario_drag_outline(cat, pygame, args):
+    cat.drag_outline = True
+    yield from scenario_drag(cat, pygame, args)
+
+def scenario_typing(app, text):
+    def scenario(cat, pygame, args):
+        open_window(cat, [a for _, a in APPS].index(app))
+        yield []
+        for _ in range(args.repeat_text):
+            for char in text:
+                yield [key(pygame, char)]
+    return scenario
+
+def scenario_calculator(cat, pygame, args):
+    win = open_window(cat, 2)
+    yield []
+    labels = ['789/', '456*', '123-', 'C0=+']
+    centers = {}
+    for row_i, row in enumerate(labels):
+        for col_i, label in enumerate(row):
+            centers[label] = (win.rect.x + 19 + col_i * 45 + 20, win.rect.y + 74 + row_i * 35 + 15)
+    for _ in range(args.repeat_text):
+        for label in '12+34=*5=C987-65=/3=C':
+            yield [click(pygame, centers[label])]
+        yield from idle(10)
+
+def has_windows(module):
+    return hasattr(module, 'Window')
+
+def has_drag_outline(module):
+    return hasattr(module, 'DragOutline')
+
+SCENARIOS = {
+    # name: (scenario, supported by this script?)
+    'boot': (scenario_boot, lambda module: True),
+    'open_windows': (scenario_open_windows, lambda module: True),
+    'drag': (scenario_drag, has_windows),
+    'drag_outline': (scenario_drag_outline, has_drag_outline),
+    'terminal_typing': (scenario_typing('terminal', 'dir\nhelp\nmeow\ncat\nver\n'), has_windows),
+    'notepad_typing': (scenario_typing('notepad', 'the quick brown fox\njumps over the lazy cat\n'), has_windows),
+    'calculator': (scenario_calculator, has_windows),
+}
+
+# ============== RUNNER ==============
+
+def run_scenario(args, name, trace=False):
+    """Play one scenario on a freshly imported Cat OS; return its BenchPacer"""
+    module = load_cat_os(args.target)
+    cat = module.CatOS()
+    if name not in ('boot', 'replay'):
+        cat.state = 'desktop'
+        cat.chime_played = True
+        module.DAMAGE.add()
+    if args.stages:
+        # Record every frame's stages, but don't pay for drawing the overlay
+        module.PROFILER.window = None
+        module.PROFILER.set_enabled(True)
+        cat.draw_profile_overlay = lambda: module.pygame.Rect(0, 0, 0, 0)
+
+    if name == 'replay':
+        # Recorded sessions start at boot and carry their own clock
+        replay = module.InputReplay(args.replay)
+        pacer = BenchPacer(module, iter(replay.frames), trace, replay.start)
+    else:
+        scenario = SCENARIOS[name][0]
+        pacer = BenchPacer(module, scenario(cat, module.pygame, args), trace)
+    cat.pacer = pacer
+    if trace:
+        tracemalloc.start()
+    try:
+        cat.run()
+    finally:
+        if trace:
+            tracemalloc.stop()
+    profiler = module.PROFILER
+    pacer.stages = [(stage,) + profiler.percentiles(stage) for stage in profiler.samples] if args.stages else []
+    return pacer
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+def histogram(frame_ms):
+    counts = [0] * (len(HISTOGRAM_MS) + 1)
+    for ms in frame_ms:
+        counts[next((i for i, edge in enumerate(HISTOGRAM_MS) if ms <= edge), len(HISTOGRAM_MS))] += 1
+    labels = [f"<={edge}" for edge in HISTOGRAM_MS] + [f">{HISTOGRAM_MS[-1]}"]
+    return dict(zip(labels, counts))
+
+def run(args):
+    probe = load_cat_os(args.target)
+    scenarios = {name: supported for name, (_, supported) in SCENARIOS.items()}
+    if args.replay:
+        scenarios['replay'] = lambda module: hasattr(module, 'InputReplay')
+    results = []
+    for name, supported in scenarios.items():
+        if args.only and name not in args.only:
+            continue
+        if not supported(probe):
+            print(f"{name:16} skipped (not supported by {args.target})")
+            continue
+
+        # Report the run with the median total time, then trace allocations
+        runs = sorted((run_scenario(args, name) for _ in range(args.repeat)),
+                      key=lambda r: sum(r.frame_times))
+        median_run = runs[len(runs) // 2]
+        frame_ms = [t * 1000 for t in median_run.frame_times]
+        total = sum(median_run.frame_times)
+        traced = run_scenario(args, name, trace=True)
+
+        result = {
+            'name': name,
+            'frames': len(frame_ms),
+            'fps': len(frame_ms) / total if total else None,
+            'frame_ms_mean': statistics.fmean(frame_ms),
+            'frame_ms_p50': percentile(frame_ms, 50),
+            'frame_ms_p95': percentile(frame_ms, 95),
+            'frame_ms_p99': percentile(frame_ms, 99),
+            'frame_ms_max': max(frame_ms),
+            'histogram_ms': histogram(frame_ms),
+            'alloc_bytes_per_frame': statistics.median(traced.alloc_bytes),
+            'alloc_bytes_max': max(traced.alloc_bytes),
+            'retained_bytes': sum(traced.retained_bytes),
+        }
+        if args.stages:
+            result['stages_ms'] = {stage: {'p50': p50, 'p95': p95, 'p99': p99}
+                                   for stage, p50, p95, p99 in median_run.stages}
+        results.append(result)
+        print(f"{name:16} {result['frames']:5d} frames  {result['fps']:8.0f} fps  "
+              f"p50 {result['frame_ms_p50']:6.2f}  p95 {result['frame_ms_p95']:6.2f}  "
+              f"p99 {result['frame_ms_p99']:6.2f} ms  {result['alloc_bytes_per_frame'] / 1024:7.1f} KiB/frame")
+
+    return {
+        'target': args.target,
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'pygame': probe.pygame.version.ver,
+        'numpy': probe.np.__version__ if probe.NUMPY_AVAILABLE else None,
+        'repeat': args.repeat,
+        'results': results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Cat OS desktop rendering')
+    parser.add_argument('--target', default='ntv0.a.py', help='Cat OS script to benchmark')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per scenario')
+    parser.add_argument('--only', nargs='+', choices=list(SCENARIOS) + ['replay'],
+                        help='run only these scenarios')
+    parser.add_argument('--replay', metavar='LOG', help='also replay a session recorded with CATOS_RECORD')
+    parser.add_argument('--windows', type=int, default=6, help='windows opened by open_windows')
+    parser.add_argument('--repeat-text', type=int, default=3, help='passes over the typing/calculator scripts')
+    parser.add_argument('--stages', action='store_true', help='also record per-stage timings (frame profiler)')
+    parser.add_argument('--output', default='bench_render.json', help='where to write JSON results')
+    parser.add_argument('--compare', metavar='JSON', help='baseline results to diff against')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='slowdown counted as a regression (default 0.10 = 10%%)')
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("  CAT OS 1.X - Desktop Rendering Benchmark")
+    print("=" * 50)
+    report = run(args)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold,
+                   key=lambda r: r['name'], label=lambda r: f"{r['name']:16}",
+                   metrics=(('p50 ', 'frame_ms_p50'), ('p95 ', 'frame_ms_p95'))):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -9,16 +9,33 @@ import pygame
 import pygame.gfxdraw
 import math
 import random
+import array
+import sys
+import os
+import hashlib
+import json
+import mmap
 import struct
-import io
+import threading
 import time
+import concurrent.futures
+from collections import OrderedDict, deque
 from datetime import datetime
 
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
 # Initialize pygame
 pygame.init()
 AUDIO_AVAILABLE = False
+MIXER_RATE, MIXER_CHANNELS = 44100, 2
 try:
     pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
+    MIXER_RATE, _, MIXER_CHANNELS = pygame.mixer.get_init()
     AUDIO_AVAILABLE = True
 except:
     print("Audio not available - running without sound")
@@ -50,25 +67,129 @@ COLORS = {
 
 # ============== PROCEDURAL AUDIO ENGINE ==============
 
-def generate_sine_wave(freq, duration, volume=0.3, sample_rate=44100):
-    """Generate a sine wave"""
-    samples = int(sample_rate * duration)
-    wave = []
-    for i in range(samples):
-        t = i / sample_rate
-        value = math.sin(2 * math.pi * freq * t) * volume
-        wave.append(value)
-    return wave
+# Synthesis works on whole buffers: NumPy float64 arrays when NumPy is
+# installed, plain lists otherwise. Every voice runs on an Oscillator: a
+# phase accumulator stepping through a one-cycle wavetable with linear
+# interpolation, so a sample costs a table lookup instead of a sin() call
+# however many partials the table holds. Vibrato/FM and tremolo are LFO
+# Oscillators feeding the phase increment and the gain, which keeps
+# modulated pitch phase-continuous. With 4096-entry tables the sine is within
+# 3e-7 of math.sin, i.e. at most 1 LSB in the 16-bit output; envelopes and
+# mixes repeat the original per-sample arithmetic in the same order, so they
+# are bit-identical. Voices are mixed as (buffer, offset, gain) events that
+# only touch their own time window, so leading silence costs nothing. The
+# generate_* / mix_waves list API is a thin wrapper on top.
+WAVETABLE_SIZE = 4096
 
-def generate_envelope(samples, attack=0.1, decay=0.1, sustain=0.7, release=0.2):
-    """ADSR envelope"""
-    total = len(samples)
-    envelope = []
+_wavetables = {}
+
+def make_wavetable(harmonics):
+    """One cycle of the given harmonic amplitudes, normalized to peak 1.0"""
+    if NUMPY_AVAILABLE:
+        phase = np.arange(WAVETABLE_SIZE + 1) * (2 * math.pi / WAVETABLE_SIZE)
+        table = sum(amp * np.sin(k * phase) for k, amp in enumerate(harmonics, 1) if amp)
+        return table / np.abs(table).max()
+    table = [sum(amp * math.sin(k * i * 2 * math.pi / WAVETABLE_SIZE)
+                 for k, amp in enumerate(harmonics, 1) if amp)
+             for i in range(WAVETABLE_SIZE + 1)]
+    peak = max(abs(v) for v in table)
+    return [v / peak for v in table]
+
+def wavetable(shape):
+    """Named wavetable ('sine', 'saw', 'square'), built on first use"""
+    if shape not in _wavetables:
+        harmonics = {
+            'sine': (1,),
+            'saw': [(-1) ** (k + 1) / k for k in range(1, 65)],
+            'square': [1 / k if k % 2 else 0 for k in range(1, 65)],
+        }[shape]
+        _wavetables[shape] = make_wavetable(harmonics)
+    return _wavetables[shape]
+
+class Oscillator:
+    """Wavetable oscillator driven by a phase accumulator.
+    
+    vibrato=(rate_hz, depth) scales the frequency by 1 + depth * lfo;
+    tremolo=(rate_hz, depth) scales the output by 1 - depth + depth * lfo.
+    """
+    def __init__(self, freq, sample_rate=44100, shape='sine', volume=1.0,
+                 vibrato=None, tremolo=None):
+        self.freq = freq
+        self.sample_rate = sample_rate
+        self.table = wavetable(shape) if isinstance(shape, str) else shape
+        self.volume = volume
+        self.phase = 0.0
+        self.vibrato = self.vibrato_depth = self.tremolo = self.tremolo_depth = None
+        if vibrato:
+            self.vibrato = Oscillator(vibrato[0], sample_rate)
+            self.vibrato_depth = vibrato[1]
+        if tremolo:
+            self.tremolo = Oscillator(tremolo[0], sample_rate)
+            self.tremolo_depth = tremolo[1]
+    
+    def render(self, frames):
+        """The next `frames` samples; phase carries over between calls"""
+        step = self.freq / self.sample_rate
+        vibrato = self.vibrato.render(frames) if self.vibrato else None
+        tremolo = self.tremolo.render(frames) if self.tremolo else None
+        
+        if NUMPY_AVAILABLE:
+            if vibrato is None:
+                phases = self.phase + np.arange(frames) * step
+                self.phase = (self.phase + frames * step) % 1.0
+            else:
+                steps = step * (1 + self.vibrato_depth * vibrato)
+                phases = np.cumsum(steps)
+                phases -= steps
+                phases += self.phase
+                self.phase = (phases[-1] + steps[-1]) % 1.0 if frames else self.phase
+            pos = (phases % 1.0) * WAVETABLE_SIZE
+            idx = pos.astype(np.intp)
+            out = self.table[idx]
+            out += (pos - idx) * (self.table[idx + 1] - out)
+            out *= self.volume
+            if tremolo is not None:
+                out *= (1 - self.tremolo_depth) + self.tremolo_depth * tremolo
+            return out
+        
+        table, size, volume = self.table, WAVETABLE_SIZE, self.volume
+        phase = self.phase
+        out = [0.0] * frames
+        for i in range(frames):
+            pos = phase * size
+            k = int(pos)
+            value = (table[k] + (pos - k) * (table[k + 1] - table[k])) * volume
+            if tremolo is not None:
+                value *= (1 - self.tremolo_depth) + self.tremolo_depth * tremolo[i]
+            out[i] = value
+            phase += step if vibrato is None else step * (1 + self.vibrato_depth * vibrato[i])
+            phase -= int(phase)
+        self.phase = phase
+        return out
+
+def render_sine(freq, duration, volume=0.3, sample_rate=44100):
+    """Sine oscillator as a single buffer"""
+    return Oscillator(freq, sample_rate, volume=volume).render(int(sample_rate * duration))
+
+def render_envelope(total, attack=0.1, decay=0.1, sustain=0.7, release=0.2):
+    """ADSR gain curve of `total` samples"""
     attack_samples = int(total * attack)
     decay_samples = int(total * decay)
     release_samples = int(total * release)
-    sustain_samples = total - attack_samples - decay_samples - release_samples
+    sustain_samples = max(0, total - attack_samples - decay_samples - release_samples)
     
+    if NUMPY_AVAILABLE:
+        envelope = np.concatenate((
+            np.arange(attack_samples) / max(1, attack_samples),
+            1.0 - (1.0 - sustain) * (np.arange(decay_samples) / max(1, decay_samples)),
+            np.full(sustain_samples, float(sustain)),
+            sustain * (1.0 - np.arange(release_samples) / max(1, release_samples)),
+        ))
+        if len(envelope) < total:
+            envelope = np.concatenate((envelope, np.zeros(total - len(envelope))))
+        return envelope[:total]
+    
+    envelope = []
     for i in range(attack_samples):
         envelope.append(i / attack_samples)
     for i in range(decay_samples):
@@ -77,104 +198,494 @@ def generate_envelope(samples, attack=0.1, decay=0.1, sustain=0.7, release=0.2):
         envelope.append(sustain)
     for i in range(release_samples):
         envelope.append(sustain * (1.0 - i / release_samples))
-    
     while len(envelope) < total:
         envelope.append(0)
-    
-    return [samples[i] * envelope[i] for i in range(min(len(samples), len(envelope)))]
+    return envelope[:total]
+
+def apply_envelope(samples, attack=0.1, decay=0.1, sustain=0.7, release=0.2):
+    """Multiply a buffer by an ADSR envelope"""
+    envelope = render_envelope(len(samples), attack, decay, sustain, release)
+    if NUMPY_AVAILABLE:
+        return np.asarray(samples, dtype=float) * envelope
+    return [samples[i] * envelope[i] for i in range(len(samples))]
+
+def sum_events(events):
+    """Mix (buffer, offset, gain) events, leaving the result unnormalized"""
+    length = max((offset + len(buf) for buf, offset, _ in events), default=0)
+    if NUMPY_AVAILABLE:
+        result = np.zeros(length)
+        for buf, offset, gain in events:
+            window = result[offset:offset + len(buf)]
+            window += buf if gain == 1 else np.multiply(buf, gain)
+        return result
+    result = [0.0] * length
+    for buf, offset, gain in events:
+        for i, sample in enumerate(buf, offset):
+            result[i] += sample if gain == 1 else sample * gain
+    return result
+
+def peak_of(buf):
+    """Largest absolute sample in a buffer"""
+    if NUMPY_AVAILABLE:
+        return np.abs(buf).max() if len(buf) else 0
+    return max((abs(s) for s in buf), default=0)
+
+def normalize(buf, peak, level=0.8):
+    """Scale a buffer whose peak is `peak` so it peaks at `level`"""
+    if NUMPY_AVAILABLE:
+        return buf / (peak or 1) * level
+    return [s / (peak or 1) * level for s in buf]
+
+def render_events(events):
+    """Mix (buffer, offset, gain) events and normalize the peak to 0.8"""
+    result = sum_events(events)
+    return normalize(result, peak_of(result))
+
+def render_mix(*buffers):
+    """Sum buffers and normalize the peak to 0.8"""
+    return render_events([(buf, 0, 1) for buf in buffers])
+
+def to_list(buf):
+    """Convert a synthesis buffer to a list of floats"""
+    return buf.tolist() if NUMPY_AVAILABLE else list(buf)
+
+def encode_pcm(samples, channels=2):
+    """Clip, quantize and interleave samples into one 16-bit PCM buffer"""
+    if NUMPY_AVAILABLE:
+        scaled = np.multiply(samples, 32767)
+        np.clip(scaled, -32768, 32767, out=scaled)
+        pcm = np.empty((len(scaled), channels), dtype='<i2')
+        pcm[:] = scaled[:, None]  # Float to int16 truncates like int()
+        return memoryview(pcm).cast('B')
+    quantized = array.array('h', [max(-32768, min(32767, int(s * 32767))) for s in samples])
+    pcm = array.array('h', bytes(2 * channels * len(quantized)))
+    for channel in range(channels):
+        pcm[channel::channels] = quantized
+    if sys.byteorder == 'big':
+        pcm.byteswap()
+    return memoryview(pcm).cast('B')
+
+def generate_sine_wave(freq, duration, volume=0.3, sample_rate=44100):
+    """Generate a sine wave"""
+    return to_list(render_sine(freq, duration, volume, sample_rate))
+
+def generate_envelope(samples, attack=0.1, decay=0.1, sustain=0.7, release=0.2):
+    """ADSR envelope"""
+    return to_list(apply_envelope(samples, attack, decay, sustain, release))
 
 def mix_waves(*waves):
     """Mix multiple waves together"""
-    max_len = max(len(w) for w in waves)
-    result = [0.0] * max_len
-    for wave in waves:
-        for i, sample in enumerate(wave):
-            result[i] += sample
-    # Normalize
-    max_val = max(abs(s) for s in result) or 1
-    return [s / max_val * 0.8 for s in result]
-
-def generate_vista_chime():
-    """Generate a Vista-style boot chime - ethereal, layered, hopeful"""
-    sample_rate = 44100
-    
-    # Vista chime characteristics: layered pads, ascending melody, shimmer
-    # Key: G major, ethereal feel
-    
+    return to_list(render_mix(*waves))
+
+# Vista chime characteristics: layered pads, ascending melody, shimmer
+# Key: G major, ethereal feel. Everything that shapes the sound lives in this
+# table, which also keys the on-disk PCM cache.
+VISTA_CHIME = {
+    'sample_rate': MIXER_RATE,
+    'channels': MIXER_CHANNELS,
     # Base pad chord (G major with add9) - sustained
-    pad_g = generate_sine_wave(196.00, 3.5, 0.15)  # G3
-    pad_b = generate_sine_wave(246.94, 3.5, 0.12)  # B3
-    pad_d = generate_sine_wave(293.66, 3.5, 0.12)  # D4
-    pad_a = generate_sine_wave(220.00, 3.5, 0.08)  # A3 (add9)
+    # (freq, duration, volume, attack, decay, sustain, release)
+    'pads': (
+        (196.00, 3.5, 0.15, 0.3, 0.1, 0.5, 0.3),   # G3
+        (246.94, 3.5, 0.12, 0.35, 0.1, 0.5, 0.3),  # B3
+        (293.66, 3.5, 0.12, 0.4, 0.1, 0.5, 0.3),   # D4
+        (220.00, 3.5, 0.08, 0.45, 0.1, 0.5, 0.3),  # A3 (add9)
+    ),
+    # Ascending melody: G4 -> B4 -> D5 -> G5 as (freq, start, duration)
+    'bells': (
+        (392.00, 0.0, 0.9),   # G4
+        (493.88, 0.4, 0.9),   # B4
+        (587.33, 0.8, 0.9),   # D5
+        (783.99, 1.2, 1.2),   # G5 (longer, final)
+    ),
+    # Harmonics for bell quality, baked into one wavetable
+    'bell_harmonics': (0.25, 0.1, 0.05),
+    'bell_envelope': (0.01, 0.15, 0.3, 0.54),
+    # Shimmer/sparkle as (freq, start, duration)
+    'shimmers': (
+        (1567.98, 1.5, 1.0),  # G6
+        (1975.53, 1.7, 0.8),  # B6
+    ),
+    # Slight pitch wobble and tremolo as (rate_hz, depth)
+    'shimmer_vibrato': (30 / (2 * math.pi), 0.003),
+    'shimmer_tremolo': (15 / (2 * math.pi), 0.3),
+    'shimmer_envelope': (0.1, 0.2, 0.3, 0.4),
+    # Sub bass for warmth: (freq, duration, volume, attack, decay, sustain, release)
+    'sub': (98.00, 3.0, 0.1, 0.5, 0.1, 0.3, 0.3),  # G2
+}
+
+def chime_voices(params=VISTA_CHIME):
+    """The chime's voices as (start, frames, peak, adsr, oscillator) tuples"""
+    sample_rate = params['sample_rate']
+    voices = []
     
-    # Apply envelope to pad
-    pad_g = generate_envelope(pad_g, 0.3, 0.1, 0.5, 0.3)
-    pad_b = generate_envelope(pad_b, 0.35, 0.1, 0.5, 0.3)
-    pad_d = generate_envelope(pad_d, 0.4, 0.1, 0.5, 0.3)
-    pad_a = generate_envelope(pad_a, 0.45, 0.1, 0.5, 0.3)
+    # Pads and sub bass start together and sustain
+    for freq, duration, volume, *adsr in params['pads'] + (params['sub'],):
+        voices.append((0, int(sample_rate * duration), volume, adsr,
+                       Oscillator(freq, sample_rate, volume=volume)))
     
     # Melody notes (bell-like, ascending)
-    def bell_tone(freq, start_time, duration=0.8):
-        wave = generate_sine_wave(freq, duration, 0.25)
-        # Add harmonics for bell quality
-        h2 = generate_sine_wave(freq * 2, duration, 0.1)
-        h3 = generate_sine_wave(freq * 3, duration, 0.05)
-        combined = mix_waves(wave, h2, h3)
-        combined = generate_envelope(combined, 0.01, 0.15, 0.3, 0.54)
-        
-        # Pad with silence for timing
-        silence_before = [0.0] * int(sample_rate * start_time)
-        return silence_before + combined
-    
-    # Ascending melody: G4 -> B4 -> D5 -> G5
-    melody1 = bell_tone(392.00, 0.0, 0.9)    # G4
-    melody2 = bell_tone(493.88, 0.4, 0.9)    # B4
-    melody3 = bell_tone(587.33, 0.8, 0.9)    # D5
-    melody4 = bell_tone(783.99, 1.2, 1.2)    # G5 (longer, final)
+    bell_table = make_wavetable(params['bell_harmonics'])
+    for freq, start, duration in params['bells']:
+        voices.append((int(sample_rate * start), int(sample_rate * duration), 0.8,
+                       params['bell_envelope'],
+                       Oscillator(freq, sample_rate, bell_table, volume=0.8)))
     
     # Shimmer/sparkle effect
-    def shimmer(base_freq, start, duration=0.5):
-        wave = []
-        samples = int(sample_rate * duration)
-        for i in range(samples):
-            t = i / sample_rate
-            # Slight pitch wobble
-            freq = base_freq * (1 + 0.003 * math.sin(t * 30))
-            value = math.sin(2 * math.pi * freq * t) * 0.08
-            # Tremolo
-            value *= (0.7 + 0.3 * math.sin(t * 15))
-            wave.append(value)
-        wave = generate_envelope(wave, 0.1, 0.2, 0.3, 0.4)
-        silence = [0.0] * int(sample_rate * start)
-        return silence + wave
-    
-    shimmer1 = shimmer(1567.98, 1.5, 1.0)  # G6
-    shimmer2 = shimmer(1975.53, 1.7, 0.8)  # B6
-    
-    # Sub bass for warmth
-    sub = generate_sine_wave(98.00, 3.0, 0.1)  # G2
-    sub = generate_envelope(sub, 0.5, 0.1, 0.3, 0.3)
-    
-    # Mix everything
-    final = mix_waves(pad_g, pad_b, pad_d, pad_a, 
-                      melody1, melody2, melody3, melody4,
-                      shimmer1, shimmer2, sub)
-    
-    # Convert to stereo 16-bit
-    stereo_data = []
-    for sample in final:
-        val = int(sample * 32767)
-        val = max(-32768, min(32767, val))
-        stereo_data.append(struct.pack('<hh', val, val))
-    
-    return b''.join(stereo_data)
-
-def play_boot_chime():
-    """Play the boot chime"""
+    for freq, start, duration in params['shimmers']:
+        voices.append((int(sample_rate * start), int(sample_rate * duration), 0.08,
+                       params['shimmer_envelope'],
+                       Oscillator(freq, sample_rate, volume=0.08,
+                                  vibrato=params['shimmer_vibrato'],
+                                  tremolo=params['shimmer_tremolo'])))
+    
+    return voices
+
+def chime_mix(params=VISTA_CHIME, cancel=None):
+    """The chime's voices summed, before normalization. Returns None if the
+    `cancel` event gets set part way through."""
+    events = []
+    for start, frames, _, adsr, oscillator in chime_voices(params):
+        if cancel is not None and cancel.is_set():
+            return None
+        events.append((apply_envelope(oscillator.render(frames), *adsr), start, 1))
+    return sum_events(events)
+
+def generate_vista_chime(params=VISTA_CHIME):
+    """Generate a Vista-style boot chime - ethereal, layered, hopeful"""
+    mix = chime_mix(params)
+    return encode_pcm(normalize(mix, peak_of(mix)), params['channels'])
+
+# ============== STREAMING SYNTHESIS ==============
+
+# The streaming path renders the chime in fixed-size blocks so playback can
+# start as soon as the first block exists, holding only a few blocks in
+# memory. Each voice's Oscillator keeps its phase from one block to the
+# next, so a block only renders the voices it overlaps. The
+# full render normalizes by the mix's true peak, which isn't known until the
+# end. Every full render caches that peak next to its PCM (see cached_peak),
+# and streaming normalizes by it too, so both play at the same level. With no
+# peak cached yet, streaming falls back to the peak of the summed voice
+# envelopes, a safe upper bound that comes out about 2.5 dB quieter.
+STREAM_BLOCK_FRAMES = 2048
+
+def envelope_at(total, attack, decay, sustain, release, idx):
+    """ADSR gain at sample indices `idx` of a `total`-sample envelope"""
+    attack_samples = int(total * attack)
+    decay_samples = int(total * decay)
+    release_samples = int(total * release)
+    sustain_end = attack_samples + decay_samples + max(0, total - attack_samples - decay_samples - release_samples)
+    idx = np.asarray(idx)
+    return np.select(
+        [idx < attack_samples,
+         idx < attack_samples + decay_samples,
+         idx < sustain_end,
+         idx < sustain_end + release_samples],
+        [idx / max(1, attack_samples),
+         1.0 - (1.0 - sustain) * ((idx - attack_samples) / max(1, decay_samples)),
+         float(sustain),
+         sustain * (1.0 - (idx - sustain_end) / max(1, release_samples))],
+        0.0)
+
+def voices_peak_bound(voices):
+    """Upper bound on the mix's peak from the voices' envelopes alone"""
+    points = set()
+    for start, frames, _, adsr, _ in voices:
+        a = int(frames * adsr[0])
+        d = int(frames * adsr[1])
+        r = int(frames * adsr[3])
+        for p in (0, a, a + d, frames - r - 1, frames - r, frames - 1):
+            points.add(start + max(0, min(frames - 1, p)))
+    points = np.array(sorted(points))
+    total = np.zeros(len(points))
+    for start, frames, peak, adsr, _ in voices:
+        inside = (points >= start) & (points < start + frames)
+        total[inside] += peak * envelope_at(frames, *adsr, points[inside] - start)
+    return total.max() or 1
+
+def stream_vista_chime(params=VISTA_CHIME, block_frames=STREAM_BLOCK_FRAMES, peaks=None, peak=None):
+    """Yield the chime as stereo 16-bit PCM blocks of `block_frames` frames,
+    normalized by the mix's true `peak` if known. Each block's peak
+    before scaling is appended to the `peaks` list if given."""
+    voices = chime_voices(params)
+    gain = 0.8 / (peak or voices_peak_bound(voices))
+    length = max(start + frames for start, frames, _, _, _ in voices)
+    for block_start in range(0, length, block_frames):
+        block_end = min(length, block_start + block_frames)
+        block = np.zeros(block_end - block_start)
+        for start, frames, _, adsr, oscillator in voices:
+            lo, hi = max(block_start, start), min(block_end, start + frames)
+            if lo < hi:
+                idx = np.arange(lo - start, hi - start)
+                block[lo - block_start:hi - block_start] += oscillator.render(hi - lo) * envelope_at(frames, *adsr, idx)
+        if peaks is not None:
+            peaks.append(peak_of(block))
+        block *= gain
+        yield encode_pcm(block, params['channels'])
+
+_reported_audio_errors = set()
+
+def report_audio_error(where, error):
+    """Print an audio failure once per call site; the desktop carries on silently"""
+    if where not in _reported_audio_errors:
+        _reported_audio_errors.add(where)
+        print(f"Audio error in {where}: {error!r} - continuing without sound")
+
+class SoundStream:
+    """Plays PCM blocks from a generator on one channel, one queued ahead"""
+    def __init__(self, blocks):
+        self.blocks = blocks
+        self.channel = None
+    
+    def start(self):
+        first = next(self.blocks, None)
+        self.channel = pygame.mixer.find_channel(True)
+        if first is None or self.channel is None:
+            self.blocks = None
+            return self
+        self.channel.play(pygame.mixer.Sound(buffer=first))
+        self.update()
+        return self
+    
+    def update(self):
+        """Render and queue the next block once the queue slot is free.
+        Returns False after the last block has been queued, or if
+        rendering one failed."""
+        if self.blocks is None:
+            return False
+        if self.channel.get_queue() is None:
+            try:
+                block = next(self.blocks, None)
+                if block is not None:
+                    self.channel.queue(pygame.mixer.Sound(buffer=block))
+            except Exception as error:
+                report_audio_error('SoundStream.update', error)
+                block = None
+            if block is None:
+                self.blocks = None
+                return False
+        return True
+
+# ============== PCM CACHE ==============
+
+# Rendered sounds are stored as raw 16-bit PCM under SOUND_CACHE_DIR, named
+# by a hash of their synthesis parameters, and memory-mapped on later runs so
+# a warm boot does no synthesis. Changing a sound's parameters (or bumping
+# SYNTH_VERSION after changing the synthesis code) gives it a new key, so
+# stale files are never read again; the least recently used files are
+# evicted once the directory grows past SOUND_CACHE_MAX_BYTES. A render can
+# also leave a .peak file holding its mix's peak before normalization; those
+# are a few bytes each and never evicted, so a chime that has to stream
+# still knows its level after its PCM is gone.
+SYNTH_VERSION = 2
+SOUND_CACHE_DIR = os.environ.get('CATOS_SOUND_CACHE') or os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'catos', 'sounds')
+SOUND_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+_loaded_pcm = {}
+
+def sound_cache_key(name, params):
+    """Content hash of everything that determines a sound's samples"""
+    blob = repr((SYNTH_VERSION, name, sorted(params.items()))).encode()
+    return hashlib.sha1(blob).hexdigest()[:16]
+
+def cached_pcm(name, params, render):
+    """PCM bytes for render(params), from memory, disk, or a fresh render.
+    A render that returns None (cancelled) leaves nothing cached."""
+    key = sound_cache_key(name, params)
+    if key in _loaded_pcm:
+        return _loaded_pcm[key]
+    path = os.path.join(SOUND_CACHE_DIR, f'{name}-{key}.pcm')
+    data = _map_pcm(path, 2 * params['channels'])
+    if data is None:
+        data = render(params)
+        if data is None:
+            return None
+        _store_pcm(path, data)
+    _loaded_pcm[key] = data
+    return data
+
+def _map_pcm(path, frame_bytes):
+    try:
+        with open(path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):  # Missing, unreadable or empty
+        return None
+    if len(data) % frame_bytes:  # Truncated write; re-render
+        data.close()
+        return None
+    try:
+        os.utime(path)  # mtime doubles as the LRU timestamp
+    except OSError:
+        pass
+    return data
+
+def _store_pcm(path, data):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(SOUND_CACHE_DIR, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+    except OSError:
+        return  # Cache is best-effort; the sound still plays
+    _commit_pcm(tmp_path, path)
+
+def _commit_pcm(tmp_path, path):
+    """Move a fully written temp file into place, or drop it if path is None"""
+    try:
+        if path is None:
+            os.remove(tmp_path)
+            return
+        os.replace(tmp_path, path)
+        _evict_pcm()
+    except OSError:
+        pass
+
+def cached_peak(name, params):
+    """True peak of a sound's mix before normalization, as recorded by
+    its last full render, or None"""
+    try:
+        with open(os.path.join(SOUND_CACHE_DIR, f'{name}-{sound_cache_key(name, params)}.peak')) as f:
+            return float(f.read())
+    except (OSError, ValueError):
+        return None
+
+def _store_peak(name, params, peak):
+    path = os.path.join(SOUND_CACHE_DIR, f'{name}-{sound_cache_key(name, params)}.peak')
+    try:
+        os.makedirs(SOUND_CACHE_DIR, exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(repr(float(peak)))
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+def _evict_pcm():
+    entries = []
+    for entry in os.listdir(SOUND_CACHE_DIR):
+        if entry.endswith('.pcm'):
+            st = os.stat(os.path.join(SOUND_CACHE_DIR, entry))
+            entries.append((st.st_mtime, st.st_size, entry))
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry in sorted(entries):
+        if total <= SOUND_CACHE_MAX_BYTES:
+            break
+        os.remove(os.path.join(SOUND_CACHE_DIR, entry))
+        total -= size
+
+def chime_pcm(params, mix):
+    """PCM for the chime's summed voices, normalized by their true peak,
+    which is cached for the streamed chime"""
+    peak = peak_of(mix)
+    _store_peak('chime', params, peak)
+    return encode_pcm(normalize(mix, peak), params['channels'])
+
+def load_vista_chime(cancel=None):
+    """Boot chime PCM, rendered at most once per parameter set"""
+    def render(params):
+        mix = chime_mix(params, cancel)
+        return None if mix is None else chime_pcm(params, mix)
+    return cached_pcm('chime', VISTA_CHIME, render)
+
+# The chime is synthesized on a worker thread as soon as CatOS starts, so
+# the boot animation never waits on it. If it isn't ready at its cue,
+# CHIME_FALLBACK decides: 'stream' starts the block-streamed version right
+# away (needs NumPy, otherwise behaves like 'delay'), 'delay' plays it late
+# (up to CHIME_MAX_DELAY seconds after the cue), 'skip' drops it. Once the
+# stream has started, the worker gives up at its next voice rather than
+# synthesize the chime a second time. The stream writes its blocks to the
+# PCM cache as it goes, so the next boot still finds the chime on disk; a
+# stream with no cached peak to play at records the true one instead, for
+# the next stream to use.
+CHIME_CUE_TIME = 1.5
+CHIME_FALLBACK = 'stream'
+CHIME_MAX_DELAY = 1.0
+
+_chime_future = None
+_chime_cancel = threading.Event()
+
+def start_chime_render():
+    """Start rendering the boot chime in the background (once)"""
+    global _chime_future
+    if _chime_future is None and AUDIO_AVAILABLE:
+        _chime_future = run_on_chime_thread(load_vista_chime, _chime_cancel)
+    return _chime_future
+
+def run_on_chime_thread(fn, *args):
+    """Run fn(*args) on a one-off worker thread; returns its Future"""
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='chime')
+    future = executor.submit(fn, *args)
+    executor.shutdown(wait=False)
+    return future
+
+def chime_ready():
+    """True once the background chime render has finished"""
+    future = start_chime_render()
+    return future is not None and future.done()
+
+def stream_and_cache_chime(params=VISTA_CHIME):
+    """Stream the chime, writing its blocks to the PCM cache as they go"""
+    peak = cached_peak('chime', params)
+    if peak is None:
+        # Blocks at the bound's level aren't the chime's PCM; record the
+        # true peak so the next stream plays, and caches, the real thing
+        peaks = []
+        yield from stream_vista_chime(params, peaks=peaks)
+        run_on_chime_thread(_store_peak, 'chime', params, max(peaks))
+        return
+    path = os.path.join(SOUND_CACHE_DIR, f"chime-{sound_cache_key('chime', params)}.pcm")
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(SOUND_CACHE_DIR, exist_ok=True)
+        cache = open(tmp_path, 'wb')
+    except OSError:
+        cache = None
+    cache_ok = cache is not None
+    complete = False
+    try:
+        for block in stream_vista_chime(params, peak=peak):
+            if cache_ok:
+                try:
+                    cache.write(block)
+                except OSError:
+                    cache_ok = False  # Best-effort; the stream plays on
+            yield block
+        complete = True
+    finally:
+        if cache is not None:
+            try:
+                cache.close()
+            except OSError:
+                cache_ok = False
+            # Renaming into place and eviction stay off the frame loop
+            run_on_chime_thread(_commit_pcm, tmp_path, path if complete and cache_ok else None)
+
+def stream_boot_chime():
+    """Start the boot chime as a block stream in place of the background
+    render, which is cancelled; call update() every frame"""
+    if not (AUDIO_AVAILABLE and NUMPY_AVAILABLE):
+        return None
+    try:
+        stream = SoundStream(stream_and_cache_chime()).start()
+    except Exception as error:
+        report_audio_error('stream_boot_chime', error)
+        return None
+    _chime_cancel.set()
+    return stream
+
+def play_boot_chime(timeout=None):
+    """Play the boot chime, waiting up to `timeout` seconds for it to render"""
     if not AUDIO_AVAILABLE:
         return None
-    chime_data = generate_vista_chime()
-    sound = pygame.mixer.Sound(buffer=chime_data)
+    try:
+        chime_data = start_chime_render().result(timeout)
+        sound = pygame.mixer.Sound(buffer=chime_data)
+    except concurrent.futures.TimeoutError:
+        return None
+    except Exception as error:
+        report_audio_error('play_boot_chime', error)
+        return None
     sound.play()
     return sound
 
@@ -278,27 +789,110 @@ FONT_8X8 = {
     '~': [0x76,0xDC,0x00,0x00,0x00,0x00,0x00,0x00],
 }
 
+GLYPH_INDEX = {char: i for i, char in enumerate(FONT_8X8)}
+GLYPH_ATLAS_CACHE_SIZE = 32
+_glyph_atlases = OrderedDict()
+
+def glyph_atlas(color, scale=1):
+    """Every FONT_8X8 glyph rasterized once, side by side, in one colorkeyed strip.
+
+    Atlases are built on first use for each (color, scale) and kept in a small
+    LRU so a text color that stops being used is eventually dropped.
+    """
+    key = (tuple(color), scale)
+    atlas = _glyph_atlases.get(key)
+    if atlas is not None:
+        _glyph_atlases.move_to_end(key)
+        return atlas
+
+    size = 8 * scale
+    color = key[0][:3]
+    colorkey = (0, 0, 0) if color != (0, 0, 0) else (255, 255, 255)
+    atlas = pygame.Surface((size * len(GLYPH_INDEX), size))
+    if pygame.display.get_surface():
+        atlas = atlas.convert()
+    atlas.fill(colorkey)
+    for char, index in GLYPH_INDEX.items():
+        for row_idx, row in enumerate(FONT_8X8[char]):
+            for col in range(8):
+                if row & (0x80 >> col):
+                    atlas.fill(color, (index * size + col * scale, row_idx * scale, scale, scale))
+    atlas.set_colorkey(colorkey, pygame.RLEACCEL)
+
+    _glyph_atlases[key] = atlas
+    if len(_glyph_atlases) > GLYPH_ATLAS_CACHE_SIZE:
+        _glyph_atlases.popitem(last=False)
+    return atlas
+
 def draw_char(surface, char, x, y, color, scale=1):
     """Draw a single character using 8x8 bitmap font"""
-    if char not in FONT_8X8:
-        char = '?'
-    bitmap = FONT_8X8[char]
-    for row_idx, row in enumerate(bitmap):
-        for col in range(8):
-            if row & (0x80 >> col):
-                px = x + col * scale
-                py = y + row_idx * scale
-                if scale == 1:
-                    surface.set_at((px, py), color)
-                else:
-                    pygame.draw.rect(surface, color, (px, py, scale, scale))
+    size = 8 * scale
+    index = GLYPH_INDEX.get(char, GLYPH_INDEX['?'])
+    surface.blit(glyph_atlas(color, scale), (x, y), (index * size, 0, size, size))
+
+def render_text(text, color, scale=1):
+    """Render an already upper-cased string onto its own colorkeyed surface"""
+    atlas = glyph_atlas(color, scale)
+    size = 8 * scale
+    unknown = GLYPH_INDEX['?']
+    run = pygame.Surface((size * len(text), size))
+    if pygame.display.get_surface():
+        run = run.convert()
+    colorkey = atlas.get_colorkey()
+    run.fill(colorkey)
+    run.blits([(atlas, (i * size, 0), (GLYPH_INDEX.get(char, unknown) * size, 0, size, size))
+               for i, char in enumerate(text)], doreturn=False)
+    run.set_colorkey(colorkey, pygame.RLEACCEL)
+    return run
+
+TEXT_CACHE_MAX_BYTES = 4 * 1024 * 1024
+
+class TextCache:
+    """LRU cache of rendered text runs, keyed by (upper-cased text, color, scale).
+
+    Labels, titles and menu items are redrawn every frame but rarely change,
+    so each costs one blit once cached. Least recently used runs are evicted
+    once the cached surfaces exceed max_bytes; a single run larger than that
+    is rendered but not kept. `stats` counts hits, misses and evictions.
+    """
+    def __init__(self, max_bytes=TEXT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.runs = OrderedDict()  # key -> (surface, bytes)
+        self.bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+    
+    def get(self, text, color, scale=1):
+        text = text.upper()
+        key = (text, tuple(color), scale)
+        entry = self.runs.get(key)
+        if entry is not None:
+            self.stats['hits'] += 1
+            self.runs.move_to_end(key)
+            return entry[0]
+        
+        self.stats['misses'] += 1
+        run = render_text(text, color, scale)
+        size = run.get_width() * run.get_height() * run.get_bytesize()
+        if size > self.max_bytes:
+            return run
+        self.runs[key] = (run, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, evicted) = self.runs.popitem(last=False)
+            self.bytes -= evicted
+            self.stats['evictions'] += 1
+        return run
+    
+    def clear(self):
+        self.runs.clear()
+        self.bytes = 0
+
+TEXT_CACHE = TextCache()
 
 def draw_text(surface, text, x, y, color, scale=1):
     """Draw text string"""
-    cursor_x = x
-    for char in text.upper():
-        draw_char(surface, char, cursor_x, y, color, scale)
-        cursor_x += 8 * scale
+    if text:
+        surface.blit(TEXT_CACHE.get(text, color, scale), (x, y))
 
 def get_text_width(text, scale=1):
     return len(text) * 8 * scale
@@ -323,6 +917,19 @@ def draw_3d_rect(surface, rect, raised=True):
     pygame.draw.line(surface, dark, (x, y + h - 1), (x + w - 1, y + h - 1))
     pygame.draw.line(surface, dark, (x + w - 1, y), (x + w - 1, y + h - 1))
 
+def draw_outline(surface, color, rect):
+    """One-pixel rectangle outline.
+
+    Drawn as four lines because pygame.draw.rect(..., 1) fills a stray pixel
+    at the clip corner when the surface has a clip rect set, which the
+    dirty-rectangle compositor always does.
+    """
+    x, y, w, h = rect
+    pygame.draw.line(surface, color, (x, y), (x + w - 1, y))
+    pygame.draw.line(surface, color, (x, y + h - 1), (x + w - 1, y + h - 1))
+    pygame.draw.line(surface, color, (x, y), (x, y + h - 1))
+    pygame.draw.line(surface, color, (x + w - 1, y), (x + w - 1, y + h - 1))
+
 def draw_button(surface, rect, text, pressed=False):
     """Draw NT-style button"""
     draw_3d_rect(surface, rect, not pressed)
@@ -334,6 +941,51 @@ def draw_button(surface, rect, text, pressed=False):
         text_y += 1
     draw_text(surface, text, text_x, text_y, COLORS['black'])
 
+class ProgressBar:
+    """Sunken bar whose gradient fill is rendered once and revealed by width.
+
+    Drawing blits a slice of the cached gradient as wide as the current
+    progress, so the cost no longer grows with the filled length. Apps can
+    keep one per long-running task and draw it onto any surface.
+    """
+    def __init__(self, rect, start_color=(100, 150, 200), end_color=(255, 255, 100)):
+        self.rect = pygame.Rect(rect)
+        self.start_color = start_color
+        self.end_color = end_color
+        self.progress = 0.0
+        self.gradient = None
+    
+    def set_progress(self, progress):
+        """Clamp and store progress; return True if the visible fill changed"""
+        progress = max(0.0, min(1.0, progress))
+        changed = int(self.rect.w * progress) != self.get_fill_width()
+        self.progress = progress
+        return changed
+    
+    def get_fill_width(self):
+        return int(self.rect.w * self.progress)
+    
+    def render_gradient(self):
+        w, h = self.rect.w, self.rect.h - 3
+        gradient = pygame.Surface((w, h))
+        if pygame.display.get_surface():
+            gradient = gradient.convert()
+        for i in range(w):
+            t = i / w
+            color = tuple(int(a + (b - a) * t) for a, b in zip(self.start_color, self.end_color))
+            gradient.fill(color, (i, 0, 1, h))
+        return gradient
+    
+    def draw(self, surface):
+        x, y, w, h = self.rect
+        pygame.draw.rect(surface, COLORS['window_shadow'], (x - 2, y - 2, w + 4, h + 4))
+        pygame.draw.rect(surface, COLORS['black'], self.rect)
+        if self.gradient is None:
+            self.gradient = self.render_gradient()
+        fill_width = self.get_fill_width()
+        if fill_width:
+            surface.blit(self.gradient, (x, y + 2), (0, 0, fill_width, h - 3))
+
 def draw_window(surface, rect, title, active=True):
     """Draw NT 1.0 style window"""
     x, y, w, h = rect
@@ -369,7 +1021,7 @@ def draw_window(surface, rect, title, active=True):
     
     btn_x += 16
     draw_3d_rect(surface, (btn_x, btn_y, 14, 14), True)
-    pygame.draw.rect(surface, COLORS['black'], (btn_x + 3, btn_y + 3, 8, 8), 1)
+    draw_outline(surface, COLORS['black'], (btn_x + 3, btn_y + 3, 8, 8))
     
     btn_x += 16
     draw_3d_rect(surface, (btn_x, btn_y, 14, 14), True)
@@ -378,6 +1030,17 @@ def draw_window(surface, rect, title, active=True):
 
 def draw_cat_icon_mini(surface, x, y):
     """Draw tiny cat face for system menu"""
+    sprite = _icon_sprites.get('cat_mini')
+    if sprite is None:
+        sprite = pygame.Surface((12, 12), pygame.SRCALPHA)
+        render_cat_icon_mini(sprite, 0, 0)
+        if pygame.display.get_surface():
+            sprite = sprite.convert_alpha()
+        _icon_sprites['cat_mini'] = sprite
+    surface.blit(sprite, (x, y))
+
+def render_cat_icon_mini(surface, x, y):
+    """Rasterize the tiny cat face that draw_cat_icon_mini caches"""
     # Ears
     pygame.draw.polygon(surface, COLORS['cat_orange'], [(x+2, y+4), (x+4, y), (x+6, y+4)])
     pygame.draw.polygon(surface, COLORS['cat_orange'], [(x+6, y+4), (x+8, y), (x+10, y+4)])
@@ -430,6 +1093,498 @@ def draw_cat_icon(surface, x, y, size=32):
         pygame.draw.line(surface, COLORS['black'],
             (x + size - 4, eye_y + 10 + offset), (x + size + 4, eye_y + 8 + offset * 2))
 
+# ============== DIRTY RECTANGLES ==============
+# The desktop is only repainted where something changed. Anything that alters
+# what is on screen marks its area in DAMAGE; each frame the compositor
+# repaints just those regions and pushes them with display.update(). Set
+# CATOS_DEBUG_DIRTY=1 (or press F9) to outline every repainted region.
+DEBUG_DIRTY_RECTS = bool(os.environ.get('CATOS_DEBUG_DIRTY'))
+DEBUG_DIRTY_COLOR = (255, 0, 255)
+DEBUG_DIRTY_HOLD = 0.3  # Seconds an outline stays visible
+DIRTY_FULL_FRACTION = 0.6  # Past this much of the screen, repaint all of it
+
+class DirtyRegion:
+    """Screen areas invalidated since the last frame"""
+    def __init__(self, bounds):
+        self.bounds = pygame.Rect(bounds)
+        self.rects = []
+    
+    def add(self, rect=None):
+        """Mark `rect` (default: the whole screen) as needing a repaint"""
+        rect = self.bounds.copy() if rect is None else self.bounds.clip(rect)
+        if rect.w and rect.h:
+            self.rects.append(rect)
+    
+    def take(self, whole=()):
+        """Return the merged dirty rects and start the next frame clean.
+
+        Rects in `whole` (anything drawn with diagonal lines, which pygame
+        rasterizes differently once clipped) are repainted entirely as soon
+        as a dirty rect touches them, so a partial repaint never leaves a
+        seam.
+        """
+        rects = self.rects
+        self.rects = []
+        whole = [self.bounds.clip(r) for r in whole]
+        while True:
+            merged = self.merge(rects)
+            grown = [r for r in whole if r.collidelist(merged) != -1
+                     and not any(m.contains(r) for m in merged)]
+            if not grown:
+                break
+            rects = merged + grown
+        
+        area = sum(r.w * r.h for r in merged)
+        if area > DIRTY_FULL_FRACTION * self.bounds.w * self.bounds.h:
+            return [self.bounds.copy()]
+        return merged
+    
+    def merge(self, rects):
+        """Union overlapping rects until no two overlap"""
+        merged = []
+        for rect in rects:
+            i = 0
+            while i < len(merged):
+                if rect.colliderect(merged[i]):
+                    rect = rect.union(merged.pop(i))
+                    i = 0
+                else:
+                    i += 1
+            merged.append(self.bounds.clip(rect))
+        return merged
+
+DAMAGE = DirtyRegion((0, 0, SCREEN_WIDTH, SCREEN_HEIGHT))
+
+# ============== FRAME PACING ==============
+# The main loop only runs at ACTIVE_FPS while something animates (boot, a
+# window drag, a streaming chime). Otherwise it sleeps in pygame.event.wait()
+# until input arrives or the next timed change is due (the taskbar clock's
+# minute, a cursor blink, a debug outline expiring), and never redraws faster
+# than IDLE_FPS. Process CPU time is sampled while idle; above IDLE_CPU_TARGET
+# the idle cap is halved (down to IDLE_MIN_FPS) until the load drops again.
+ACTIVE_FPS = int(os.environ.get('CATOS_ACTIVE_FPS') or 60)
+IDLE_FPS = int(os.environ.get('CATOS_IDLE_FPS') or 30)
+IDLE_MIN_FPS = 5
+IDLE_MAX_WAIT = 5.0  # Seconds; longest single sleep even with nothing due
+IDLE_CPU_TARGET = 0.02  # Fraction of one core the idle loop may use
+IDLE_CPU_WINDOW = 2.0  # Seconds of idle time per CPU sample
+
+class FrameClock:
+    """Wall-clock time as of the current frame.
+
+    Anything timed (boot sequence, cursor blink, double-click, the taskbar
+    clock, debug outlines) reads CLOCK.now instead of time.time(), so one
+    frame sees a single instant and a replayed session sees exactly the
+    instants that were recorded.
+    """
+    def __init__(self):
+        self.now = time.time()
+
+CLOCK = FrameClock()
+
+class FramePacer:
+    """Paces the main loop: fixed rate when animating, event-driven when idle"""
+    def __init__(self, active_fps=ACTIVE_FPS, idle_fps=IDLE_FPS, recorder=None, replay=None):
+        self.clock = pygame.time.Clock()
+        self.recorder = recorder
+        self.replay = replay
+        self.mouse_pos = (0, 0)
+        self.real_start = None
+        self.active_fps = active_fps
+        self.max_idle_fps = idle_fps
+        self.idle_fps = idle_fps
+        self.pending = []  # Event that woke wait(), handed out by get_events()
+        self.idle_mark = None  # (wall, cpu) at the start of the current sample
+        self.idle_cpu = None  # Last measured idle CPU fraction
+    
+    def start(self):
+        """Read the clock the session starts at (recorded, or replayed)"""
+        CLOCK.now = self.replay.start if self.replay else time.time()
+        self.real_start = time.perf_counter()
+        if self.recorder:
+            self.recorder.write_start(CLOCK.now)
+        return CLOCK.now
+    
+    def get_events(self):
+        """Advance CLOCK and return this frame's input, live or replayed"""
+        if self.replay:
+            # Live input is ignored, except for closing the window
+            events = [event for event in pygame.event.get() if event.type == pygame.QUIT]
+            frame = self.replay.next_frame()
+            if frame is None:
+                return events + [pygame.event.Event(pygame.QUIT)]
+            CLOCK.now, self.mouse_pos, recorded = frame
+            events = recorded + events
+        else:
+            CLOCK.now = time.time()
+            self.mouse_pos = pygame.mouse.get_pos()
+            events = self.pending + pygame.event.get()
+            self.pending = []
+        if self.recorder:
+            self.recorder.write_frame(CLOCK.now, self.mouse_pos, events)
+        return events
+    
+    def close(self):
+        if self.recorder:
+            self.recorder.close()
+    
+    def wait(self, active, wake_at=None):
+        """Sleep until the next frame is due.
+
+        Active frames are spaced 1/active_fps apart. Idle frames block until
+        an event arrives or `wake_at` (wall-clock seconds, like CLOCK.now)
+        passes, and are spaced at least 1/idle_fps apart. A replay never
+        blocks on input; it only waits to match recorded timing if realtime.
+        """
+        if self.replay:
+            # As fast as possible, or spaced out like the recorded frames
+            due = self.replay.next_time()
+            if self.replay.realtime and due is not None:
+                delay = (due - self.replay.start) - (time.perf_counter() - self.real_start)
+                if delay > 0:
+                    time.sleep(delay)
+            return
+        if active:
+            self.idle_mark = None
+            self.clock.tick(self.active_fps)
+            return
+        self.clock.tick(self.idle_fps)
+        timeout = IDLE_MAX_WAIT
+        if wake_at is not None:
+            timeout = min(timeout, wake_at - time.time())
+        if timeout > 0 and not pygame.event.peek():
+            event = pygame.event.wait(math.ceil(timeout * 1000))
+            if event.type != pygame.NOEVENT:
+                self.pending.append(event)
+        self.sample_idle_cpu()
+    
+    def sample_idle_cpu(self):
+        now, cpu = time.perf_counter(), time.process_time()
+        if self.idle_mark is None:
+            self.idle_mark = (now, cpu)
+            return
+        wall = now - self.idle_mark[0]
+        if wall < IDLE_CPU_WINDOW:
+            return
+        self.idle_cpu = (cpu - self.idle_mark[1]) / wall
+        self.idle_mark = (now, cpu)
+        if self.idle_cpu > IDLE_CPU_TARGET:
+            self.idle_fps = max(IDLE_MIN_FPS, self.idle_fps // 2)
+        else:
+            self.idle_fps = min(self.max_idle_fps, self.idle_fps * 2)
+
+# ============== INPUT RECORD / REPLAY ==============
+# CATOS_RECORD=path logs every frame's clock reading, mouse position and input
+# events; CATOS_REPLAY=path plays such a log back instead of live input, with
+# CLOCK following the recorded readings, so a session (and its performance)
+# can be reproduced exactly. Replay runs as fast as possible unless
+# CATOS_REPLAY_REALTIME=1. The file is binary: a header (magic, version,
+# start time) then per frame a clock/mouse record followed by its events.
+INPUT_RECORD = os.environ.get('CATOS_RECORD')
+INPUT_REPLAY = os.environ.get('CATOS_REPLAY')
+INPUT_REPLAY_REALTIME = bool(os.environ.get('CATOS_REPLAY_REALTIME'))
+INPUT_MAGIC = b'CATI'
+INPUT_VERSION = 1
+INPUT_HEADER = struct.Struct('<4sBd')  # magic, version, start time
+INPUT_FRAME = struct.Struct('<dhhH')  # clock, mouse x, mouse y, event count
+INPUT_KEY = struct.Struct('<iHB')  # key, mod, UTF-8 length of unicode
+INPUT_BUTTON = struct.Struct('<hhB')  # x, y, button
+INPUT_MOTION = struct.Struct('<hhhhB')  # x, y, rel x, rel y, buttons bitmask
+
+def encode_event(event):
+    """Pack one event the desktop reacts to; None for anything else"""
+    if event.type == pygame.KEYDOWN:
+        text = event.unicode.encode('utf-8')
+        return b'K' + INPUT_KEY.pack(event.key, event.mod, len(text)) + text
+    if event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+        code = b'D' if event.type == pygame.MOUSEBUTTONDOWN else b'U'
+        return code + INPUT_BUTTON.pack(event.pos[0], event.pos[1], event.button)
+    if event.type == pygame.MOUSEMOTION:
+        buttons = sum(1 << i for i, pressed in enumerate(event.buttons) if pressed)
+        return b'M' + INPUT_MOTION.pack(event.pos[0], event.pos[1], event.rel[0], event.rel[1], buttons)
+    if event.type == pygame.QUIT:
+        return b'Q'
+    return None
+
+def decode_event(data, offset):
+    """Unpack the event at `offset`; return (event, offset past it)"""
+    code = data[offset:offset + 1]
+    offset += 1
+    if code == b'K':
+        key, mod, length = INPUT_KEY.unpack_from(data, offset)
+        offset += INPUT_KEY.size
+        text = data[offset:offset + length].decode('utf-8')
+        return pygame.event.Event(pygame.KEYDOWN, key=key, mod=mod, unicode=text), offset + length
+    if code in (b'D', b'U'):
+        x, y, button = INPUT_BUTTON.unpack_from(data, offset)
+        kind = pygame.MOUSEBUTTONDOWN if code == b'D' else pygame.MOUSEBUTTONUP
+        return pygame.event.Event(kind, pos=(x, y), button=button), offset + INPUT_BUTTON.size
+    if code == b'M':
+        x, y, rx, ry, buttons = INPUT_MOTION.unpack_from(data, offset)
+        pressed = tuple(bool(buttons & (1 << i)) for i in range(3))
+        return pygame.event.Event(pygame.MOUSEMOTION, pos=(x, y), rel=(rx, ry), buttons=pressed), offset + INPUT_MOTION.size
+    if code == b'Q':
+        return pygame.event.Event(pygame.QUIT), offset
+    raise ValueError(f"Corrupt input log: unknown event code {code!r} at byte {offset - 1}")
+
+class InputRecorder:
+    """Appends each frame's clock, mouse position and events to a log file"""
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+    
+    def write_start(self, now):
+        self.file.write(INPUT_HEADER.pack(INPUT_MAGIC, INPUT_VERSION, now))
+    
+    def write_frame(self, now, mouse_pos, events):
+        encoded = [data for data in map(encode_event, events) if data is not None]
+        self.file.write(INPUT_FRAME.pack(now, mouse_pos[0], mouse_pos[1], len(encoded)))
+        self.file.write(b''.join(encoded))
+    
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+class InputReplay:
+    """A recorded session, handed back one frame at a time"""
+    def __init__(self, path, realtime=False):
+        self.realtime = realtime
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, self.start = INPUT_HEADER.unpack_from(data, 0)
+        if magic != INPUT_MAGIC or version != INPUT_VERSION:
+            raise ValueError(f"{path} is not a version {INPUT_VERSION} Cat OS input log")
+        self.frames = []  # (clock, mouse_pos, events)
+        offset = INPUT_HEADER.size
+        while offset < len(data):
+            now, x, y, count = INPUT_FRAME.unpack_from(data, offset)
+            offset += INPUT_FRAME.size
+            events = []
+            for _ in range(count):
+                event, offset = decode_event(data, offset)
+                events.append(event)
+            self.frames.append((now, (x, y), events))
+        self.position = 0
+    
+    def next_time(self):
+        if self.position < len(self.frames):
+            return self.frames[self.position][0]
+        return None
+    
+    def next_frame(self):
+        if self.position >= len(self.frames):
+            return None
+        self.position += 1
+        return self.frames[self.position - 1]
+
+def make_frame_pacer():
+    """FramePacer wired to CATOS_RECORD / CATOS_REPLAY if they are set"""
+    recorder = InputRecorder(INPUT_RECORD) if INPUT_RECORD else None
+    replay = InputReplay(INPUT_REPLAY, INPUT_REPLAY_REALTIME) if INPUT_REPLAY else None
+    return FramePacer(recorder=recorder, replay=replay)
+
+# ============== FRAME PROFILER ==============
+# Times the stages of each frame (event pumping, click handling, boot/desktop
+# drawing, every window, taskbar, start menu, pushing pixels to the display)
+# and keeps the last PROFILE_WINDOW frames per stage for rolling percentiles.
+# F10 toggles it along with an on-screen table; CATOS_PROFILE=1 starts it on.
+# With CATOS_PROFILE_LOG=path every profiled frame is appended there as one
+# JSON line. While off, stage() hands back a shared no-op context manager.
+PROFILE_ENABLED = bool(os.environ.get('CATOS_PROFILE'))
+PROFILE_LOG = os.environ.get('CATOS_PROFILE_LOG')
+PROFILE_WINDOW = 300  # Frames per stage kept for the percentiles
+PROFILE_PERCENTILES = (50, 95, 99)
+PROFILE_REFRESH = 0.5  # Seconds between overlay recomputations
+
+class NullStage:
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
+NULL_STAGE = NullStage()
+
+class ProfileStage:
+    """Adds the time spent inside its `with` block to the current frame"""
+    def __init__(self, frame, name):
+        self.frame = frame
+        self.name = name
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        ms = (time.perf_counter() - self.start) * 1000
+        self.frame[self.name] = self.frame.get(self.name, 0.0) + ms
+        return False
+
+class FrameProfiler:
+    """Per-stage frame timings with rolling p50/p95/p99 and a JSONL log.
+
+    Stages nest (a window draws inside draw_desktop), so each stage's time is
+    inclusive of its children. 'frame' is the whole frame minus the sleep
+    between frames.
+    """
+    def __init__(self, enabled=PROFILE_ENABLED, log_path=PROFILE_LOG, window=PROFILE_WINDOW):
+        self.enabled = False
+        self.log_path = log_path
+        self.log = None
+        self.window = window
+        self.samples = {}  # stage -> deque of per-frame ms
+        self.frame = {}  # stage -> ms spent so far this frame
+        self.frame_start = None
+        self.frames = 0
+        self.summary = []  # (stage, p50, p95, p99) as last computed
+        self.summary_time = 0.0
+        self.set_enabled(enabled)
+    
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        self.frame = {}
+        self.frame_start = None
+        if enabled and self.log_path and self.log is None:
+            self.log = open(self.log_path, 'a')
+        elif not enabled:
+            self.close()
+    
+    def close(self):
+        if self.log:
+            self.log.close()
+            self.log = None
+    
+    def stage(self, name):
+        """Context manager timing one stage of the current frame"""
+        if not self.enabled:
+            return NULL_STAGE
+        return ProfileStage(self.frame, name)
+    
+    def begin_frame(self):
+        if self.enabled:
+            self.frame_start = time.perf_counter()
+    
+    def end_frame(self):
+        if not self.enabled or self.frame_start is None:
+            return
+        frame = self.frame
+        frame['frame'] = (time.perf_counter() - self.frame_start) * 1000
+        self.frame = {}
+        self.frame_start = None
+        self.frames += 1
+        for name, ms in frame.items():
+            if name not in self.samples:
+                self.samples[name] = deque(maxlen=self.window)
+            self.samples[name].append(ms)
+        if self.log:
+            self.log.write(json.dumps({
+                'frame': self.frames,
+                'time': round(time.time(), 4),
+                'ms': {name: round(ms, 4) for name, ms in frame.items()},
+            }) + '\n')
+    
+    def percentiles(self, name):
+        """Nearest-rank PROFILE_PERCENTILES of a stage's recent frames, in ms"""
+        values = sorted(self.samples[name])
+        return tuple(values[max(0, math.ceil(p / 100 * len(values)) - 1)] for p in PROFILE_PERCENTILES)
+    
+    def get_summary(self):
+        """[(stage, p50, p95, p99)], 'frame' first, recomputed every PROFILE_REFRESH s"""
+        now = time.perf_counter()
+        if now - self.summary_time >= PROFILE_REFRESH:
+            self.summary_time = now
+            names = sorted(self.samples, key=lambda name: name != 'frame')
+            self.summary = [(name,) + self.percentiles(name) for name in names]
+        return self.summary
+
+PROFILER = FrameProfiler()
+
+# ============== ICON SPRITES ==============
+# Icons are rasterized once per (icon_type, size, selected) into an alpha
+# tile and blitted from then on. The cat is drawn natively at any size; the
+# other glyphs are drawn at 32 px and scaled, nearest-neighbour for whole
+# multiples (crisp at 2x) and smoothed otherwise.
+ICON_SIZES = (32,)  # Warmed at boot; other sizes render on first use
+_icon_sprites = {}
+
+def draw_folder_icon(surface, x, y):
+    # Folder tab
+    pygame.draw.rect(surface, (255, 220, 100), (x, y + 4, 12, 6))
+    # Folder body
+    pygame.draw.rect(surface, (255, 200, 50), (x, y + 8, 32, 22))
+    draw_outline(surface, COLORS['black'], (x, y + 8, 32, 22))
+
+def draw_file_icon(surface, x, y):
+    # Paper
+    pygame.draw.rect(surface, COLORS['white'], (x + 4, y, 24, 30))
+    draw_outline(surface, COLORS['black'], (x + 4, y, 24, 30))
+    # Folded corner
+    pygame.draw.polygon(surface, COLORS['window_dark'], 
+        [(x + 20, y), (x + 28, y + 8), (x + 20, y + 8)])
+    # Lines
+    for i in range(4):
+        pygame.draw.line(surface, COLORS['window_dark'],
+            (x + 8, y + 12 + i * 5), (x + 24, y + 12 + i * 5))
+
+def draw_terminal_icon(surface, x, y):
+    # Terminal window
+    pygame.draw.rect(surface, COLORS['black'], (x, y, 32, 30))
+    draw_outline(surface, COLORS['window_dark'], (x, y, 32, 30))
+    # Prompt
+    draw_text(surface, 'C:\\>', x + 2, y + 4, (0, 255, 0))
+    draw_text(surface, '_', x + 26, y + 4, (0, 255, 0))
+
+def draw_trash_icon(surface, x, y):
+    # Trash can
+    pygame.draw.rect(surface, COLORS['window_dark'], (x + 4, y + 6, 24, 24))
+    draw_outline(surface, COLORS['black'], (x + 4, y + 6, 24, 24))
+    # Lid
+    pygame.draw.rect(surface, COLORS['window_dark'], (x + 2, y + 2, 28, 6))
+    draw_outline(surface, COLORS['black'], (x + 2, y + 2, 28, 6))
+    # Handle
+    pygame.draw.rect(surface, COLORS['window_dark'], (x + 12, y, 8, 4))
+    draw_outline(surface, COLORS['black'], (x + 12, y, 8, 4))
+
+ICON_DRAWERS = {
+    'folder': draw_folder_icon,
+    'file': draw_file_icon,
+    'terminal': draw_terminal_icon,
+    'trash': draw_trash_icon,
+}
+
+def icon_sprite(icon_type, size=32, selected=False):
+    """Icon tile (glyph over its selection highlight) as laid out by DesktopIcon.
+
+    Tiles are 2*size wide and 1.5*size tall with the glyph centred near the
+    top; unselected tiles are transparent around the glyph.
+    """
+    key = (icon_type, size, selected)
+    sprite = _icon_sprites.get(key)
+    if sprite is not None:
+        return sprite
+    
+    base = size if icon_type == 'cat' else 32
+    sprite = pygame.Surface((base * 2, base * 3 // 2), pygame.SRCALPHA)
+    if selected:
+        sprite.fill(COLORS['selection'])
+    if icon_type == 'cat':
+        draw_cat_icon(sprite, base // 2, base // 8, size)
+    elif icon_type in ICON_DRAWERS:
+        ICON_DRAWERS[icon_type](sprite, base // 2, base // 8)
+    if base != size:
+        scale = pygame.transform.scale if size % base == 0 else pygame.transform.smoothscale
+        sprite = scale(sprite, (size * 2, size * 3 // 2))
+    if pygame.display.get_surface():
+        sprite = sprite.convert_alpha()
+    _icon_sprites[key] = sprite
+    return sprite
+
+def warm_icon_sprites(icon_types, sizes=ICON_SIZES):
+    """Render every selected/unselected tile up front so no frame pays for it"""
+    for icon_type in icon_types:
+        for size in sizes:
+            icon_sprite(icon_type, size, False)
+            icon_sprite(icon_type, size, True)
+
 # ============== DESKTOP ICONS ==============
 
 class DesktopIcon:
@@ -443,25 +1598,8 @@ class DesktopIcon:
         self.height = 64
     
     def draw(self, surface):
-        # Selection highlight
-        if self.selected:
-            pygame.draw.rect(surface, COLORS['selection'], 
-                (self.x, self.y, self.width, self.height - 16))
-        
-        # Draw icon based on type
-        icon_x = self.x + (self.width - 32) // 2
-        icon_y = self.y + 4
-        
-        if self.icon_type == 'cat':
-            draw_cat_icon(surface, icon_x, icon_y, 32)
-        elif self.icon_type == 'folder':
-            self.draw_folder_icon(surface, icon_x, icon_y)
-        elif self.icon_type == 'file':
-            self.draw_file_icon(surface, icon_x, icon_y)
-        elif self.icon_type == 'terminal':
-            self.draw_terminal_icon(surface, icon_x, icon_y)
-        elif self.icon_type == 'trash':
-            self.draw_trash_icon(surface, icon_x, icon_y)
+        # Icon and selection highlight
+        surface.blit(icon_sprite(self.icon_type, 32, self.selected), (self.x, self.y))
         
         # Draw label
         label_color = COLORS['white'] if self.selected else COLORS['white']
@@ -475,47 +1613,69 @@ class DesktopIcon:
             pygame.draw.rect(surface, label_bg, (text_x - 2, text_y - 1, text_w + 4, 10))
         draw_text(surface, self.name, text_x, text_y, label_color)
     
-    def draw_folder_icon(self, surface, x, y):
-        # Folder tab
-        pygame.draw.rect(surface, (255, 220, 100), (x, y + 4, 12, 6))
-        # Folder body
-        pygame.draw.rect(surface, (255, 200, 50), (x, y + 8, 32, 22))
-        pygame.draw.rect(surface, COLORS['black'], (x, y + 8, 32, 22), 1)
-    
-    def draw_file_icon(self, surface, x, y):
-        # Paper
-        pygame.draw.rect(surface, COLORS['white'], (x + 4, y, 24, 30))
-        pygame.draw.rect(surface, COLORS['black'], (x + 4, y, 24, 30), 1)
-        # Folded corner
-        pygame.draw.polygon(surface, COLORS['window_dark'], 
-            [(x + 20, y), (x + 28, y + 8), (x + 20, y + 8)])
-        # Lines
-        for i in range(4):
-            pygame.draw.line(surface, COLORS['window_dark'],
-                (x + 8, y + 12 + i * 5), (x + 24, y + 12 + i * 5))
-    
-    def draw_terminal_icon(self, surface, x, y):
-        # Terminal window
-        pygame.draw.rect(surface, COLORS['black'], (x, y, 32, 30))
-        pygame.draw.rect(surface, COLORS['window_dark'], (x, y, 32, 30), 1)
-        # Prompt
-        draw_text(surface, 'C:\\>', x + 2, y + 4, (0, 255, 0))
-        draw_text(surface, '_', x + 26, y + 4, (0, 255, 0))
-    
-    def draw_trash_icon(self, surface, x, y):
-        # Trash can
-        pygame.draw.rect(surface, COLORS['window_dark'], (x + 4, y + 6, 24, 24))
-        pygame.draw.rect(surface, COLORS['black'], (x + 4, y + 6, 24, 24), 1)
-        # Lid
-        pygame.draw.rect(surface, COLORS['window_dark'], (x + 2, y + 2, 28, 6))
-        pygame.draw.rect(surface, COLORS['black'], (x + 2, y + 2, 28, 6), 1)
-        # Handle
-        pygame.draw.rect(surface, COLORS['window_dark'], (x + 12, y, 8, 4))
-        pygame.draw.rect(surface, COLORS['black'], (x + 12, y, 8, 4), 1)
-    
     def contains_point(self, px, py):
         return (self.x <= px <= self.x + self.width and 
                 self.y <= py <= self.y + self.height)
+    
+    def get_rect(self):
+        """Everything draw() touches, including a label wider than the tile"""
+        text_w = get_text_width(self.name)
+        label = pygame.Rect(self.x + (self.width - text_w) // 2 - 2, self.y + 43, text_w + 4, 10)
+        return pygame.Rect(self.x, self.y, self.width, self.height).union(label)
+    
+    def set_selected(self, selected):
+        if self.selected != selected:
+            self.selected = selected
+            DAMAGE.add(self.get_rect())
+
+class DesktopLayer:
+    """Off-screen copy of the desktop background with every icon drawn on it.
+
+    Each frame starts from one blit of this surface. Only the tiles of icons
+    that were added, removed, moved or (de)selected since the last update()
+    are re-rendered; everything else is reused as is.
+    """
+    def __init__(self, icons):
+        self.icons = icons
+        self.surface = None
+        self.drawn = {}  # icon -> (rect, state) as last rendered
+    
+    def icon_state(self, icon):
+        return (icon.x, icon.y, icon.name, icon.icon_type, icon.selected)
+    
+    def update(self):
+        if self.surface is None:
+            self.surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+            if pygame.display.get_surface():
+                self.surface = self.surface.convert()
+            self.surface.fill(COLORS['desktop'])
+            for icon in self.icons:
+                icon.draw(self.surface)
+                self.drawn[icon] = (icon.get_rect(), self.icon_state(icon))
+            DAMAGE.add()
+            return
+        
+        stale = []
+        for icon, (rect, state) in list(self.drawn.items()):
+            if icon not in self.icons or self.icon_state(icon) != state:
+                stale.append(rect)
+                del self.drawn[icon]
+        for icon in self.icons:
+            if icon not in self.drawn:
+                rect = icon.get_rect()
+                stale.append(rect)
+                self.drawn[icon] = (rect, self.icon_state(icon))
+        for rect in stale:
+            self.repaint(rect)
+            DAMAGE.add(rect)
+    
+    def repaint(self, rect):
+        self.surface.set_clip(rect)
+        self.surface.fill(COLORS['desktop'])
+        for icon in self.icons:
+            if icon.get_rect().colliderect(rect):
+                icon.draw(self.surface)
+        self.surface.set_clip(None)
 
 # ============== MAIN APPLICATION ==============
 
@@ -525,6 +1685,10 @@ class CatOS:
         self.boot_start_time = None
         self.boot_phase = 0
         self.chime_played = False
+        self.chime_stream = None
+        self.boot_logo = None
+        self.boot_progress = None
+        start_chime_render()
         
         # Desktop icons
         self.icons = [
@@ -534,42 +1698,74 @@ class CatOS:
             DesktopIcon(20, 260, 'Terminal', 'terminal'),
             DesktopIcon(20, 340, 'Trash', 'trash'),
         ]
+        warm_icon_sprites({icon.icon_type for icon in self.icons})
+        self.desktop_layer = DesktopLayer(self.icons)
         
         # Windows
         self.windows = []
         self.show_start_menu = False
         
         # Clock
-        self.clock = pygame.time.Clock()
+        self.pacer = make_frame_pacer()
+        self.clock_text = None
+        
+        # Dirty-rectangle debugging
+        self.debug_dirty = DEBUG_DIRTY_RECTS
+        self.dirty_outlines = []  # (rect, expires)
+        self.profile_rect = None  # Where the profiler overlay was last drawn
     
     def run(self):
         running = True
-        self.boot_start_time = time.time()
+        self.boot_start_time = self.pacer.start()
         
         while running:
-            for event in pygame.event.get():
+            PROFILER.begin_frame()
+            with PROFILER.stage('events'):
+                events = self.pacer.get_events()
+            for event in events:
                 if event.type == pygame.QUIT:
                     running = False
                 elif event.type == pygame.MOUSEBUTTONDOWN:
-                    self.handle_click(event.pos, event.button)
+                    with PROFILER.stage('handle_click'):
+                        self.handle_click(event.pos, event.button)
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
                         running = False
+                    elif event.key == pygame.K_F9:
+                        self.toggle_debug_dirty()
+                    elif event.key == pygame.K_F10:
+                        self.toggle_profiler()
+            
+            if self.chime_stream and not self.chime_stream.update():
+                self.chime_stream = None
             
             if self.state == 'boot':
-                self.draw_boot_screen()
+                with PROFILER.stage('draw_boot_screen'):
+                    self.draw_boot_screen()
+                if PROFILER.enabled:
+                    self.draw_profile_overlay()
+                with PROFILER.stage('display'):
+                    pygame.display.flip()
             else:
-                self.draw_desktop()
-            
-            pygame.display.flip()
-            self.clock.tick(60)
+                with PROFILER.stage('draw_desktop'):
+                    dirty = self.draw_desktop()
+                if PROFILER.enabled:
+                    dirty.append(self.draw_profile_overlay())
+                if dirty:
+                    with PROFILER.stage('display'):
+                        pygame.display.update(dirty)
+            PROFILER.end_frame()
+            self.pacer.wait(self.is_animating(), self.next_wakeup())
         
+        self.pacer.close()
+        PROFILER.close()
         pygame.quit()
     
     def draw_boot_screen(self):
-        elapsed = time.time() - self.boot_start_time
+        elapsed = CLOCK.now - self.boot_start_time
         
         screen.fill((0, 0, 32))  # Dark blue boot screen
+        self.update_boot_chime(elapsed)
         
         if elapsed < 0.5:
             # Initial black
@@ -579,10 +1775,6 @@ class CatOS:
             alpha = min(255, int((elapsed - 0.5) * 255))
             self.draw_boot_logo(alpha)
         elif elapsed < 2.0:
-            # Play chime
-            if not self.chime_played:
-                play_boot_chime()
-                self.chime_played = True
             self.draw_boot_logo(255)
         elif elapsed < 5.5:
             # Show logo with progress
@@ -591,8 +1783,34 @@ class CatOS:
         else:
             # Transition to desktop
             self.state = 'desktop'
+            DAMAGE.add()
+    
+    def update_boot_chime(self, elapsed):
+        """Start the chime at its cue without ever blocking the frame"""
+        if self.chime_played or elapsed < CHIME_CUE_TIME:
+            return
+        if not chime_ready():
+            late = elapsed - CHIME_CUE_TIME
+            if CHIME_FALLBACK == 'stream' and NUMPY_AVAILABLE:
+                self.chime_stream = stream_boot_chime()
+            elif AUDIO_AVAILABLE and CHIME_FALLBACK != 'skip' and late < CHIME_MAX_DELAY:
+                return  # Try again next frame
+        else:
+            play_boot_chime(timeout=0)
+        self.chime_played = True
     
     def draw_boot_logo(self, alpha):
+        """Blit the pre-rendered logo, faded in over the boot background"""
+        if self.boot_logo is None:
+            self.boot_logo = self.render_boot_logo()
+        logo, pos = self.boot_logo
+        logo.set_alpha(alpha)
+        screen.blit(logo, pos)
+    
+    def render_boot_logo(self):
+        """Rasterize glow, cat and titles once; return (surface, screen position)"""
+        logo = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+        
         # Center position
         cx, cy = SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 60
         
@@ -603,83 +1821,77 @@ class CatOS:
         
         # Background glow
         for r in range(60, 0, -5):
-            glow_alpha = int(alpha * (60 - r) / 60 * 0.3)
+            glow_alpha = int(255 * (60 - r) / 60 * 0.3)
             glow_color = (glow_alpha, glow_alpha // 2, glow_alpha)
-            pygame.draw.circle(screen, glow_color, (cx, cy + 20), r + 60)
+            pygame.draw.circle(logo, glow_color, (cx, cy + 20), r + 60)
         
         # Large cat ears
         ear_h = size // 3
-        pygame.draw.polygon(screen, COLORS['cat_orange'],
+        pygame.draw.polygon(logo, COLORS['cat_orange'],
             [(x + size//4, y + ear_h), (x + size//3, y), (x + size//2 - 4, y + ear_h)])
-        pygame.draw.polygon(screen, COLORS['cat_orange'],
+        pygame.draw.polygon(logo, COLORS['cat_orange'],
             [(x + size//2 + 4, y + ear_h), (x + size*2//3, y), (x + size*3//4, y + ear_h)])
         
         # Inner ears
-        pygame.draw.polygon(screen, COLORS['cat_pink'],
+        pygame.draw.polygon(logo, COLORS['cat_pink'],
             [(x + size//3 + 4, y + ear_h - 4), (x + size//3 + 8, y + 12), (x + size//2 - 10, y + ear_h - 4)])
-        pygame.draw.polygon(screen, COLORS['cat_pink'],
+        pygame.draw.polygon(logo, COLORS['cat_pink'],
             [(x + size//2 + 10, y + ear_h - 4), (x + size*2//3 - 8, y + 12), (x + size*2//3 - 4, y + ear_h - 4)])
         
         # Face
-        pygame.draw.ellipse(screen, COLORS['cat_orange'], (x + 4, y + ear_h - 10, size - 8, size - ear_h + 20))
+        pygame.draw.ellipse(logo, COLORS['cat_orange'], (x + 4, y + ear_h - 10, size - 8, size - ear_h + 20))
         
         # Eyes
         eye_y = y + size // 2 + 10
-        pygame.draw.ellipse(screen, COLORS['black'], (x + size//4, eye_y - 8, 20, 24))
-        pygame.draw.ellipse(screen, COLORS['black'], (x + size*3//4 - 20, eye_y - 8, 20, 24))
+        pygame.draw.ellipse(logo, COLORS['black'], (x + size//4, eye_y - 8, 20, 24))
+        pygame.draw.ellipse(logo, COLORS['black'], (x + size*3//4 - 20, eye_y - 8, 20, 24))
         # Pupils/highlights
-        pygame.draw.circle(screen, COLORS['white'], (x + size//4 + 6, eye_y - 2), 5)
-        pygame.draw.circle(screen, COLORS['white'], (x + size*3//4 - 14, eye_y - 2), 5)
+        pygame.draw.circle(logo, COLORS['white'], (x + size//4 + 6, eye_y - 2), 5)
+        pygame.draw.circle(logo, COLORS['white'], (x + size*3//4 - 14, eye_y - 2), 5)
         
         # Nose
-        pygame.draw.polygon(screen, COLORS['cat_pink'],
+        pygame.draw.polygon(logo, COLORS['cat_pink'],
             [(cx, eye_y + 18), (cx - 10, eye_y + 28), (cx + 10, eye_y + 28)])
         
         # Mouth
-        pygame.draw.arc(screen, COLORS['black'], (cx - 20, eye_y + 24, 20, 14), 3.14, 0, 2)
-        pygame.draw.arc(screen, COLORS['black'], (cx, eye_y + 24, 20, 14), 3.14, 0, 2)
+        pygame.draw.arc(logo, COLORS['black'], (cx - 20, eye_y + 24, 20, 14), 3.14, 0, 2)
+        pygame.draw.arc(logo, COLORS['black'], (cx, eye_y + 24, 20, 14), 3.14, 0, 2)
         
         # Whiskers
         for i in range(3):
             offset = (i - 1) * 8
-            pygame.draw.line(screen, (180, 180, 180),
+            pygame.draw.line(logo, (180, 180, 180),
                 (x + 10, eye_y + 30 + offset), (x - 30, eye_y + 25 + offset * 2), 1)
-            pygame.draw.line(screen, (180, 180, 180),
+            pygame.draw.line(logo, (180, 180, 180),
                 (x + size - 10, eye_y + 30 + offset), (x + size + 30, eye_y + 25 + offset * 2), 1)
         
         # Title
         title = "CAT OS 1.X"
         title_x = cx - get_text_width(title, 3) // 2
-        draw_text(screen, title, title_x, cy + 100, COLORS['white'], 3)
+        draw_text(logo, title, title_x, cy + 100, COLORS['white'], 3)
         
         # Subtitle
         subtitle = "BY TEAM FLAMES / SAMSOFT"
         sub_x = cx - get_text_width(subtitle) // 2
-        draw_text(screen, subtitle, sub_x, cy + 140, COLORS['window_dark'])
+        draw_text(logo, subtitle, sub_x, cy + 140, COLORS['window_dark'])
+        
+        # Keep only the painted area so each frame blits as few pixels as possible
+        bounds = logo.get_bounding_rect()
+        logo = logo.subsurface(bounds).copy()
+        if pygame.display.get_surface():
+            logo = logo.convert_alpha()
+        return logo, bounds.topleft
     
     def draw_boot_progress(self, elapsed):
         cx = SCREEN_WIDTH // 2
         cy = SCREEN_HEIGHT // 2 + 180
         
-        # Progress bar background
-        bar_width = 300
-        bar_height = 20
-        bar_x = cx - bar_width // 2
-        
-        pygame.draw.rect(screen, COLORS['window_shadow'], (bar_x - 2, cy - 2, bar_width + 4, bar_height + 4))
-        pygame.draw.rect(screen, COLORS['black'], (bar_x, cy, bar_width, bar_height))
-        
-        # Progress fill
+        # Progress bar
+        if self.boot_progress is None:
+            self.boot_progress = ProgressBar((cx - 150, cy, 300, 20))
         progress = min(1.0, elapsed / 3.5)
-        fill_width = int(bar_width * progress)
-        
-        # Gradient fill
-        for i in range(fill_width):
-            t = i / bar_width
-            r = int(100 + 155 * t)
-            g = int(150 + 105 * t)
-            b = int(200 - 100 * t)
-            pygame.draw.line(screen, (r, g, b), (bar_x + i, cy + 2), (bar_x + i, cy + bar_height - 2))
+        self.boot_progress.set_progress(progress)
+        self.boot_progress.draw(screen)
         
         # Status text
         messages = ["Starting Cat OS...", "Loading drivers...", "Initializing meow engine...", 
@@ -690,23 +1902,124 @@ class CatOS:
         draw_text(screen, msg, msg_x, cy + 30, COLORS['window_dark'])
     
     def draw_desktop(self):
-        # Desktop background
-        screen.fill(COLORS['desktop'])
+        """Repaint whatever was invalidated since the last frame.
+
+        Returns the rects that changed on screen, for display.update().
+        """
+        self.update_clock()
+        self.desktop_layer.update()
+        dirty = DAMAGE.take(self.get_unclippable_rects())
+        if self.debug_dirty:
+            dirty += self.expire_dirty_outlines()
         
-        # Draw icons
-        for icon in self.icons:
-            icon.draw(screen)
+        for rect in dirty:
+            screen.set_clip(rect)
+            self.paint_desktop(rect)
+        screen.set_clip(None)
+        
+        if self.debug_dirty and dirty:
+            self.outline_dirty(dirty)
+        return dirty
+    
+    def paint_desktop(self, clip):
+        """Draw every layer that overlaps `clip`, back to front"""
+        # Desktop background and icons
+        screen.blit(self.desktop_layer.surface, clip, clip)
         
-        # Draw windows
+        # Draw windows, each clipped to its own frame
         for window in self.windows:
-            self.draw_window_content(window)
+            rect = clip.clip(window['rect'])
+            if rect.w and rect.h:
+                screen.set_clip(rect)
+                with PROFILER.stage('window:' + window['title']):
+                    self.draw_window_content(window)
+        screen.set_clip(clip)
         
         # Draw taskbar
-        self.draw_taskbar()
+        if self.get_taskbar_rect().colliderect(clip):
+            with PROFILER.stage('draw_taskbar'):
+                self.draw_taskbar()
         
         # Draw start menu if open
-        if self.show_start_menu:
-            self.draw_start_menu()
+        if self.show_start_menu and self.get_start_menu_rect().colliderect(clip):
+            with PROFILER.stage('draw_start_menu'):
+                self.draw_start_menu()
+    
+    def is_animating(self):
+        """True while frames must keep coming without any input"""
+        return self.state == 'boot' or self.chime_stream is not None or bool(DAMAGE.rects)
+    
+    def next_wakeup(self):
+        """CLOCK time at which the desktop next changes on its own"""
+        now = CLOCK.now
+        wake = [now - now % 60 + 60]  # Taskbar clock minute
+        wake.extend(expires for _, expires in self.dirty_outlines)
+        return min(wake)
+    
+    def update_clock(self):
+        time_str = datetime.fromtimestamp(CLOCK.now).strftime('%H:%M')
+        if time_str != self.clock_text:
+            self.clock_text = time_str
+            DAMAGE.add(self.get_clock_rect())
+    
+    def toggle_debug_dirty(self):
+        self.debug_dirty = not self.debug_dirty
+        self.dirty_outlines = []
+        DAMAGE.add()
+    
+    def expire_dirty_outlines(self):
+        """Drop outlines older than DEBUG_DIRTY_HOLD; return the areas to clean up"""
+        now = CLOCK.now
+        expired = [rect for rect, expires in self.dirty_outlines if expires <= now]
+        self.dirty_outlines = [(rect, expires) for rect, expires in self.dirty_outlines if expires > now]
+        return expired
+    
+    def outline_dirty(self, dirty):
+        expires = CLOCK.now + DEBUG_DIRTY_HOLD
+        self.dirty_outlines.extend((rect, expires) for rect in dirty)
+        for rect, _ in self.dirty_outlines:
+            draw_outline(screen, DEBUG_DIRTY_COLOR, rect)
+    
+    def toggle_profiler(self):
+        PROFILER.set_enabled(not PROFILER.enabled)
+        if self.profile_rect:
+            DAMAGE.add(self.profile_rect)
+            self.profile_rect = None
+    
+    def draw_profile_overlay(self):
+        """Draw the per-stage timing table over the screen; return its rect"""
+        lines = [f"{'STAGE (MS)':16} {'P50':>6} {'P95':>6} {'P99':>6}"]
+        for name, p50, p95, p99 in PROFILER.get_summary():
+            lines.append(f"{name[:16]:16} {p50:6.2f} {p95:6.2f} {p99:6.2f}")
+        w = get_text_width(lines[0]) + 8
+        rect = pygame.Rect(SCREEN_WIDTH - w - 8, 8, w, len(lines) * 10 + 6)
+        if self.profile_rect and self.profile_rect != rect:
+            DAMAGE.add(self.profile_rect)
+        self.profile_rect = rect
+        pygame.draw.rect(screen, COLORS['black'], rect)
+        for i, line in enumerate(lines):
+            draw_text(screen, line, rect.x + 4, rect.y + 4 + i * 10, COLORS['white'])
+        return rect
+    
+    def get_taskbar_rect(self):
+        return pygame.Rect(0, SCREEN_HEIGHT - 32, SCREEN_WIDTH, 32)
+    
+    def get_start_button_rect(self):
+        return pygame.Rect(4, SCREEN_HEIGHT - 28, 60, 24)
+    
+    def get_clock_rect(self):
+        return pygame.Rect(SCREEN_WIDTH - 70, SCREEN_HEIGHT - 28, 66, 24)
+    
+    def get_start_menu_rect(self):
+        return pygame.Rect(4, SCREEN_HEIGHT - 32 - 180, 160, 180)
+    
+    def get_unclippable_rects(self):
+        """Close buttons: their diagonal lines must be redrawn whole"""
+        rects = []
+        for window in self.windows:
+            x, y, w, h = window['rect']
+            rects.append(pygame.Rect(x + w - 18, y + 5, 14, 14))
+        return rects
     
     def draw_taskbar(self):
         # Taskbar background
@@ -714,25 +2027,18 @@ class CatOS:
         draw_3d_rect(screen, taskbar_rect, True)
         
         # Start button
-        start_rect = (4, SCREEN_HEIGHT - 28, 60, 24)
+        start_rect = self.get_start_button_rect()
         draw_button(screen, start_rect, 'START', self.show_start_menu)
         
         # Draw cat icon on start button
         draw_cat_icon_mini(screen, 8, SCREEN_HEIGHT - 26)
         
         # Clock area
-        clock_rect = (SCREEN_WIDTH - 70, SCREEN_HEIGHT - 28, 66, 24)
-        draw_3d_rect(screen, clock_rect, False)
-        
-        now = datetime.now()
-        time_str = now.strftime('%H:%M')
-        draw_text(screen, time_str, SCREEN_WIDTH - 58, SCREEN_HEIGHT - 22, COLORS['black'])
+        draw_3d_rect(screen, self.get_clock_rect(), False)
+        draw_text(screen, self.clock_text, SCREEN_WIDTH - 58, SCREEN_HEIGHT - 22, COLORS['black'])
     
     def draw_start_menu(self):
-        menu_x = 4
-        menu_y = SCREEN_HEIGHT - 32 - 180
-        menu_w = 160
-        menu_h = 180
+        menu_x, menu_y, menu_w, menu_h = self.get_start_menu_rect()
         
         # Menu background
         pygame.draw.rect(screen, COLORS['window_bg'], (menu_x, menu_y, menu_w, menu_h))
@@ -774,20 +2080,19 @@ class CatOS:
         
         # Check start button
         if 4 <= mx <= 64 and SCREEN_HEIGHT - 28 <= my <= SCREEN_HEIGHT - 4:
-            self.show_start_menu = not self.show_start_menu
+            self.set_start_menu(not self.show_start_menu)
             return
         
         # Close start menu if clicking elsewhere
         if self.show_start_menu:
-            self.show_start_menu = False
+            self.set_start_menu(False)
         
         # Check icons
         for icon in self.icons:
             if icon.contains_point(mx, my):
                 # Deselect others
                 for other in self.icons:
-                    other.selected = False
-                icon.selected = True
+                    other.set_selected(other is icon)
                 
                 # Double click would open
                 if button == 1:
@@ -796,7 +2101,13 @@ class CatOS:
         
         # Deselect all if clicking empty space
         for icon in self.icons:
-            icon.selected = False
+            icon.set_selected(False)
+    
+    def set_start_menu(self, show):
+        if self.show_start_menu != show:
+            self.show_start_menu = show
+            DAMAGE.add(self.get_start_menu_rect())
+            DAMAGE.add(self.get_start_button_rect())
     
     def open_icon(self, icon):
         """Open a window for the icon"""
@@ -829,10 +2140,11 @@ class CatOS:
             'content': content,
             'active': True
         })
+        DAMAGE.add(self.windows[-1]['rect'])
         
         # Only keep last 3 windows
         if len(self.windows) > 3:
-            self.windows.pop(0)
+            DAMAGE.add(self.windows.pop(0)['rect'])
 
 # ============== ENTRY POINT ==============
 
@@ -844,5 +2156,5 @@ if __name__ == '__main__':
     print("\nStarting Cat OS...")
     print("Press ESC to exit\n")
     
-    os = CatOS()
-    os.run()
+    cat_os = CatOS()
+    cat_os.run()
@@ -19,14 +19,33 @@ import pygame
 import pygame.gfxdraw
 import math
 import random
+import array
+import bisect
+import sys
+import os
+import hashlib
+import json
+import mmap
 import struct
+import threading
 import time
+import concurrent.futures
+from collections import OrderedDict, deque
 from datetime import datetime
 
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
 pygame.init()
 AUDIO_AVAILABLE = False
+MIXER_RATE, MIXER_CHANNELS = 44100, 2
 try:
     pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
+    MIXER_RATE, _, MIXER_CHANNELS = pygame.mixer.get_init()
     AUDIO_AVAILABLE = True
 except:
     print("Audio not available - running without sound")
@@ -62,113 +81,645 @@ COLORS = {
 }
 
 # ============== PROCEDURAL AUDIO ==============
-def generate_sine_wave(freq, duration, volume=0.3, sample_rate=44100):
-    samples = int(sample_rate * duration)
-    wave = []
-    for i in range(samples):
-        t = i / sample_rate
-        value = math.sin(2 * math.pi * freq * t) * volume
-        wave.append(value)
-    return wave
+# Synthesis works on whole buffers: NumPy float64 arrays when NumPy is
+# installed, plain lists otherwise. Every voice runs on an Oscillator: a
+# phase accumulator stepping through a one-cycle wavetable with linear
+# interpolation, so a sample costs a table lookup instead of a sin() call
+# however many partials the table holds. Vibrato/FM and tremolo are LFO
+# Oscillators feeding the phase increment and the gain, which keeps
+# modulated pitch phase-continuous. With 4096-entry tables the sine is within
+# 3e-7 of math.sin, i.e. at most 1 LSB in the 16-bit output; envelopes and
+# mixes repeat the original per-sample arithmetic in the same order, so they
+# are bit-identical. Voices are mixed as (buffer, offset, gain) events that
+# only touch their own time window, so leading silence costs nothing. The
+# generate_* / mix_waves list API is a thin wrapper on top.
+WAVETABLE_SIZE = 4096
 
-def generate_envelope(samples, attack=0.1, decay=0.1, sustain=0.7, release=0.2):
-    total = len(samples)
-    envelope = []
+_wavetables = {}
+
+def make_wavetable(harmonics):
+    if NUMPY_AVAILABLE:
+        phase = np.arange(WAVETABLE_SIZE + 1) * (2 * math.pi / WAVETABLE_SIZE)
+        table = sum(amp * np.sin(k * phase) for k, amp in enumerate(harmonics, 1) if amp)
+        return table / np.abs(table).max()
+    table = [sum(amp * math.sin(k * i * 2 * math.pi / WAVETABLE_SIZE)
+                 for k, amp in enumerate(harmonics, 1) if amp)
+             for i in range(WAVETABLE_SIZE + 1)]
+    peak = max(abs(v) for v in table)
+    return [v / peak for v in table]
+
+def wavetable(shape):
+    if shape not in _wavetables:
+        harmonics = {
+            'sine': (1,),
+            'saw': [(-1) ** (k + 1) / k for k in range(1, 65)],
+            'square': [1 / k if k % 2 else 0 for k in range(1, 65)],
+        }[shape]
+        _wavetables[shape] = make_wavetable(harmonics)
+    return _wavetables[shape]
+
+# vibrato=(rate_hz, depth) scales the frequency by 1 + depth * lfo;
+# tremolo=(rate_hz, depth) scales the output by 1 - depth + depth * lfo.
+# render() continues from where the previous call stopped.
+class Oscillator:
+    def __init__(self, freq, sample_rate=44100, shape='sine', volume=1.0,
+                 vibrato=None, tremolo=None):
+        self.freq = freq
+        self.sample_rate = sample_rate
+        self.table = wavetable(shape) if isinstance(shape, str) else shape
+        self.volume = volume
+        self.phase = 0.0
+        self.vibrato = self.vibrato_depth = self.tremolo = self.tremolo_depth = None
+        if vibrato:
+            self.vibrato = Oscillator(vibrato[0], sample_rate)
+            self.vibrato_depth = vibrato[1]
+        if tremolo:
+            self.tremolo = Oscillator(tremolo[0], sample_rate)
+            self.tremolo_depth = tremolo[1]
+    
+    def render(self, frames):
+        step = self.freq / self.sample_rate
+        vibrato = self.vibrato.render(frames) if self.vibrato else None
+        tremolo = self.tremolo.render(frames) if self.tremolo else None
+        
+        if NUMPY_AVAILABLE:
+            if vibrato is None:
+                phases = self.phase + np.arange(frames) * step
+                self.phase = (self.phase + frames * step) % 1.0
+            else:
+                steps = step * (1 + self.vibrato_depth * vibrato)
+                phases = np.cumsum(steps)
+                phases -= steps
+                phases += self.phase
+                self.phase = (phases[-1] + steps[-1]) % 1.0 if frames else self.phase
+            pos = (phases % 1.0) * WAVETABLE_SIZE
+            idx = pos.astype(np.intp)
+            out = self.table[idx]
+            out += (pos - idx) * (self.table[idx + 1] - out)
+            out *= self.volume
+            if tremolo is not None:
+                out *= (1 - self.tremolo_depth) + self.tremolo_depth * tremolo
+            return out
+        
+        table, size, volume = self.table, WAVETABLE_SIZE, self.volume
+        phase = self.phase
+        out = [0.0] * frames
+        for i in range(frames):
+            pos = phase * size
+            k = int(pos)
+            value = (table[k] + (pos - k) * (table[k + 1] - table[k])) * volume
+            if tremolo is not None:
+                value *= (1 - self.tremolo_depth) + self.tremolo_depth * tremolo[i]
+            out[i] = value
+            phase += step if vibrato is None else step * (1 + self.vibrato_depth * vibrato[i])
+            phase -= int(phase)
+        self.phase = phase
+        return out
+
+def render_sine(freq, duration, volume=0.3, sample_rate=44100):
+    return Oscillator(freq, sample_rate, volume=volume).render(int(sample_rate * duration))
+
+def render_envelope(total, attack=0.1, decay=0.1, sustain=0.7, release=0.2):
     attack_samples = int(total * attack)
     decay_samples = int(total * decay)
     release_samples = int(total * release)
-    sustain_samples = total - attack_samples - decay_samples - release_samples
+    sustain_samples = max(0, total - attack_samples - decay_samples - release_samples)
     
+    if NUMPY_AVAILABLE:
+        envelope = np.concatenate((
+            np.arange(attack_samples) / max(1, attack_samples),
+            1.0 - (1.0 - sustain) * (np.arange(decay_samples) / max(1, decay_samples)),
+            np.full(sustain_samples, float(sustain)),
+            sustain * (1.0 - np.arange(release_samples) / max(1, release_samples)),
+        ))
+        if len(envelope) < total:
+            envelope = np.concatenate((envelope, np.zeros(total - len(envelope))))
+        return envelope[:total]
+    
+    envelope = []
     for i in range(attack_samples):
         envelope.append(i / max(1, attack_samples))
     for i in range(decay_samples):
         envelope.append(1.0 - (1.0 - sustain) * (i / max(1, decay_samples)))
-    for i in range(max(0, sustain_samples)):
+    for i in range(sustain_samples):
         envelope.append(sustain)
     for i in range(release_samples):
         envelope.append(sustain * (1.0 - i / max(1, release_samples)))
-    
     while len(envelope) < total:
         envelope.append(0)
-    
-    return [samples[i] * envelope[i] for i in range(min(len(samples), len(envelope)))]
+    return envelope[:total]
+
+def apply_envelope(samples, attack=0.1, decay=0.1, sustain=0.7, release=0.2):
+    envelope = render_envelope(len(samples), attack, decay, sustain, release)
+    if NUMPY_AVAILABLE:
+        return np.asarray(samples, dtype=float) * envelope
+    return [samples[i] * envelope[i] for i in range(len(samples))]
+
+def sum_events(events):
+    length = max((offset + len(buf) for buf, offset, _ in events), default=0)
+    if NUMPY_AVAILABLE:
+        result = np.zeros(length)
+        for buf, offset, gain in events:
+            window = result[offset:offset + len(buf)]
+            window += buf if gain == 1 else np.multiply(buf, gain)
+        return result
+    result = [0.0] * length
+    for buf, offset, gain in events:
+        for i, sample in enumerate(buf, offset):
+            result[i] += sample if gain == 1 else sample * gain
+    return result
+
+def peak_of(buf):
+    if NUMPY_AVAILABLE:
+        return np.abs(buf).max() if len(buf) else 0
+    return max((abs(s) for s in buf), default=0)
+
+def normalize(buf, peak, level=0.8):
+    if NUMPY_AVAILABLE:
+        return buf / (peak or 1) * level
+    return [s / (peak or 1) * level for s in buf]
+
+def render_events(events):
+    result = sum_events(events)
+    return normalize(result, peak_of(result))
+
+def render_mix(*buffers):
+    return render_events([(buf, 0, 1) for buf in buffers])
+
+def to_list(buf):
+    return buf.tolist() if NUMPY_AVAILABLE else list(buf)
+
+def encode_pcm(samples, channels=2):
+    if NUMPY_AVAILABLE:
+        scaled = np.multiply(samples, 32767)
+        np.clip(scaled, -32768, 32767, out=scaled)
+        pcm = np.empty((len(scaled), channels), dtype='<i2')
+        pcm[:] = scaled[:, None]  # Float to int16 truncates like int()
+        return memoryview(pcm).cast('B')
+    quantized = array.array('h', [max(-32768, min(32767, int(s * 32767))) for s in samples])
+    pcm = array.array('h', bytes(2 * channels * len(quantized)))
+    for channel in range(channels):
+        pcm[channel::channels] = quantized
+    if sys.byteorder == 'big':
+        pcm.byteswap()
+    return memoryview(pcm).cast('B')
+
+def generate_sine_wave(freq, duration, volume=0.3, sample_rate=44100):
+    return to_list(render_sine(freq, duration, volume, sample_rate))
+
+def generate_envelope(samples, attack=0.1, decay=0.1, sustain=0.7, release=0.2):
+    return to_list(apply_envelope(samples, attack, decay, sustain, release))
 
 def mix_waves(*waves):
-    max_len = max(len(w) for w in waves) if waves else 0
-    result = [0.0] * max_len
-    for wave in waves:
-        for i, sample in enumerate(wave):
-            result[i] += sample
-    max_val = max(abs(s) for s in result) if result else 1
-    if max_val == 0:
-        max_val = 1
-    return [s / max_val * 0.8 for s in result]
-
-def generate_vista_chime():
-    sample_rate = 44100
-    pad_g = generate_envelope(generate_sine_wave(196.00, 3.5, 0.15), 0.3, 0.1, 0.5, 0.3)
-    pad_b = generate_envelope(generate_sine_wave(246.94, 3.5, 0.12), 0.35, 0.1, 0.5, 0.3)
-    pad_d = generate_envelope(generate_sine_wave(293.66, 3.5, 0.12), 0.4, 0.1, 0.5, 0.3)
-    pad_a = generate_envelope(generate_sine_wave(220.00, 3.5, 0.08), 0.45, 0.1, 0.5, 0.3)
-    
-    def bell_tone(freq, start_time, duration=0.8):
-        wave = generate_sine_wave(freq, duration, 0.25)
-        h2 = generate_sine_wave(freq * 2, duration, 0.1)
-        h3 = generate_sine_wave(freq * 3, duration, 0.05)
-        combined = mix_waves(wave, h2, h3)
-        combined = generate_envelope(combined, 0.01, 0.15, 0.3, 0.54)
-        silence_before = [0.0] * int(sample_rate * start_time)
-        return silence_before + combined
-    
-    melody1 = bell_tone(392.00, 0.0, 0.9)
-    melody2 = bell_tone(493.88, 0.4, 0.9)
-    melody3 = bell_tone(587.33, 0.8, 0.9)
-    melody4 = bell_tone(783.99, 1.2, 1.2)
-    
-    sub = generate_envelope(generate_sine_wave(98.00, 3.0, 0.1), 0.5, 0.1, 0.3, 0.3)
-    
-    final = mix_waves(pad_g, pad_b, pad_d, pad_a, melody1, melody2, melody3, melody4, sub)
-    
-    stereo_data = []
-    for sample in final:
-        val = int(sample * 32767)
-        val = max(-32768, min(32767, val))
-        stereo_data.append(struct.pack('<hh', val, val))
-    
-    return b''.join(stereo_data)
-
-def generate_click_sound():
-    sample_rate = 44100
-    wave = generate_sine_wave(800, 0.05, 0.3)
-    wave = generate_envelope(wave, 0.01, 0.1, 0.2, 0.69)
-    stereo_data = []
-    for sample in wave:
-        val = int(sample * 32767)
-        val = max(-32768, min(32767, val))
-        stereo_data.append(struct.pack('<hh', val, val))
-    return b''.join(stereo_data)
-
-def play_boot_chime():
+    return to_list(render_mix(*waves))
+
+# Synthesis parameters; these tables also key the on-disk PCM cache.
+# Pads and sub: (freq, duration, volume, attack, decay, sustain, release).
+# Bells: (freq, start, duration), played through one wavetable holding the
+# bell_harmonics partials.
+VISTA_CHIME = {
+    'sample_rate': MIXER_RATE,
+    'channels': MIXER_CHANNELS,
+    'pads': (
+        (196.00, 3.5, 0.15, 0.3, 0.1, 0.5, 0.3),
+        (246.94, 3.5, 0.12, 0.35, 0.1, 0.5, 0.3),
+        (293.66, 3.5, 0.12, 0.4, 0.1, 0.5, 0.3),
+        (220.00, 3.5, 0.08, 0.45, 0.1, 0.5, 0.3),
+    ),
+    'bells': ((392.00, 0.0, 0.9), (493.88, 0.4, 0.9), (587.33, 0.8, 0.9), (783.99, 1.2, 1.2)),
+    'bell_harmonics': (0.25, 0.1, 0.05),
+    'bell_envelope': (0.01, 0.15, 0.3, 0.54),
+    'sub': (98.00, 3.0, 0.1, 0.5, 0.1, 0.3, 0.3),
+}
+
+CLICK_SOUND = {
+    'sample_rate': MIXER_RATE,
+    'channels': MIXER_CHANNELS,
+    'tone': (800, 0.05, 0.3, 0.01, 0.1, 0.2, 0.69),
+}
+
+def chime_voices(params=VISTA_CHIME):
+    sample_rate = params['sample_rate']
+    voices = []
+    for freq, duration, volume, *adsr in params['pads'] + (params['sub'],):
+        voices.append((0, int(sample_rate * duration), volume, adsr,
+                       Oscillator(freq, sample_rate, volume=volume)))
+    bell_table = make_wavetable(params['bell_harmonics'])
+    for freq, start, duration in params['bells']:
+        voices.append((int(sample_rate * start), int(sample_rate * duration), 0.8,
+                       params['bell_envelope'],
+                       Oscillator(freq, sample_rate, bell_table, volume=0.8)))
+    return voices
+
+def chime_mix(params=VISTA_CHIME, cancel=None):
+    events = []
+    for start, frames, _, adsr, oscillator in chime_voices(params):
+        if cancel is not None and cancel.is_set():
+            return None  # Given up on part way through
+        events.append((apply_envelope(oscillator.render(frames), *adsr), start, 1))
+    return sum_events(events)
+
+def generate_vista_chime(params=VISTA_CHIME):
+    mix = chime_mix(params)
+    return encode_pcm(normalize(mix, peak_of(mix)), params['channels'])
+
+def generate_click_sound(params=CLICK_SOUND):
+    freq, duration, volume, *adsr = params['tone']
+    wave = render_sine(freq, duration, volume, params['sample_rate'])
+    wave = apply_envelope(wave, *adsr)
+    return encode_pcm(wave, params['channels'])
+
+# ============== STREAMING SYNTHESIS ==============
+# The streaming path renders the chime in fixed-size blocks so playback can
+# start as soon as the first block exists, holding only a few blocks in
+# memory. Each voice's Oscillator keeps its phase from one block to the
+# next, so a block only renders the voices it overlaps. The
+# full render normalizes by the mix's true peak, which isn't known until the
+# end. Every full render caches that peak next to its PCM (see cached_peak)
+# and streaming normalizes by it too, so both play at the same level; until
+# one has, streaming uses the peak of the summed voice envelopes instead, a
+# safe upper bound that comes out about 2.5 dB quieter.
+STREAM_BLOCK_FRAMES = 2048
+
+def envelope_at(total, attack, decay, sustain, release, idx):
+    attack_samples = int(total * attack)
+    decay_samples = int(total * decay)
+    release_samples = int(total * release)
+    sustain_end = attack_samples + decay_samples + max(0, total - attack_samples - decay_samples - release_samples)
+    idx = np.asarray(idx)
+    return np.select(
+        [idx < attack_samples,
+         idx < attack_samples + decay_samples,
+         idx < sustain_end,
+         idx < sustain_end + release_samples],
+        [idx / max(1, attack_samples),
+         1.0 - (1.0 - sustain) * ((idx - attack_samples) / max(1, decay_samples)),
+         float(sustain),
+         sustain * (1.0 - (idx - sustain_end) / max(1, release_samples))],
+        0.0)
+
+def voices_peak_bound(voices):
+    points = set()
+    for start, frames, _, adsr, _ in voices:
+        a = int(frames * adsr[0])
+        d = int(frames * adsr[1])
+        r = int(frames * adsr[3])
+        for p in (0, a, a + d, frames - r - 1, frames - r, frames - 1):
+            points.add(start + max(0, min(frames - 1, p)))
+    points = np.array(sorted(points))
+    total = np.zeros(len(points))
+    for start, frames, peak, adsr, _ in voices:
+        inside = (points >= start) & (points < start + frames)
+        total[inside] += peak * envelope_at(frames, *adsr, points[inside] - start)
+    return total.max() or 1
+
+def stream_vista_chime(params=VISTA_CHIME, block_frames=STREAM_BLOCK_FRAMES, peaks=None, peak=None):
+    voices = chime_voices(params)
+    gain = 0.8 / (peak or voices_peak_bound(voices))
+    length = max(start + frames for start, frames, _, _, _ in voices)
+    for block_start in range(0, length, block_frames):
+        block_end = min(length, block_start + block_frames)
+        block = np.zeros(block_end - block_start)
+        for start, frames, _, adsr, oscillator in voices:
+            lo, hi = max(block_start, start), min(block_end, start + frames)
+            if lo < hi:
+                idx = np.arange(lo - start, hi - start)
+                block[lo - block_start:hi - block_start] += oscillator.render(hi - lo) * envelope_at(frames, *adsr, idx)
+        if peaks is not None:
+            peaks.append(peak_of(block))
+        block *= gain
+        yield encode_pcm(block, params['channels'])
+
+# An audio failure is reported once per call site; the desktop carries on
+# without that sound.
+_reported_audio_errors = set()
+
+def report_audio_error(where, error):
+    if where not in _reported_audio_errors:
+        _reported_audio_errors.add(where)
+        print(f"Audio error in {where}: {error!r} - continuing without sound")
+
+# Plays PCM blocks from a generator on one channel, keeping one queued ahead;
+# update() returns False once the last block has been queued.
+class SoundStream:
+    def __init__(self, blocks):
+        self.blocks = blocks
+        self.channel = None
+    
+    def start(self):
+        first = next(self.blocks, None)
+        # Sound.play() leaves the UI pool's reserved channels alone
+        self.channel = pygame.mixer.Sound(buffer=first).play() if first is not None else None
+        if self.channel is None:
+            self.blocks = None
+            return self
+        self.update()
+        return self
+    
+    def update(self):
+        if self.blocks is None:
+            return False
+        if self.channel.get_queue() is None:
+            try:
+                block = next(self.blocks, None)
+                if block is not None:
+                    self.channel.queue(pygame.mixer.Sound(buffer=block))
+            except Exception as error:
+                report_audio_error('SoundStream.update', error)
+                block = None  # A block that fails to render ends the stream
+            if block is None:
+                self.blocks = None
+                return False
+        return True
+
+# ============== PCM CACHE ==============
+# Rendered sounds are kept as raw 16-bit PCM in SOUND_CACHE_DIR, named by a
+# hash of their parameters (plus SYNTH_VERSION, bumped whenever synthesis
+# code changes its output), and memory-mapped on later runs so a warm start
+# does no synthesis. A new parameter set simply gets a new file; stale and
+# least recently used files go once the cache passes SOUND_CACHE_MAX_BYTES.
+# The chime also leaves a few-byte .peak file with its mix's peak before
+# normalization; those are never evicted, so a chime that has to stream
+# still knows its level once its PCM is gone.
+SYNTH_VERSION = 2
+SOUND_CACHE_DIR = os.environ.get('CATOS_SOUND_CACHE') or os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'catos', 'sounds')
+SOUND_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+_loaded_pcm = {}
+
+def sound_cache_key(name, params):
+    blob = repr((SYNTH_VERSION, name, sorted(params.items()))).encode()
+    return hashlib.sha1(blob).hexdigest()[:16]
+
+def cached_pcm(name, params, render):
+    key = sound_cache_key(name, params)
+    if key in _loaded_pcm:
+        return _loaded_pcm[key]
+    path = os.path.join(SOUND_CACHE_DIR, f'{name}-{key}.pcm')
+    data = _map_pcm(path, 2 * params['channels'])
+    if data is None:
+        data = render(params)
+        if data is None:
+            return None
+        _store_pcm(path, data)
+    _loaded_pcm[key] = data
+    return data
+
+def _map_pcm(path, frame_bytes):
+    try:
+        with open(path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(data) % frame_bytes:
+        data.close()
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return data
+
+def _store_pcm(path, data):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(SOUND_CACHE_DIR, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+    except OSError:
+        return
+    _commit_pcm(tmp_path, path)
+
+def _commit_pcm(tmp_path, path):
+    try:
+        if path is None:
+            os.remove(tmp_path)
+            return
+        os.replace(tmp_path, path)
+        _evict_pcm()
+    except OSError:
+        pass
+
+def cached_peak(name, params):
+    try:
+        with open(os.path.join(SOUND_CACHE_DIR, f'{name}-{sound_cache_key(name, params)}.peak')) as f:
+            return float(f.read())
+    except (OSError, ValueError):
+        return None
+
+def _store_peak(name, params, peak):
+    path = os.path.join(SOUND_CACHE_DIR, f'{name}-{sound_cache_key(name, params)}.peak')
+    try:
+        os.makedirs(SOUND_CACHE_DIR, exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(repr(float(peak)))
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+def _evict_pcm():
+    entries = []
+    for entry in os.listdir(SOUND_CACHE_DIR):
+        if entry.endswith('.pcm'):
+            st = os.stat(os.path.join(SOUND_CACHE_DIR, entry))
+            entries.append((st.st_mtime, st.st_size, entry))
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry in sorted(entries):
+        if total <= SOUND_CACHE_MAX_BYTES:
+            break
+        os.remove(os.path.join(SOUND_CACHE_DIR, entry))
+        total -= size
+
+def chime_pcm(params, mix):
+    peak = peak_of(mix)
+    _store_peak('chime', params, peak)  # For the streamed chime's gain
+    return encode_pcm(normalize(mix, peak), params['channels'])
+
+def load_vista_chime(cancel=None):
+    def render(params):
+        mix = chime_mix(params, cancel)
+        return None if mix is None else chime_pcm(params, mix)
+    return cached_pcm('chime', VISTA_CHIME, render)
+
+def load_click_sound():
+    return cached_pcm('click', CLICK_SOUND, generate_click_sound)
+
+# ============== UI SOUND POOL ==============
+# UI sounds are built into pygame Sounds once and played on a fixed set of
+# mixer channels, reserved as soon as the pool is created. Sound.play() skips
+# reserved channels (find_channel() does not), so the boot chime, played and
+# streamed that way, never competes with them. At most max_per_sound copies
+# of one sound overlap; when that limit or the pool is exhausted the oldest
+# voice is stolen.
+class SoundPool:
+    def __init__(self, channels=4, max_per_sound=2):
+        self.num_channels = channels
+        self.max_per_sound = max_per_sound
+        self.loaders = {}
+        self.sounds = {}
+        self.channels = None
+        self.voices = []  # (name, channel), oldest first
+        self.stats = {'plays': 0, 'hits': 0, 'misses': 0, 'dropped': 0}
+        if pygame.mixer.get_init():
+            self.reserve()
+    
+    def reserve(self):
+        if pygame.mixer.get_num_channels() < self.num_channels + 1:
+            pygame.mixer.set_num_channels(self.num_channels + 1)
+        pygame.mixer.set_reserved(self.num_channels)
+        self.channels = [pygame.mixer.Channel(i) for i in range(self.num_channels)]
+    
+    def register(self, name, loader, volume=1.0):
+        self.loaders[name] = (loader, volume)
+        self.sounds.pop(name, None)
+    
+    def get(self, name):
+        sound = self.sounds.get(name)
+        if sound is not None:
+            self.stats['hits'] += 1
+            return sound
+        self.stats['misses'] += 1
+        loader, volume = self.loaders[name]
+        sound = pygame.mixer.Sound(buffer=loader())
+        sound.set_volume(volume)
+        self.sounds[name] = sound
+        return sound
+    
+    def preload(self):
+        for name in self.loaders:
+            if name not in self.sounds:
+                self.get(name)
+    
+    def play(self, name):
+        sound = self.get(name)
+        if self.channels is None:
+            self.reserve()  # The mixer came up after the pool
+        
+        self.voices = [(n, ch) for n, ch in self.voices if ch.get_busy() and ch.get_sound() is self.sounds.get(n)]
+        same = [v for v in self.voices if v[0] == name]
+        if len(same) >= self.max_per_sound:
+            channel = self.steal(same[0])
+        else:
+            busy = {id(ch) for _, ch in self.voices}
+            free = [ch for ch in self.channels if id(ch) not in busy]
+            channel = free[0] if free else self.steal(self.voices[0])
+        
+        channel.play(sound)
+        self.voices.append((name, channel))
+        self.stats['plays'] += 1
+        return channel
+    
+    def steal(self, voice):
+        self.voices.remove(voice)
+        voice[1].stop()
+        self.stats['dropped'] += 1
+        return voice[1]
+
+UI_SOUNDS = SoundPool()
+UI_SOUNDS.register('click', load_click_sound, volume=0.3)
+
+# The chime renders on a worker thread from CatOS startup; at its cue it is
+# played only if ready. Otherwise CHIME_FALLBACK 'stream' starts the
+# block-streamed chime at once (needs NumPy, else acts like 'delay'),
+# 'delay' lets it start late (within CHIME_MAX_DELAY seconds of the cue),
+# and 'skip' drops it. A started stream cancels the worker, which stops at
+# its next voice instead of synthesizing the chime twice. The stream
+# writes its blocks to the PCM cache as it goes, so the next start still
+# finds the chime on disk; a stream with no cached peak to play at records
+# the true one instead, for the next stream to use.
+CHIME_CUE_TIME = 1.5
+CHIME_FALLBACK = 'stream'
+CHIME_MAX_DELAY = 1.0
+
+_chime_future = None
+_chime_cancel = threading.Event()
+
+def start_chime_render():
+    global _chime_future
+    if _chime_future is None and AUDIO_AVAILABLE:
+        _chime_future = run_on_chime_thread(load_vista_chime, _chime_cancel)
+    return _chime_future
+
+def run_on_chime_thread(fn, *args):
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='chime')
+    future = executor.submit(fn, *args)
+    executor.shutdown(wait=False)
+    return future
+
+def chime_ready():
+    future = start_chime_render()
+    return future is not None and future.done()
+
+def stream_and_cache_chime(params=VISTA_CHIME):
+    peak = cached_peak('chime', params)
+    if peak is None:
+        # Blocks at the bound's level aren't the chime's PCM; record the
+        # true peak so the next stream plays, and caches, the real thing
+        peaks = []
+        yield from stream_vista_chime(params, peaks=peaks)
+        run_on_chime_thread(_store_peak, 'chime', params, max(peaks))
+        return
+    path = os.path.join(SOUND_CACHE_DIR, f"chime-{sound_cache_key('chime', params)}.pcm")
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(SOUND_CACHE_DIR, exist_ok=True)
+        cache = open(tmp_path, 'wb')
+    except OSError:
+        cache = None
+    cache_ok = cache is not None
+    complete = False
+    try:
+        for block in stream_vista_chime(params, peak=peak):
+            if cache_ok:
+                try:
+                    cache.write(block)
+                except OSError:
+                    cache_ok = False  # Best-effort; the stream plays on
+            yield block
+        complete = True
+    finally:
+        if cache is not None:
+            try:
+                cache.close()
+            except OSError:
+                cache_ok = False
+            # Renaming into place and eviction stay off the frame loop
+            run_on_chime_thread(_commit_pcm, tmp_path, path if complete and cache_ok else None)
+
+def stream_boot_chime():
+    if not (AUDIO_AVAILABLE and NUMPY_AVAILABLE):
+        return None
+    try:
+        stream = SoundStream(stream_and_cache_chime()).start()
+    except Exception as error:
+        report_audio_error('stream_boot_chime', error)
+        return None
+    _chime_cancel.set()
+    return stream
+
+def play_boot_chime(timeout=None):
     if not AUDIO_AVAILABLE:
         return None
     try:
-        chime_data = generate_vista_chime()
+        chime_data = start_chime_render().result(timeout)
         sound = pygame.mixer.Sound(buffer=chime_data)
-        sound.play()
-        return sound
-    except:
+    except concurrent.futures.TimeoutError:
+        return None
+    except Exception as error:
+        report_audio_error('play_boot_chime', error)
         return None
+    sound.play()
+    return sound
 
 def play_click():
     if not AUDIO_AVAILABLE:
         return
     try:
-        click_data = generate_click_sound()
-        sound = pygame.mixer.Sound(buffer=click_data)
-        sound.set_volume(0.3)
-        sound.play()
-    except:
-        pass
+        UI_SOUNDS.play('click')
+    except Exception as error:
+        report_audio_error('play_click', error)
 
 # ============== 8x8 BITMAP FONT ==============
 FONT_8X8 = {
@@ -269,26 +820,99 @@ FONT_8X8 = {
     '~': [0x76,0xDC,0x00,0x00,0x00,0x00,0x00,0x00],
 }
 
+GLYPH_INDEX = {char: i for i, char in enumerate(FONT_8X8)}
+GLYPH_ATLAS_CACHE_SIZE = 32
+_glyph_atlases = OrderedDict()
+
+def glyph_atlas(color, scale=1):
+    key = (tuple(color), scale)
+    atlas = _glyph_atlases.get(key)
+    if atlas is not None:
+        _glyph_atlases.move_to_end(key)
+        return atlas
+
+    size = 8 * scale
+    color = key[0][:3]
+    colorkey = (0, 0, 0) if color != (0, 0, 0) else (255, 255, 255)
+    atlas = pygame.Surface((size * len(GLYPH_INDEX), size))
+    if pygame.display.get_surface():
+        atlas = atlas.convert()
+    atlas.fill(colorkey)
+    for char, index in GLYPH_INDEX.items():
+        for row_idx, row in enumerate(FONT_8X8[char]):
+            for col in range(8):
+                if row & (0x80 >> col):
+                    atlas.fill(color, (index * size + col * scale, row_idx * scale, scale, scale))
+    atlas.set_colorkey(colorkey, pygame.RLEACCEL)
+
+    _glyph_atlases[key] = atlas
+    if len(_glyph_atlases) > GLYPH_ATLAS_CACHE_SIZE:
+        _glyph_atlases.popitem(last=False)
+    return atlas
+
 def draw_char(surface, char, x, y, color, scale=1):
-    if char not in FONT_8X8:
-        char = '?'
-    bitmap = FONT_8X8.get(char, FONT_8X8['?'])
-    for row_idx, row in enumerate(bitmap):
-        for col in range(8):
-            if row & (0x80 >> col):
-                px = x + col * scale
-                py = y + row_idx * scale
-                if scale == 1:
-                    if 0 <= px < SCREEN_WIDTH and 0 <= py < SCREEN_HEIGHT:
-                        surface.set_at((px, py), color)
-                else:
-                    pygame.draw.rect(surface, color, (px, py, scale, scale))
+    size = 8 * scale
+    index = GLYPH_INDEX.get(char, GLYPH_INDEX['?'])
+    surface.blit(glyph_atlas(color, scale), (x, y), (index * size, 0, size, size))
+
+def render_text(text, color, scale=1):
+    atlas = glyph_atlas(color, scale)
+    size = 8 * scale
+    unknown = GLYPH_INDEX['?']
+    run = pygame.Surface((size * len(text), size))
+    if pygame.display.get_surface():
+        run = run.convert()
+    colorkey = atlas.get_colorkey()
+    run.fill(colorkey)
+    run.blits([(atlas, (i * size, 0), (GLYPH_INDEX.get(char, unknown) * size, 0, size, size))
+               for i, char in enumerate(text)], doreturn=False)
+    run.set_colorkey(colorkey, pygame.RLEACCEL)
+    return run
+
+TEXT_CACHE_MAX_BYTES = 4 * 1024 * 1024
+
+# Whole strings are cached as rendered surfaces, keyed by the upper-cased
+# text, color and scale, so a label that is redrawn every frame costs one
+# blit. Least recently used runs are evicted once max_bytes is exceeded; a
+# run too large to fit is drawn but never kept.
+class TextCache:
+    def __init__(self, max_bytes=TEXT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.runs = OrderedDict()  # key -> (surface, bytes)
+        self.bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+    
+    def get(self, text, color, scale=1):
+        text = text.upper()
+        key = (text, tuple(color), scale)
+        entry = self.runs.get(key)
+        if entry is not None:
+            self.stats['hits'] += 1
+            self.runs.move_to_end(key)
+            return entry[0]
+        
+        self.stats['misses'] += 1
+        run = render_text(text, color, scale)
+        size = run.get_width() * run.get_height() * run.get_bytesize()
+        if size > self.max_bytes:
+            return run
+        self.runs[key] = (run, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, evicted) = self.runs.popitem(last=False)
+            self.bytes -= evicted
+            self.stats['evictions'] += 1
+        return run
+    
+    def clear(self):
+        self.runs.clear()
+        self.bytes = 0
+
+TEXT_CACHE = TextCache()
 
 def draw_text(surface, text, x, y, color, scale=1):
-    cursor_x = x
-    for char in text.upper():
-        draw_char(surface, char, cursor_x, y, color, scale)
-        cursor_x += 8 * scale
+    if text:
+        surface.blit(TEXT_CACHE.get(text, color, scale), (x, y))
 
 def get_text_width(text, scale=1):
     return len(text) * 8 * scale
@@ -306,7 +930,26 @@ def draw_3d_rect(surface, rect, raised=True):
     pygame.draw.line(surface, dark, (x, y + h - 1), (x + w - 1, y + h - 1))
     pygame.draw.line(surface, dark, (x + w - 1, y), (x + w - 1, y + h - 1))
 
+def draw_outline(surface, color, rect):
+    # Four lines, not draw.rect(width=1), which leaves stray pixels at the
+    # clip rect's corner and the compositor always draws with a clip set
+    x, y, w, h = rect
+    pygame.draw.line(surface, color, (x, y), (x + w - 1, y))
+    pygame.draw.line(surface, color, (x, y + h - 1), (x + w - 1, y + h - 1))
+    pygame.draw.line(surface, color, (x, y), (x, y + h - 1))
+    pygame.draw.line(surface, color, (x + w - 1, y), (x + w - 1, y + h - 1))
+
 def draw_cat_icon_mini(surface, x, y):
+    sprite = _icon_sprites.get('cat_mini')
+    if sprite is None:
+        sprite = pygame.Surface((12, 12), pygame.SRCALPHA)
+        render_cat_icon_mini(sprite, 0, 0)
+        if pygame.display.get_surface():
+            sprite = sprite.convert_alpha()
+        _icon_sprites['cat_mini'] = sprite
+    surface.blit(sprite, (x, y))
+
+def render_cat_icon_mini(surface, x, y):
     pygame.draw.polygon(surface, COLORS['cat_orange'], [(x+2, y+4), (x+4, y), (x+6, y+4)])
     pygame.draw.polygon(surface, COLORS['cat_orange'], [(x+6, y+4), (x+8, y), (x+10, y+4)])
     pygame.draw.ellipse(surface, COLORS['cat_orange'], (x+1, y+3, 10, 9))
@@ -341,7 +984,616 @@ def draw_cat_icon(surface, x, y, size=32):
         pygame.draw.line(surface, COLORS['black'],
             (x + size - 4, eye_y + 10 + offset), (x + size + 4, eye_y + 8 + offset * 2))
 
+# Gradient fill is rendered once; draw() reveals a slice as wide as the progress
+class ProgressBar:
+    def __init__(self, rect, start_color=(100, 150, 200), end_color=(255, 255, 100)):
+        self.rect = pygame.Rect(rect)
+        self.start_color = start_color
+        self.end_color = end_color
+        self.progress = 0.0
+        self.gradient = None
+    
+    def set_progress(self, progress):
+        progress = max(0.0, min(1.0, progress))
+        changed = int(self.rect.w * progress) != self.get_fill_width()
+        self.progress = progress
+        return changed
+    
+    def get_fill_width(self):
+        return int(self.rect.w * self.progress)
+    
+    def render_gradient(self):
+        w, h = self.rect.w, self.rect.h - 3
+        gradient = pygame.Surface((w, h))
+        if pygame.display.get_surface():
+            gradient = gradient.convert()
+        for i in range(w):
+            t = i / w
+            color = tuple(int(a + (b - a) * t) for a, b in zip(self.start_color, self.end_color))
+            gradient.fill(color, (i, 0, 1, h))
+        return gradient
+    
+    def draw(self, surface):
+        x, y, w, h = self.rect
+        pygame.draw.rect(surface, COLORS['window_shadow'], (x - 2, y - 2, w + 4, h + 4))
+        pygame.draw.rect(surface, COLORS['black'], self.rect)
+        if self.gradient is None:
+            self.gradient = self.render_gradient()
+        fill_width = self.get_fill_width()
+        if fill_width:
+            surface.blit(self.gradient, (x, y + 2), (0, 0, fill_width, h - 3))
+
+# ============== DIRTY RECTANGLES ==============
+# The desktop is only repainted where something changed. Anything that alters
+# what is on screen marks its area in DAMAGE; each frame the compositor
+# repaints just those regions and pushes them with display.update(). Set
+# CATOS_DEBUG_DIRTY=1 (or press F9) to outline every repainted region.
+DEBUG_DIRTY_RECTS = bool(os.environ.get('CATOS_DEBUG_DIRTY'))
+DEBUG_DIRTY_COLOR = (255, 0, 255)
+DEBUG_DIRTY_HOLD = 0.3  # Seconds an outline stays visible
+DIRTY_FULL_FRACTION = 0.6  # Past this much of the screen, repaint all of it
+
+class DirtyRegion:
+    def __init__(self, bounds):
+        self.bounds = pygame.Rect(bounds)
+        self.rects = []
+    
+    def add(self, rect=None):
+        rect = self.bounds.copy() if rect is None else self.bounds.clip(rect)
+        if rect.w and rect.h:
+            self.rects.append(rect)
+    
+    def take(self):
+        merged = self.merge(self.rects)
+        self.rects = []
+        area = sum(r.w * r.h for r in merged)
+        if area > DIRTY_FULL_FRACTION * self.bounds.w * self.bounds.h:
+            return [self.bounds.copy()]
+        return merged
+    
+    def merge(self, rects):
+        merged = []
+        for rect in rects:
+            i = 0
+            while i < len(merged):
+                if rect.colliderect(merged[i]):
+                    rect = rect.union(merged.pop(i))
+                    i = 0
+                else:
+                    i += 1
+            merged.append(self.bounds.clip(rect))
+        return merged
+
+def rect_difference(rect, hole):
+    # The parts of rect outside hole, as up to four non-overlapping rects
+    hole = rect.clip(hole)
+    if not hole.w or not hole.h:
+        return [rect]
+    parts = [pygame.Rect(rect.x, rect.y, rect.w, hole.y - rect.y),
+             pygame.Rect(rect.x, hole.bottom, rect.w, rect.bottom - hole.bottom),
+             pygame.Rect(rect.x, hole.y, hole.x - rect.x, hole.h),
+             pygame.Rect(hole.right, hole.y, rect.right - hole.right, hole.h)]
+    return [part for part in parts if part.w > 0 and part.h > 0]
+
+DAMAGE = DirtyRegion((0, 0, SCREEN_WIDTH, SCREEN_HEIGHT))
+
+# ============== FRAME PACING ==============
+# The main loop only runs at ACTIVE_FPS while something animates (boot, a
+# window drag, a streaming chime). Otherwise it sleeps in pygame.event.wait()
+# until input arrives or the next timed change is due (the taskbar clock's
+# minute, a cursor blink, a debug outline expiring), and never redraws faster
+# than IDLE_FPS. Process CPU time is sampled while idle; above IDLE_CPU_TARGET
+# the idle cap is halved (down to IDLE_MIN_FPS) until the load drops again.
+# Runs of queued mouse motion are collapsed into one event per frame, so a
+# fast drag moves the window once to the latest position instead of replaying
+# every intermediate one.
+ACTIVE_FPS = int(os.environ.get('CATOS_ACTIVE_FPS') or 60)
+IDLE_FPS = int(os.environ.get('CATOS_IDLE_FPS') or 30)
+IDLE_MIN_FPS = 5
+IDLE_MAX_WAIT = 5.0  # Seconds; longest single sleep even with nothing due
+IDLE_CPU_TARGET = 0.02  # Fraction of one core the idle loop may use
+IDLE_CPU_WINDOW = 2.0  # Seconds of idle time per CPU sample
+
+class FrameClock:
+    def __init__(self):
+        self.now = time.time()
+
+CLOCK = FrameClock()
+
+def coalesce_motion(events):
+    coalesced = []
+    for event in events:
+        if event.type == pygame.MOUSEMOTION and coalesced and coalesced[-1].type == pygame.MOUSEMOTION:
+            rel = coalesced[-1].rel
+            coalesced[-1] = pygame.event.Event(pygame.MOUSEMOTION, pos=event.pos, buttons=event.buttons,
+                                               rel=(rel[0] + event.rel[0], rel[1] + event.rel[1]))
+        else:
+            coalesced.append(event)
+    return coalesced
+
+class FramePacer:
+    def __init__(self, active_fps=ACTIVE_FPS, idle_fps=IDLE_FPS, recorder=None, replay=None):
+        self.clock = pygame.time.Clock()
+        self.recorder = recorder
+        self.replay = replay
+        self.mouse_pos = (0, 0)
+        self.real_start = None
+        self.active_fps = active_fps
+        self.max_idle_fps = idle_fps
+        self.idle_fps = idle_fps
+        self.pending = []  # Event that woke wait(), handed out by get_events()
+        self.idle_mark = None  # (wall, cpu) at the start of the current sample
+        self.idle_cpu = None  # Last measured idle CPU fraction
+    
+    def start(self):
+        CLOCK.now = self.replay.start if self.replay else time.time()
+        self.real_start = time.perf_counter()
+        if self.recorder:
+            self.recorder.write_start(CLOCK.now)
+        return CLOCK.now
+    
+    def get_events(self):
+        arrival = time.perf_counter()
+        if self.replay:
+            # Live input is ignored, except for closing the window
+            events = [event for event in pygame.event.get() if event.type == pygame.QUIT]
+            frame = self.replay.next_frame()
+            if frame is None:
+                return events + [pygame.event.Event(pygame.QUIT)]
+            CLOCK.now, self.mouse_pos, recorded = frame
+            events = recorded + events
+            fresh = events
+        else:
+            CLOCK.now = time.time()
+            self.mouse_pos = pygame.mouse.get_pos()
+            fresh = pygame.event.get()
+            events = self.pending + fresh
+            self.pending = []
+        for event in fresh:
+            event.arrival = arrival
+        events = coalesce_motion(events)
+        if self.recorder:
+            self.recorder.write_frame(CLOCK.now, self.mouse_pos, events)
+        return events
+    
+    def close(self):
+        if self.recorder:
+            self.recorder.close()
+    
+    def wait(self, active, wake_at=None):
+        if self.replay:
+            # As fast as possible, or spaced out like the recorded frames
+            due = self.replay.next_time()
+            if self.replay.realtime and due is not None:
+                delay = (due - self.replay.start) - (time.perf_counter() - self.real_start)
+                if delay > 0:
+                    time.sleep(delay)
+            return
+        if active:
+            self.idle_mark = None
+            self.clock.tick(self.active_fps)
+            return
+        self.clock.tick(self.idle_fps)
+        timeout = IDLE_MAX_WAIT
+        if wake_at is not None:
+            timeout = min(timeout, wake_at - time.time())
+        if timeout > 0 and not pygame.event.peek():
+            event = pygame.event.wait(math.ceil(timeout * 1000))
+            if event.type != pygame.NOEVENT:
+                event.arrival = time.perf_counter()
+                self.pending.append(event)
+        self.sample_idle_cpu()
+    
+    def sample_idle_cpu(self):
+        now, cpu = time.perf_counter(), time.process_time()
+        if self.idle_mark is None:
+            self.idle_mark = (now, cpu)
+            return
+        wall = now - self.idle_mark[0]
+        if wall < IDLE_CPU_WINDOW:
+            return
+        self.idle_cpu = (cpu - self.idle_mark[1]) / wall
+        self.idle_mark = (now, cpu)
+        if self.idle_cpu > IDLE_CPU_TARGET:
+            self.idle_fps = max(IDLE_MIN_FPS, self.idle_fps // 2)
+        else:
+            self.idle_fps = min(self.max_idle_fps, self.idle_fps * 2)
+
+# ============== INPUT RECORD / REPLAY ==============
+# CATOS_RECORD=path logs every frame's clock reading, mouse position and input
+# events; CATOS_REPLAY=path plays such a log back instead of live input, with
+# CLOCK following the recorded readings, so a session (and its performance)
+# can be reproduced exactly. Replay runs as fast as possible unless
+# CATOS_REPLAY_REALTIME=1. The file is binary: a header (magic, version,
+# start time) then per frame a clock/mouse record followed by its events.
+INPUT_RECORD = os.environ.get('CATOS_RECORD')
+INPUT_REPLAY = os.environ.get('CATOS_REPLAY')
+INPUT_REPLAY_REALTIME = bool(os.environ.get('CATOS_REPLAY_REALTIME'))
+INPUT_MAGIC = b'CATI'
+INPUT_VERSION = 1
+INPUT_HEADER = struct.Struct('<4sBd')  # magic, version, start time
+INPUT_FRAME = struct.Struct('<dhhH')  # clock, mouse x, mouse y, event count
+INPUT_KEY = struct.Struct('<iHB')  # key, mod, UTF-8 length of unicode
+INPUT_BUTTON = struct.Struct('<hhB')  # x, y, button
+INPUT_MOTION = struct.Struct('<hhhhB')  # x, y, rel x, rel y, buttons bitmask
+
+def encode_event(event):
+    if event.type == pygame.KEYDOWN:
+        text = event.unicode.encode('utf-8')
+        return b'K' + INPUT_KEY.pack(event.key, event.mod, len(text)) + text
+    if event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+        code = b'D' if event.type == pygame.MOUSEBUTTONDOWN else b'U'
+        return code + INPUT_BUTTON.pack(event.pos[0], event.pos[1], event.button)
+    if event.type == pygame.MOUSEMOTION:
+        buttons = sum(1 << i for i, pressed in enumerate(event.buttons) if pressed)
+        return b'M' + INPUT_MOTION.pack(event.pos[0], event.pos[1], event.rel[0], event.rel[1], buttons)
+    if event.type == pygame.QUIT:
+        return b'Q'
+    return None
+
+def decode_event(data, offset):
+    code = data[offset:offset + 1]
+    offset += 1
+    if code == b'K':
+        key, mod, length = INPUT_KEY.unpack_from(data, offset)
+        offset += INPUT_KEY.size
+        text = data[offset:offset + length].decode('utf-8')
+        return pygame.event.Event(pygame.KEYDOWN, key=key, mod=mod, unicode=text), offset + length
+    if code in (b'D', b'U'):
+        x, y, button = INPUT_BUTTON.unpack_from(data, offset)
+        kind = pygame.MOUSEBUTTONDOWN if code == b'D' else pygame.MOUSEBUTTONUP
+        return pygame.event.Event(kind, pos=(x, y), button=button), offset + INPUT_BUTTON.size
+    if code == b'M':
+        x, y, rx, ry, buttons = INPUT_MOTION.unpack_from(data, offset)
+        pressed = tuple(bool(buttons & (1 << i)) for i in range(3))
+        return pygame.event.Event(pygame.MOUSEMOTION, pos=(x, y), rel=(rx, ry), buttons=pressed), offset + INPUT_MOTION.size
+    if code == b'Q':
+        return pygame.event.Event(pygame.QUIT), offset
+    raise ValueError(f"Corrupt input log: unknown event code {code!r} at byte {offset - 1}")
+
+class InputRecorder:
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+    
+    def write_start(self, now):
+        self.file.write(INPUT_HEADER.pack(INPUT_MAGIC, INPUT_VERSION, now))
+    
+    def write_frame(self, now, mouse_pos, events):
+        encoded = [data for data in map(encode_event, events) if data is not None]
+        self.file.write(INPUT_FRAME.pack(now, mouse_pos[0], mouse_pos[1], len(encoded)))
+        self.file.write(b''.join(encoded))
+    
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+class InputReplay:
+    def __init__(self, path, realtime=False):
+        self.realtime = realtime
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, self.start = INPUT_HEADER.unpack_from(data, 0)
+        if magic != INPUT_MAGIC or version != INPUT_VERSION:
+            raise ValueError(f"{path} is not a version {INPUT_VERSION} Cat OS input log")
+        self.frames = []  # (clock, mouse_pos, events)
+        offset = INPUT_HEADER.size
+        while offset < len(data):
+            now, x, y, count = INPUT_FRAME.unpack_from(data, offset)
+            offset += INPUT_FRAME.size
+            events = []
+            for _ in range(count):
+                event, offset = decode_event(data, offset)
+                events.append(event)
+            self.frames.append((now, (x, y), events))
+        self.position = 0
+    
+    def next_time(self):
+        if self.position < len(self.frames):
+            return self.frames[self.position][0]
+        return None
+    
+    def next_frame(self):
+        if self.position >= len(self.frames):
+            return None
+        self.position += 1
+        return self.frames[self.position - 1]
+
+def make_frame_pacer():
+    recorder = InputRecorder(INPUT_RECORD) if INPUT_RECORD else None
+    replay = InputReplay(INPUT_REPLAY, INPUT_REPLAY_REALTIME) if INPUT_REPLAY else None
+    return FramePacer(recorder=recorder, replay=replay)
+
+# ============== FRAME PROFILER ==============
+# Times the stages of each frame (event pumping, click handling, boot/desktop
+# drawing, every window, taskbar, start menu, pushing pixels to the display)
+# and keeps the last PROFILE_WINDOW frames per stage for rolling percentiles.
+# F10 toggles it along with an on-screen table; CATOS_PROFILE=1 starts it on.
+# With CATOS_PROFILE_LOG=path every profiled frame is appended there as one
+# JSON line. While off, stage() hands back a shared no-op context manager.
+PROFILE_ENABLED = bool(os.environ.get('CATOS_PROFILE'))
+PROFILE_LOG = os.environ.get('CATOS_PROFILE_LOG')
+PROFILE_WINDOW = 300  # Frames per stage kept for the percentiles
+PROFILE_PERCENTILES = (50, 95, 99)
+PROFILE_REFRESH = 0.5  # Seconds between overlay recomputations
+
+def nearest_rank(samples, percentiles):
+    values = sorted(samples)
+    return tuple(values[max(0, math.ceil(p / 100 * len(values)) - 1)] for p in percentiles)
+
+class NullStage:
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
+NULL_STAGE = NullStage()
+
+class ProfileStage:
+    def __init__(self, frame, name):
+        self.frame = frame
+        self.name = name
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        ms = (time.perf_counter() - self.start) * 1000
+        self.frame[self.name] = self.frame.get(self.name, 0.0) + ms
+        return False
+
+class FrameProfiler:
+    def __init__(self, enabled=PROFILE_ENABLED, log_path=PROFILE_LOG, window=PROFILE_WINDOW):
+        self.enabled = False
+        self.log_path = log_path
+        self.log = None
+        self.window = window
+        self.samples = {}  # stage -> deque of per-frame ms
+        self.frame = {}  # stage -> ms spent so far this frame
+        self.frame_start = None
+        self.frames = 0
+        self.summary = []  # (stage, p50, p95, p99) as last computed
+        self.summary_time = 0.0
+        self.set_enabled(enabled)
+    
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        self.frame = {}
+        self.frame_start = None
+        if enabled and self.log_path and self.log is None:
+            self.log = open(self.log_path, 'a')
+        elif not enabled:
+            self.close()
+    
+    def close(self):
+        if self.log:
+            self.log.close()
+            self.log = None
+    
+    def stage(self, name):
+        if not self.enabled:
+            return NULL_STAGE
+        return ProfileStage(self.frame, name)
+    
+    def begin_frame(self):
+        if self.enabled:
+            self.frame_start = time.perf_counter()
+    
+    def end_frame(self):
+        if not self.enabled or self.frame_start is None:
+            return
+        frame = self.frame
+        frame['frame'] = (time.perf_counter() - self.frame_start) * 1000
+        self.frame = {}
+        self.frame_start = None
+        self.frames += 1
+        for name, ms in frame.items():
+            if name not in self.samples:
+                self.samples[name] = deque(maxlen=self.window)
+            self.samples[name].append(ms)
+        if self.log:
+            self.log.write(json.dumps({
+                'frame': self.frames,
+                'time': round(time.time(), 4),
+                'ms': {name: round(ms, 4) for name, ms in frame.items()},
+            }) + '\n')
+    
+    def percentiles(self, name):
+        return nearest_rank(self.samples[name], PROFILE_PERCENTILES)
+    
+    def get_summary(self):
+        now = time.perf_counter()
+        if now - self.summary_time >= PROFILE_REFRESH:
+            self.summary_time = now
+            names = sorted(self.samples, key=lambda name: name != 'frame')
+            self.summary = [(name,) + self.percentiles(name) for name in names]
+        return self.summary
+
+PROFILER = FrameProfiler()
+
+# ============== INPUT LATENCY ==============
+# Pump-to-flip time per app: FramePacer stamps every event when the loop
+# pumps it from the queue (or when it wakes the idle wait), and a key that
+# changed a window's text (or closed it) or a click whose handler damaged
+# the screen is timed until the display update that first shows it. pygame
+# doesn't expose SDL's own event timestamps, so time an event sat queued
+# while an active frame slept in clock.tick() (up to 1/ACTIVE_FPS) isn't
+# counted; while idle, event.wait() returns as soon as the event arrives
+# and the two agree. Each sample splits into queue (pump to handler),
+# handle (Window.handle_key/handle_click and friends) and draw (handler to
+# display update). F11 shows recent percentiles per app; with
+# CATOS_LATENCY_LOG=path the whole session's histograms are written there
+# as JSON on exit.
+LATENCY_LOG = os.environ.get('CATOS_LATENCY_LOG')
+LATENCY_BUCKETS_MS = (2, 4, 8, 16, 33, 50, 100, 250)  # Histogram upper edges
+LATENCY_STAGES = ('queue', 'handle', 'draw', 'total')
+LATENCY_WINDOW = 200  # Recent samples per app kept for the overlay
+LATENCY_PERCENTILES = (50, 95)
+
+class LatencyTracker:
+    def __init__(self, log_path=LATENCY_LOG, buckets=LATENCY_BUCKETS_MS, window=LATENCY_WINDOW):
+        self.log_path = log_path
+        self.buckets = buckets
+        self.window = window
+        self.pending = []  # (app, arrival, handled, done) waiting for their frame
+        self.histograms = {}  # app -> stage -> counts, one per bucket plus overflow
+        self.totals = {}  # app -> stage -> [count, sum ms, max ms]
+        self.recent = {}  # app -> stage -> deque of ms
+        self.summary = []
+        self.summary_time = 0.0
+    
+    def track(self, app, event, handled, changed):
+        if changed:
+            arrival = getattr(event, 'arrival', handled)
+            self.pending.append((app, arrival, handled, time.perf_counter()))
+    
+    def presented(self):
+        if not self.pending:
+            return
+        now = time.perf_counter()
+        for app, arrival, handled, done in self.pending:
+            ms = (handled - arrival, done - handled, now - done, now - arrival)
+            self.record(app, [value * 1000 for value in ms])
+        self.pending = []
+    
+    def record(self, app, ms):
+        if app not in self.histograms:
+            self.histograms[app] = {stage: [0] * (len(self.buckets) + 1) for stage in LATENCY_STAGES}
+            self.totals[app] = {stage: [0, 0.0, 0.0] for stage in LATENCY_STAGES}
+            self.recent[app] = {stage: deque(maxlen=self.window) for stage in LATENCY_STAGES}
+        for stage, value in zip(LATENCY_STAGES, ms):
+            bucket = next((i for i, edge in enumerate(self.buckets) if value <= edge), len(self.buckets))
+            self.histograms[app][stage][bucket] += 1
+            total = self.totals[app][stage]
+            total[0] += 1
+            total[1] += value
+            total[2] = max(total[2], value)
+            self.recent[app][stage].append(value)
+    
+    def get_summary(self):
+        # (app, samples, p50, p95 total, p95 handle, p95 draw), refreshed
+        # at the profiler overlay's rate
+        now = time.perf_counter()
+        if now - self.summary_time >= PROFILE_REFRESH:
+            self.summary_time = now
+            self.summary = []
+            for app in sorted(self.recent):
+                recent = self.recent[app]
+                p50, p95 = nearest_rank(recent['total'], LATENCY_PERCENTILES)
+                self.summary.append((app, self.totals[app]['total'][0], p50, p95,
+                                     nearest_rank(recent['handle'], (95,))[0],
+                                     nearest_rank(recent['draw'], (95,))[0]))
+        return self.summary
+    
+    def report(self):
+        labels = [f"<={edge}" for edge in self.buckets] + [f">{self.buckets[-1]}"]
+        apps = {}
+        for app, stages in self.histograms.items():
+            apps[app] = {}
+            for stage, counts in stages.items():
+                count, total, peak = self.totals[app][stage]
+                apps[app][stage] = {
+                    'count': count,
+                    'mean_ms': round(total / count, 3),
+                    'max_ms': round(peak, 3),
+                    'histogram_ms': dict(zip(labels, counts)),
+                }
+        return {'measured': 'pump_to_flip', 'apps': apps}
+    
+    def close(self):
+        if self.log_path and self.histograms:
+            with open(self.log_path, 'w') as f:
+                json.dump(self.report(), f, indent=2)
+
+LATENCY = LatencyTracker()
+
+# ============== HIT TESTING ==============
+# Clickable things (windows, icons, taskbar buttons) are bucketed into a
+# uniform grid of HIT_CELL-sized cells by their rects. Each cell keeps its
+# targets sorted by z, highest first, so a click only tests the targets
+# overlapping its cell and stops at the first one under the pointer.
+# CatOS re-files a window whenever it moves, resizes, (un)minimizes, is raised
+# or closes; parts inside a window are found by Window.hit_test() arithmetic.
+# The same cells tell the renderer which windows show inside a damaged rect.
+HIT_CELL = 64
+HIT_Z_ICONS = -1  # Icons sit below every window, first icon on top
+HIT_Z_WINDOWS = 1 << 29  # Windows stack up and down from here, above 0
+HIT_Z_TASKBAR = 1 << 30  # Taskbar buttons sit above every window
+
+class HitGrid:
+    def __init__(self, cell=HIT_CELL):
+        self.cell = cell
+        self.cells = {}  # (col, row) -> ([-z, ...], [(target, rect), ...]), highest z first
+        self.entries = {}  # target -> (rect, z, cells it is filed under)
+    
+    def cells_for(self, rect):
+        c = self.cell
+        return [(col, row) for col in range(rect.left // c, (rect.right - 1) // c + 1)
+                for row in range(rect.top // c, (rect.bottom - 1) // c + 1)]
+    
+    def set(self, target, rect, z):
+        self.remove(target)
+        rect = pygame.Rect(rect)
+        if rect.w <= 0 or rect.h <= 0:
+            return
+        keys = self.cells_for(rect)
+        for key in keys:
+            zs, items = self.cells.setdefault(key, ([], []))
+            i = bisect.bisect_right(zs, -z)  # After equal z, so the earlier target stays on top
+            zs.insert(i, -z)
+            items.insert(i, (target, rect))
+        self.entries[target] = (rect, z, keys)
+    
+    def remove(self, target):
+        entry = self.entries.pop(target, None)
+        if entry:
+            for key in entry[2]:
+                zs, items = self.cells[key]
+                i = bisect.bisect_left(zs, -entry[1])
+                while items[i][0] != target:
+                    i += 1
+                del zs[i], items[i]
+                if not zs:
+                    del self.cells[key]
+    
+    def hit(self, pos):
+        bucket = self.cells.get((pos[0] // self.cell, pos[1] // self.cell))
+        if bucket:
+            for target, rect in bucket[1]:
+                if rect.collidepoint(pos):
+                    return target
+        return None
+    
+    def stacked_in(self, rect, kind):
+        # Opaque targets of one kind showing inside rect, highest z first, and
+        # whether one of them covers it. A target covering rect is filed under
+        # every cell rect touches, so any one of those cells finds the highest
+        # such target, and each cell's walk down stops there: nothing below it
+        # can show.
+        keys = self.cells_for(rect)
+        buckets = [self.cells[key] for key in keys if key in self.cells]
+        floor = None
+        if len(buckets) == len(keys):
+            zs, items = min(buckets, key=lambda bucket: len(bucket[0]))
+            floor = next((-nz for nz, (target, target_rect) in zip(zs, items)
+                          if target[0] == kind and target_rect.contains(rect)), None)
+        seen, found = set(), {}
+        for zs, items in buckets:
+            for nz, (target, target_rect) in zip(zs, items):
+                if floor is not None and -nz < floor:
+                    break
+                if target not in seen:
+                    seen.add(target)
+                    if target[0] == kind and target_rect.colliderect(rect):
+                        found[target] = -nz
+        return sorted(found, key=found.get, reverse=True), floor is not None
+
 # ============== WINDOW CLASS ==============
+CALC_BUTTONS = ('789/', '456*', '123-', 'C0=+')
+CALC_BUTTON_W, CALC_BUTTON_H, CALC_BUTTON_GAP = 40, 30, 5
+CALC_BUTTONS_X, CALC_BUTTONS_Y = 19, 74  # Grid origin inside the window frame
+
 
 class Window:
     def __init__(self, x, y, w, h, title, content="", app_type="default"):
@@ -355,6 +1607,7 @@ class Window:
         self.dragging = False
         self.drag_offset = (0, 0)
         self.prev_rect = None
+        self.z = 0  # Stacking order, assigned by the WindowManager
         
         self.input_text = ""
         self.calc_display = "0"
@@ -362,6 +1615,58 @@ class Window:
         self.calc_op = None
         self.terminal_history = ["Cat OS [Version 1.X]", "(C) Team Flames", "", "C:\\>"]
         self.terminal_input = ""
+        self.cursor_blink = None
+        
+        self.surface = None
+        self.chrome_dirty = True
+        self.content_dirty = True
+    
+    def invalidate(self):
+        DAMAGE.add(self.rect)
+    
+    def invalidate_chrome(self):
+        self.chrome_dirty = True
+        self.invalidate()
+    
+    def invalidate_content(self, rect=None):
+        self.content_dirty = True
+        DAMAGE.add(self.rect if rect is None else rect)
+    
+    def move_to(self, x, y):
+        if (x, y) == self.rect.topleft:
+            return
+        old = self.rect.copy()
+        self.rect.x, self.rect.y = x, y
+        # The window itself is one blit of its backing surface; only the strips
+        # of its old position it no longer covers need what lies beneath
+        self.invalidate()
+        for part in rect_difference(old, self.rect):
+            DAMAGE.add(part)
+    
+    def set_active(self, active):
+        if self.active != active:
+            self.active = active
+            self.chrome_dirty = True
+            DAMAGE.add(self.get_title_bar_rect())  # Only the title bar changes colour
+    
+    def get_cursor_rect(self):
+        lines = self.input_text.split('\n')
+        return pygame.Rect(self.rect.x + 8 + len(lines[-1]) * 8, self.rect.y + 28 + min(len(lines) - 1, 14) * 12, 8, 8)
+    
+    def animates(self):
+        return self.app_type == "notepad"
+    
+    def update(self):
+        if self.animates() and not self.minimized:
+            blink = int(CLOCK.now * 2) % 2
+            if blink != self.cursor_blink:
+                self.cursor_blink = blink
+                self.invalidate_content(self.get_cursor_rect())
+    
+    def next_update(self):
+        if self.animates() and not self.minimized:
+            return (int(CLOCK.now * 2) + 1) / 2
+        return None
     
     def get_title_bar_rect(self):
         return pygame.Rect(self.rect.x + 3, self.rect.y + 3, self.rect.w - 6, 18)
@@ -375,13 +1680,43 @@ class Window:
     def get_min_btn_rect(self):
         return pygame.Rect(self.rect.x + self.rect.w - 51, self.rect.y + 5, 14, 14)
     
+    def get_content_rect(self):
+        return pygame.Rect(self.rect.x + 4, self.rect.y + 24, self.rect.w - 8, self.rect.h - 28)
+    
+    # Each window renders into its own backing surface: the chrome only when
+    # the active state or size changes, the content only when the app's state
+    # does. Drawing (and dragging) a window is then a single blit.
     def draw(self, surface):
         if self.minimized:
             return
+        with PROFILER.stage('window:' + self.title):
+            self.render()
+            surface.blit(self.surface, self.rect)
+    
+    def render(self):
+        if self.surface is None or self.surface.get_size() != self.rect.size:
+            self.surface = pygame.Surface(self.rect.size)
+            if pygame.display.get_surface():
+                self.surface = self.surface.convert()
+            self.chrome_dirty = self.content_dirty = True
+        if self.chrome_dirty:
+            self.draw_chrome(self.surface)
+            self.chrome_dirty = False
+        if self.content_dirty:
+            content_rect = self.get_content_rect().move(-self.rect.x, -self.rect.y)
+            self.surface.set_clip(content_rect)
+            pygame.draw.rect(self.surface, COLORS['white'], content_rect)
+            draw_outline(self.surface, COLORS['window_shadow'], content_rect)
+            self.draw_content(self.surface, content_rect)
+            self.surface.set_clip(None)
+            self.content_dirty = False
+    
+    def draw_chrome(self, surface):
+        x, y = 0, 0
+        w, h = self.rect.size
         
-        x, y, w, h = self.rect
-        
-        pygame.draw.rect(surface, COLORS['window_bg'], self.rect)
+        for strip in ((0, 0, w, 24), (0, h - 4, w, 4), (0, 24, 4, h - 28), (w - 4, 24, 4, h - 28)):
+            pygame.draw.rect(surface, COLORS['window_bg'], strip)
         pygame.draw.line(surface, COLORS['window_light'], (x, y), (x + w - 1, y))
         pygame.draw.line(surface, COLORS['window_light'], (x, y), (x, y + h - 1))
         pygame.draw.line(surface, COLORS['window_shadow'], (x, y + h - 1), (x + w - 1, y + h - 1))
@@ -396,28 +1731,23 @@ class Window:
         draw_3d_rect(surface, (x + 5, y + 5, 14, 14), True)
         draw_cat_icon_mini(surface, x + 6, y + 6)
         
-        min_rect = self.get_min_btn_rect()
+        local = (-self.rect.x, -self.rect.y)
+        min_rect = self.get_min_btn_rect().move(local)
         draw_3d_rect(surface, min_rect, True)
         pygame.draw.line(surface, COLORS['black'], (min_rect.x + 3, min_rect.y + 10), (min_rect.x + 10, min_rect.y + 10))
         
-        max_rect = self.get_max_btn_rect()
+        max_rect = self.get_max_btn_rect().move(local)
         draw_3d_rect(surface, max_rect, True)
         if self.maximized:
-            pygame.draw.rect(surface, COLORS['black'], (max_rect.x + 2, max_rect.y + 5, 6, 6), 1)
-            pygame.draw.rect(surface, COLORS['black'], (max_rect.x + 5, max_rect.y + 2, 6, 6), 1)
+            draw_outline(surface, COLORS['black'], (max_rect.x + 2, max_rect.y + 5, 6, 6))
+            draw_outline(surface, COLORS['black'], (max_rect.x + 5, max_rect.y + 2, 6, 6))
         else:
-            pygame.draw.rect(surface, COLORS['black'], (max_rect.x + 3, max_rect.y + 3, 8, 8), 1)
+            draw_outline(surface, COLORS['black'], (max_rect.x + 3, max_rect.y + 3, 8, 8))
         
-        close_rect = self.get_close_btn_rect()
+        close_rect = self.get_close_btn_rect().move(local)
         draw_3d_rect(surface, close_rect, True)
         pygame.draw.line(surface, COLORS['black'], (close_rect.x + 3, close_rect.y + 3), (close_rect.x + 10, close_rect.y + 10))
         pygame.draw.line(surface, COLORS['black'], (close_rect.x + 10, close_rect.y + 3), (close_rect.x + 3, close_rect.y + 10))
-        
-        content_rect = pygame.Rect(x + 4, y + 24, w - 8, h - 28)
-        pygame.draw.rect(surface, COLORS['white'], content_rect)
-        pygame.draw.rect(surface, COLORS['window_shadow'], content_rect, 1)
-        
-        self.draw_content(surface, content_rect)
     
     def draw_content(self, surface, content_rect):
         x, y, w, h = content_rect
@@ -431,16 +1761,15 @@ class Window:
             
         elif self.app_type == "calculator":
             pygame.draw.rect(surface, (200, 220, 200), (x + 10, y + 10, w - 20, 30))
-            pygame.draw.rect(surface, COLORS['black'], (x + 10, y + 10, w - 20, 30), 1)
+            draw_outline(surface, COLORS['black'], (x + 10, y + 10, w - 20, 30))
             draw_text(surface, self.calc_display[-15:], x + w - 25 - get_text_width(self.calc_display[-15:]), y + 18, COLORS['black'])
             
-            buttons = [['7', '8', '9', '/'], ['4', '5', '6', '*'], ['1', '2', '3', '-'], ['C', '0', '=', '+']]
-            btn_w, btn_h = 40, 30
-            start_x, start_y = x + 15, y + 50
-            for row_i, row in enumerate(buttons):
+            btn_w, btn_h = CALC_BUTTON_W, CALC_BUTTON_H
+            start_x, start_y = x - 4 + CALC_BUTTONS_X, y - 24 + CALC_BUTTONS_Y
+            for row_i, row in enumerate(CALC_BUTTONS):
                 for col_i, label in enumerate(row):
-                    bx = start_x + col_i * (btn_w + 5)
-                    by = start_y + row_i * (btn_h + 5)
+                    bx = start_x + col_i * (btn_w + CALC_BUTTON_GAP)
+                    by = start_y + row_i * (btn_h + CALC_BUTTON_GAP)
                     draw_3d_rect(surface, (bx, by, btn_w, btn_h), True)
                     draw_text(surface, label, bx + btn_w//2 - 4, by + btn_h//2 - 4, COLORS['black'])
                     
@@ -450,7 +1779,7 @@ class Window:
                 draw_text(surface, line[:35], x + 4, y + 4 + i * 12, COLORS['black'])
             cursor_y = min(len(lines) - 1, 14)
             cursor_x = len(lines[-1]) if lines else 0
-            if int(time.time() * 2) % 2:
+            if int(CLOCK.now * 2) % 2:
                 draw_text(surface, "_", x + 4 + cursor_x * 8, y + 4 + cursor_y * 12, COLORS['black'])
                 
         elif self.app_type == "catfacts":
@@ -475,17 +1804,38 @@ class Window:
             for i, line in enumerate(lines[:12]):
                 draw_text(surface, line, x + 8, y + 8 + i * 14, COLORS['black'])
     
+    def hit_test(self, pos):
+        lx, ly = pos[0] - self.rect.x, pos[1] - self.rect.y
+        w = self.rect.w
+        if 5 <= ly < 19:
+            if w - 19 <= lx < w - 5:
+                return 'close'
+            if w - 35 <= lx < w - 21:
+                return 'maximize'
+            if w - 51 <= lx < w - 37:
+                return 'minimize'
+        if 3 <= lx < w - 3 and 3 <= ly < 21 and not self.maximized:
+            return 'title'
+        if self.app_type == "calculator" and lx >= CALC_BUTTONS_X and ly >= CALC_BUTTONS_Y:
+            col, bx = divmod(lx - CALC_BUTTONS_X, CALC_BUTTON_W + CALC_BUTTON_GAP)
+            row, by = divmod(ly - CALC_BUTTONS_Y, CALC_BUTTON_H + CALC_BUTTON_GAP)
+            if col < 4 and row < 4 and bx < CALC_BUTTON_W and by < CALC_BUTTON_H:
+                return CALC_BUTTONS[row][col]
+        return None
+    
     def handle_click(self, pos):
         if self.minimized:
             return None
         mx, my = pos
+        part = self.hit_test(pos)
         
-        if self.get_close_btn_rect().collidepoint(mx, my):
+        if part == 'close':
             play_click()
             return 'close'
         
-        if self.get_max_btn_rect().collidepoint(mx, my):
+        if part == 'maximize':
             play_click()
+            self.invalidate()
             if self.maximized:
                 if self.prev_rect:
                     self.rect = self.prev_rect.copy()
@@ -494,31 +1844,23 @@ class Window:
                 self.prev_rect = self.rect.copy()
                 self.rect = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT - 32)
                 self.maximized = True
+            self.invalidate()
             return 'maximize'
         
-        if self.get_min_btn_rect().collidepoint(mx, my):
+        if part == 'minimize':
             play_click()
-            self.minimized = True
             return 'minimize'
         
-        if self.get_title_bar_rect().collidepoint(mx, my) and not self.maximized:
+        if part == 'title':
             self.dragging = True
             self.drag_offset = (mx - self.rect.x, my - self.rect.y)
             return 'drag'
         
-        if self.app_type == "calculator":
-            content_rect = pygame.Rect(self.rect.x + 4, self.rect.y + 24, self.rect.w - 8, self.rect.h - 28)
-            buttons = [['7', '8', '9', '/'], ['4', '5', '6', '*'], ['1', '2', '3', '-'], ['C', '0', '=', '+']]
-            btn_w, btn_h = 40, 30
-            start_x, start_y = content_rect.x + 15, content_rect.y + 50
-            for row_i, row in enumerate(buttons):
-                for col_i, label in enumerate(row):
-                    bx = start_x + col_i * (btn_w + 5)
-                    by = start_y + row_i * (btn_h + 5)
-                    if pygame.Rect(bx, by, btn_w, btn_h).collidepoint(mx, my):
-                        play_click()
-                        self.calc_button(label)
-                        return 'calc_btn'
+        if part is not None:
+            play_click()
+            self.calc_button(part)
+            self.invalidate_content()
+            return 'calc_btn'
         return 'click'
     
     def calc_button(self, btn):
@@ -539,6 +1881,7 @@ class Window:
                 self.calc_display = "Error"
     
     def handle_key(self, event):
+        state = (self.terminal_input, len(self.terminal_history), self.input_text)
         if self.app_type == "terminal":
             if event.key == pygame.K_RETURN:
                 cmd = self.terminal_input.strip().lower()
@@ -547,7 +1890,7 @@ class Window:
                        'cls': 'clear', 'dir': ["CATOS    <DIR>", "SYSTEM   <DIR>", "MEOW.EXE  1337"],
                        'ver': ["Cat OS [Version 1.X]"], 'meow': ["MEOW! :3 ~nya~"],
                        'cat': ["  /\\_/\\", " ( o.o )", "  > ^ <"],
-                       'time': [datetime.now().strftime("%H:%M:%S")], 'exit': 'close'}
+                       'time': [datetime.fromtimestamp(CLOCK.now).strftime("%H:%M:%S")], 'exit': 'close'}
                 if cmd in cmds:
                     if cmds[cmd] == 'clear':
                         self.terminal_history = []
@@ -569,8 +1912,259 @@ class Window:
                 self.input_text = self.input_text[:-1]
             elif event.unicode.isprintable():
                 self.input_text += event.unicode
+        if (self.terminal_input, len(self.terminal_history), self.input_text) != state:
+            self.invalidate_content()  # Modifiers and no-op keys leave the window alone
+            return 'edit'
         return None
 
+# ============== WINDOW MANAGER ==============
+# Z-order lives in an OrderedDict (a linked list with a hash index, bottom
+# window first), so raising, lowering, closing, focusing and (un)minimizing a
+# window are O(1) whatever the window count. Every change is reported to the
+# listeners as (change, window) so the renderer can repaint and re-index just
+# that window: 'open', 'raise', 'lower', 'focus', 'minimize', 'restore',
+# 'move' and 'close'. Window z values stay strictly between the icons' and
+# the taskbar's; should either end of that band run out, every window is
+# renumbered in stack order and reported as 'restack'.
+class WindowManager:
+    def __init__(self):
+        self.stack = OrderedDict()  # window -> None, bottom to top
+        self.animated = OrderedDict()  # Windows that redraw on a timer
+        self.focused = None
+        self.visible = 0  # Windows that aren't minimized
+        self.top_z = HIT_Z_WINDOWS
+        self.bottom_z = HIT_Z_WINDOWS
+        self.listeners = []
+    
+    def __len__(self):
+        return len(self.stack)
+    
+    def __iter__(self):
+        return iter(self.stack)
+    
+    def __contains__(self, win):
+        return win in self.stack
+    
+    def top(self):
+        return next(reversed(self.stack), None)
+    
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+    
+    def emit(self, change, win):
+        for listener in self.listeners:
+            listener(change, win)
+    
+    def open(self, win):
+        self.stack[win] = None
+        if win.animates():
+            self.animated[win] = None
+        if not win.minimized:
+            self.visible += 1
+        win.z = self.next_top_z()
+        self.emit('open', win)
+        self.focus(win)
+    
+    def raise_window(self, win):
+        self.stack.move_to_end(win)
+        win.z = self.next_top_z()
+        self.emit('raise', win)
+    
+    def lower_window(self, win):
+        self.stack.move_to_end(win, last=False)
+        if self.bottom_z - 1 <= 0:
+            self.renumber()
+        self.bottom_z -= 1
+        win.z = self.bottom_z
+        self.emit('lower', win)
+    
+    def next_top_z(self):
+        if self.top_z + 1 >= HIT_Z_TASKBAR:
+            self.renumber()
+        self.top_z += 1
+        return self.top_z
+    
+    def renumber(self):
+        self.top_z = self.bottom_z = HIT_Z_WINDOWS
+        for win in self.stack:
+            self.top_z += 1
+            win.z = self.top_z
+            self.emit('restack', win)
+    
+    def focus(self, win):
+        if self.focused is not win:
+            if self.focused:
+                self.focused.set_active(False)
+            if win:
+                win.set_active(True)
+            self.focused = win
+            self.emit('focus', win)
+    
+    def minimize(self, win):
+        if not win.minimized:
+            win.invalidate()
+            win.minimized = True
+            self.visible -= 1
+            self.emit('minimize', win)
+    
+    def restore(self, win):
+        if win.minimized:
+            win.minimized = False
+            self.visible += 1
+            self.emit('restore', win)
+    
+    def move(self, win, x, y):
+        win.move_to(x, y)
+        self.emit('move', win)
+    
+    def close(self, win):
+        del self.stack[win]
+        self.animated.pop(win, None)
+        if not win.minimized:
+            self.visible -= 1
+        if self.focused is win:
+            self.focused = None
+        self.emit('close', win)
+
+# ============== DRAG OUTLINE ==============
+# With CATOS_DRAG_OUTLINE=1 (or after F8) a dragged window stays put and only
+# a dashed frame follows the mouse, NT style; the window moves once, on
+# release. The screen under the frame is saved when it is drawn and put back
+# to erase it, so moving the frame repaints nothing but its own four strips.
+DRAG_OUTLINE = bool(os.environ.get('CATOS_DRAG_OUTLINE'))
+DRAG_OUTLINE_WIDTH = 3
+DRAG_OUTLINE_DASH = 4
+
+class DragOutline:
+    def __init__(self, width=DRAG_OUTLINE_WIDTH, dash=DRAG_OUTLINE_DASH):
+        self.width = width
+        self.dash = dash
+        self.rect = None  # Where the frame should be; None hides it
+        self.shown = []  # (strip, saved pixels) for the frame on screen
+        self.shown_rect = None
+        self.patterns = None  # Horizontal and vertical dash strips
+    
+    def strips(self, rect):
+        t = self.width
+        return [pygame.Rect(rect.x, rect.y, rect.w, t), pygame.Rect(rect.x, rect.bottom - t, rect.w, t),
+                pygame.Rect(rect.x, rect.y + t, t, rect.h - 2 * t), pygame.Rect(rect.right - t, rect.y + t, t, rect.h - 2 * t)]
+    
+    def make_patterns(self):
+        t, period = self.width, self.dash * 2
+        horizontal = pygame.Surface((SCREEN_WIDTH + period, t))
+        vertical = pygame.Surface((t, SCREEN_HEIGHT + period))
+        horizontal.fill(COLORS['white'])
+        vertical.fill(COLORS['white'])
+        for i in range(0, SCREEN_WIDTH + period, period):
+            horizontal.fill(COLORS['black'], (i, 0, self.dash, t))
+        for i in range(0, SCREEN_HEIGHT + period, period):
+            vertical.fill(COLORS['black'], (0, i, t, self.dash))
+        return horizontal, vertical
+    
+    def erase(self, surface, dirty):
+        # Needed when the frame moved or something under it is about to be
+        # repainted; returns the strips that changed on screen
+        if not self.shown:
+            return []
+        strips = [strip for strip, _ in self.shown]
+        if self.rect == self.shown_rect and all(strip.collidelist(dirty) == -1 for strip in strips):
+            return []
+        for strip, pixels in self.shown:
+            surface.blit(pixels, strip)
+        self.shown = []
+        self.shown_rect = None
+        return strips
+    
+    def draw(self, surface):
+        if self.rect is None or self.shown:
+            return []
+        if self.patterns is None:
+            self.patterns = self.make_patterns()
+        horizontal, vertical = self.patterns
+        period = self.dash * 2
+        bounds = surface.get_rect()
+        for i, strip in enumerate(self.strips(self.rect)):
+            strip = strip.clip(bounds)
+            if not strip.w or not strip.h:
+                continue
+            self.shown.append((strip, surface.subsurface(strip).copy()))
+            if i < 2:
+                surface.blit(horizontal, strip, (strip.x % period, 0, strip.w, strip.h))
+            else:
+                surface.blit(vertical, strip, (0, strip.y % period, strip.w, strip.h))
+        self.shown_rect = self.rect.copy()
+        return [strip for strip, _ in self.shown]
+
+# ============== ICON SPRITES ==============
+# Icons are rasterized once per (icon_type, size, selected) into an alpha tile
+# laid out like DesktopIcon (2*size wide, 1.5*size tall, glyph near the top
+# over the selection highlight) and blitted from then on. The cat is drawn
+# natively at any size; other glyphs are drawn at 32 px and scaled,
+# nearest-neighbour for whole multiples and smoothed otherwise.
+ICON_SIZES = (32,)
+_icon_sprites = {}
+
+def draw_icon_glyph(surface, icon_type, x, y, size=32):
+    if icon_type == 'cat':
+        draw_cat_icon(surface, x, y, size)
+    elif icon_type == 'folder':
+        pygame.draw.rect(surface, (255, 220, 100), (x, y + 4, 12, 6))
+        pygame.draw.rect(surface, (255, 200, 50), (x, y + 8, 32, 22))
+        draw_outline(surface, COLORS['black'], (x, y + 8, 32, 22))
+    elif icon_type == 'file':
+        pygame.draw.rect(surface, COLORS['white'], (x + 4, y, 24, 30))
+        draw_outline(surface, COLORS['black'], (x + 4, y, 24, 30))
+        pygame.draw.polygon(surface, COLORS['window_dark'], [(x + 20, y), (x + 28, y + 8), (x + 20, y + 8)])
+        for i in range(4):
+            pygame.draw.line(surface, COLORS['window_dark'], (x + 8, y + 12 + i * 5), (x + 24, y + 12 + i * 5))
+    elif icon_type == 'terminal':
+        pygame.draw.rect(surface, COLORS['black'], (x, y, 32, 30))
+        draw_outline(surface, COLORS['window_dark'], (x, y, 32, 30))
+        draw_text(surface, 'C:\\>', x + 2, y + 4, (0, 255, 0))
+    elif icon_type == 'trash':
+        pygame.draw.rect(surface, COLORS['window_dark'], (x + 4, y + 6, 24, 24))
+        draw_outline(surface, COLORS['black'], (x + 4, y + 6, 24, 24))
+        pygame.draw.rect(surface, COLORS['window_dark'], (x + 2, y + 2, 28, 6))
+        draw_outline(surface, COLORS['black'], (x + 2, y + 2, 28, 6))
+        pygame.draw.rect(surface, COLORS['window_dark'], (x + 12, y, 8, 4))
+    elif icon_type == 'calc':
+        pygame.draw.rect(surface, (200, 200, 220), (x + 2, y, 28, 32))
+        draw_outline(surface, COLORS['black'], (x + 2, y, 28, 32))
+        pygame.draw.rect(surface, (180, 200, 180), (x + 5, y + 3, 22, 10))
+        for i in range(3):
+            for j in range(3):
+                pygame.draw.rect(surface, COLORS['white'], (x + 5 + j * 8, y + 16 + i * 5, 6, 4))
+    elif icon_type == 'notepad':
+        pygame.draw.rect(surface, (255, 255, 200), (x + 2, y, 28, 32))
+        draw_outline(surface, COLORS['black'], (x + 2, y, 28, 32))
+        for i in range(6):
+            pygame.draw.line(surface, (200, 200, 200), (x + 5, y + 5 + i * 5), (x + 27, y + 5 + i * 5))
+
+def icon_sprite(icon_type, size=32, selected=False):
+    key = (icon_type, size, selected)
+    sprite = _icon_sprites.get(key)
+    if sprite is not None:
+        return sprite
+    
+    base = size if icon_type == 'cat' else 32
+    sprite = pygame.Surface((base * 2, base * 3 // 2), pygame.SRCALPHA)
+    if selected:
+        sprite.fill(COLORS['selection'])
+    draw_icon_glyph(sprite, icon_type, base // 2, base // 8, size)
+    if base != size:
+        scale = pygame.transform.scale if size % base == 0 else pygame.transform.smoothscale
+        sprite = scale(sprite, (size * 2, size * 3 // 2))
+    if pygame.display.get_surface():
+        sprite = sprite.convert_alpha()
+    _icon_sprites[key] = sprite
+    return sprite
+
+def warm_icon_sprites(icon_types, sizes=ICON_SIZES):
+    for icon_type in icon_types:
+        for size in sizes:
+            icon_sprite(icon_type, size, False)
+            icon_sprite(icon_type, size, True)
+
 # ============== DESKTOP ICON ==============
 
 class DesktopIcon:
@@ -582,45 +2176,7 @@ class DesktopIcon:
         self.last_click = 0
     
     def draw(self, surface):
-        if self.selected:
-            pygame.draw.rect(surface, COLORS['selection'], (self.x, self.y, self.width, self.height - 16))
-        
-        icon_x, icon_y = self.x + (self.width - 32) // 2, self.y + 4
-        
-        if self.icon_type == 'cat':
-            draw_cat_icon(surface, icon_x, icon_y, 32)
-        elif self.icon_type == 'folder':
-            pygame.draw.rect(surface, (255, 220, 100), (icon_x, icon_y + 4, 12, 6))
-            pygame.draw.rect(surface, (255, 200, 50), (icon_x, icon_y + 8, 32, 22))
-            pygame.draw.rect(surface, COLORS['black'], (icon_x, icon_y + 8, 32, 22), 1)
-        elif self.icon_type == 'file':
-            pygame.draw.rect(surface, COLORS['white'], (icon_x + 4, icon_y, 24, 30))
-            pygame.draw.rect(surface, COLORS['black'], (icon_x + 4, icon_y, 24, 30), 1)
-            pygame.draw.polygon(surface, COLORS['window_dark'], [(icon_x + 20, icon_y), (icon_x + 28, icon_y + 8), (icon_x + 20, icon_y + 8)])
-            for i in range(4):
-                pygame.draw.line(surface, COLORS['window_dark'], (icon_x + 8, icon_y + 12 + i * 5), (icon_x + 24, icon_y + 12 + i * 5))
-        elif self.icon_type == 'terminal':
-            pygame.draw.rect(surface, COLORS['black'], (icon_x, icon_y, 32, 30))
-            pygame.draw.rect(surface, COLORS['window_dark'], (icon_x, icon_y, 32, 30), 1)
-            draw_text(surface, 'C:\\>', icon_x + 2, icon_y + 4, (0, 255, 0))
-        elif self.icon_type == 'trash':
-            pygame.draw.rect(surface, COLORS['window_dark'], (icon_x + 4, icon_y + 6, 24, 24))
-            pygame.draw.rect(surface, COLORS['black'], (icon_x + 4, icon_y + 6, 24, 24), 1)
-            pygame.draw.rect(surface, COLORS['window_dark'], (icon_x + 2, icon_y + 2, 28, 6))
-            pygame.draw.rect(surface, COLORS['black'], (icon_x + 2, icon_y + 2, 28, 6), 1)
-            pygame.draw.rect(surface, COLORS['window_dark'], (icon_x + 12, icon_y, 8, 4))
-        elif self.icon_type == 'calc':
-            pygame.draw.rect(surface, (200, 200, 220), (icon_x + 2, icon_y, 28, 32))
-            pygame.draw.rect(surface, COLORS['black'], (icon_x + 2, icon_y, 28, 32), 1)
-            pygame.draw.rect(surface, (180, 200, 180), (icon_x + 5, icon_y + 3, 22, 10))
-            for i in range(3):
-                for j in range(3):
-                    pygame.draw.rect(surface, COLORS['white'], (icon_x + 5 + j * 8, icon_y + 16 + i * 5, 6, 4))
-        elif self.icon_type == 'notepad':
-            pygame.draw.rect(surface, (255, 255, 200), (icon_x + 2, icon_y, 28, 32))
-            pygame.draw.rect(surface, COLORS['black'], (icon_x + 2, icon_y, 28, 32), 1)
-            for i in range(6):
-                pygame.draw.line(surface, (200, 200, 200), (icon_x + 5, icon_y + 5 + i * 5), (icon_x + 27, icon_y + 5 + i * 5))
+        surface.blit(icon_sprite(self.icon_type, 32, self.selected), (self.x, self.y))
         
         text_w = get_text_width(self.name)
         text_x, text_y = self.x + (self.width - text_w) // 2, self.y + 44
@@ -631,12 +2187,65 @@ class DesktopIcon:
     def contains_point(self, px, py):
         return self.x <= px <= self.x + self.width and self.y <= py <= self.y + self.height
     
+    def get_rect(self):
+        text_w = get_text_width(self.name)
+        label = pygame.Rect(self.x + (self.width - text_w) // 2 - 2, self.y + 43, text_w + 4, 10)
+        return pygame.Rect(self.x, self.y, self.width, self.height).union(label)
+    
+    def set_selected(self, selected):
+        if self.selected != selected:
+            self.selected = selected
+            DAMAGE.add(self.get_rect())
+    
     def handle_click(self):
-        now = time.time()
+        now = CLOCK.now
         double_click = (now - self.last_click) < 0.4
         self.last_click = now
         return double_click
 
+class DesktopLayer:
+    def __init__(self, icons):
+        self.icons = icons
+        self.surface = None
+        self.drawn = {}  # icon -> (rect, state) as last rendered
+    
+    def icon_state(self, icon):
+        return (icon.x, icon.y, icon.name, icon.icon_type, icon.selected)
+    
+    def update(self):
+        if self.surface is None:
+            self.surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+            if pygame.display.get_surface():
+                self.surface = self.surface.convert()
+            self.surface.fill(COLORS['desktop'])
+            for icon in self.icons:
+                icon.draw(self.surface)
+                self.drawn[icon] = (icon.get_rect(), self.icon_state(icon))
+            DAMAGE.add()
+            return
+        
+        stale = []
+        for icon, (rect, state) in list(self.drawn.items()):
+            if icon not in self.icons or self.icon_state(icon) != state:
+                stale.append(rect)
+                del self.drawn[icon]
+        for icon in self.icons:
+            if icon not in self.drawn:
+                rect = icon.get_rect()
+                stale.append(rect)
+                self.drawn[icon] = (rect, self.icon_state(icon))
+        for rect in stale:
+            self.repaint(rect)
+            DAMAGE.add(rect)
+    
+    def repaint(self, rect):
+        self.surface.set_clip(rect)
+        self.surface.fill(COLORS['desktop'])
+        for icon in self.icons:
+            if icon.get_rect().colliderect(rect):
+                icon.draw(self.surface)
+        self.surface.set_clip(None)
+
 # ============== MAIN OS CLASS ==============
 
 class CatOS:
@@ -644,6 +2253,15 @@ class CatOS:
         self.state = 'boot'
         self.boot_start_time = None
         self.chime_played = False
+        self.chime_stream = None
+        self.boot_logo = None
+        self.boot_progress = None
+        start_chime_render()
+        if AUDIO_AVAILABLE:
+            try:
+                UI_SOUNDS.preload()
+            except Exception as error:
+                report_audio_error('UI_SOUNDS.preload', error)
         
         self.icons = [
             DesktopIcon(20, 20, 'My Cat', 'cat', 'catfacts'),
@@ -654,56 +2272,112 @@ class CatOS:
             DesktopIcon(20, 420, 'Trash', 'trash', 'default'),
             DesktopIcon(100, 20, 'Settings', 'file', 'settings'),
         ]
+        warm_icon_sprites({icon.icon_type for icon in self.icons})
+        self.desktop_layer = DesktopLayer(self.icons)
+        self.selected_icon = None
+        
+        self.hits = HitGrid()
+        for i, icon in enumerate(self.icons):
+            self.hits.set(('icon', icon), (icon.x, icon.y, icon.width + 1, icon.height + 1), HIT_Z_ICONS - i)
+        self.taskbar_buttons = []  # (rect, window) for the buttons that fit, in stack order
         
-        self.windows = []
+        self.wm = WindowManager()
+        self.wm.subscribe(self.on_window_change)
         self.show_start_menu = False
         self.start_menu_hover = -1
-        self.clock = pygame.time.Clock()
+        self.pacer = make_frame_pacer()
+        self.clock_text = None
         self.dragging_window = None
+        self.drag_outline = DRAG_OUTLINE
+        self.outline = DragOutline()
+        self.debug_dirty = DEBUG_DIRTY_RECTS
+        self.dirty_outlines = []  # (rect, expires)
+        self.profile_rect = None  # Where the profiler overlay was last drawn
+        self.show_latency = False
+        self.latency_rect = None  # Where the latency overlay was last drawn
     
     def run(self):
         running = True
-        self.boot_start_time = time.time()
+        self.boot_start_time = self.pacer.start()
         
         while running:
-            mouse_pos = pygame.mouse.get_pos()
-            
-            for event in pygame.event.get():
+            PROFILER.begin_frame()
+            with PROFILER.stage('events'):
+                events = self.pacer.get_events()
+            mouse_pos = self.pacer.mouse_pos
+            for event in events:
                 if event.type == pygame.QUIT:
                     running = False
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
-                        if self.windows:
-                            self.windows.pop()
+                        if self.wm.top():
+                            self.close_window(self.wm.top())
                         else:
                             running = False
-                    elif self.windows and self.windows[-1].active:
-                        result = self.windows[-1].handle_key(event)
+                    elif event.key == pygame.K_F8:
+                        self.drag_outline = not self.drag_outline
+                    elif event.key == pygame.K_F9:
+                        self.toggle_debug_dirty()
+                    elif event.key == pygame.K_F10:
+                        self.toggle_profiler()
+                    elif event.key == pygame.K_F11:
+                        self.toggle_latency()
+                    elif self.wm.focused and self.wm.focused is self.wm.top():
+                        win = self.wm.focused
+                        handled = time.perf_counter()
+                        result = win.handle_key(event)
                         if result == 'close':
-                            self.windows.pop()
+                            self.close_window(win)
+                        LATENCY.track(win.app_type, event, handled, result is not None)
                 elif event.type == pygame.MOUSEBUTTONDOWN:
-                    self.handle_click(mouse_pos, event.button)
+                    app = self.latency_app(mouse_pos)
+                    handled, damage = time.perf_counter(), len(DAMAGE.rects)
+                    with PROFILER.stage('handle_click'):
+                        self.handle_click(mouse_pos, event.button)
+                    LATENCY.track(app, event, handled, len(DAMAGE.rects) > damage)
                 elif event.type == pygame.MOUSEBUTTONUP:
                     if self.dragging_window:
-                        self.dragging_window.dragging = False
-                        self.dragging_window = None
+                        self.end_drag()
                 elif event.type == pygame.MOUSEMOTION:
                     if self.dragging_window and self.dragging_window.dragging:
                         dx, dy = self.dragging_window.drag_offset
-                        self.dragging_window.rect.x = mouse_pos[0] - dx
-                        self.dragging_window.rect.y = max(0, mouse_pos[1] - dy)
+                        x, y = mouse_pos[0] - dx, max(0, mouse_pos[1] - dy)
+                        if self.outline.rect:
+                            self.outline.rect.topleft = (x, y)
+                        else:
+                            self.wm.move(self.dragging_window, x, y)
+            
+            if self.chime_stream and not self.chime_stream.update():
+                self.chime_stream = None
             
             if self.show_start_menu:
                 self.update_start_menu_hover(mouse_pos)
             
             if self.state == 'boot':
-                self.draw_boot_screen()
+                with PROFILER.stage('draw_boot_screen'):
+                    self.draw_boot_screen()
+                if PROFILER.enabled:
+                    self.draw_profile_overlay()
+                with PROFILER.stage('display'):
+                    pygame.display.flip()
+                LATENCY.presented()
             else:
-                self.draw_desktop()
-            
-            pygame.display.flip()
-            self.clock.tick(60)
+                with PROFILER.stage('draw_desktop'):
+                    dirty = self.draw_desktop()
+                if PROFILER.enabled:
+                    dirty.append(self.draw_profile_overlay())
+                if self.show_latency:
+                    dirty.append(self.draw_latency_overlay())
+                if dirty:
+                    with PROFILER.stage('display'):
+                        pygame.display.update(dirty)
+                    LATENCY.presented()
+            PROFILER.end_frame()
+            self.pacer.wait(self.is_animating(), self.next_wakeup())
         
+        self.pacer.close()
+        PROFILER.close()
+        LATENCY.close()
         pygame.quit()
     
     def handle_click(self, pos, button):
@@ -713,7 +2387,7 @@ class CatOS:
         
         if 4 <= mx <= 64 and SCREEN_HEIGHT - 28 <= my <= SCREEN_HEIGHT - 4:
             play_click()
-            self.show_start_menu = not self.show_start_menu
+            self.set_start_menu(not self.show_start_menu)
             return
         
         if self.show_start_menu:
@@ -724,58 +2398,123 @@ class CatOS:
                 if 0 <= item_idx < 7:
                     play_click()
                     self.handle_start_menu_click(item_idx)
-                    self.show_start_menu = False
+                    self.set_start_menu(False)
                     return
             else:
-                self.show_start_menu = False
+                self.set_start_menu(False)
         
-        taskbar_x = 70
-        for win in self.windows:
-            if win.minimized:
-                btn_rect = pygame.Rect(taskbar_x, SCREEN_HEIGHT - 28, 100, 24)
-                if btn_rect.collidepoint(mx, my):
-                    play_click()
-                    win.minimized = False
-                    win.active = True
-                    self.windows.remove(win)
-                    self.windows.append(win)
-                    return
-                taskbar_x += 105
-        
-        for win in reversed(self.windows):
-            if not win.minimized and win.rect.collidepoint(mx, my):
-                result = win.handle_click(pos)
-                if result == 'close':
-                    self.windows.remove(win)
-                elif result == 'drag':
-                    self.dragging_window = win
-                elif result:
-                    for w in self.windows:
-                        w.active = False
-                    win.active = True
-                    self.windows.remove(win)
-                    self.windows.append(win)
-                return
-        
-        for icon in self.icons:
-            if icon.contains_point(mx, my):
-                for other in self.icons:
-                    other.selected = False
-                icon.selected = True
-                if icon.handle_click():
-                    self.open_app(icon.name, icon.app_type)
-                return
-        
-        for icon in self.icons:
-            icon.selected = False
+        kind, target = self.hits.hit(pos) or (None, None)
+        if kind == 'taskbar':
+            play_click()
+            self.wm.restore(target)
+            self.wm.focus(target)
+            self.wm.raise_window(target)
+        elif kind == 'window':
+            result = target.handle_click(pos)
+            if result == 'close':
+                self.close_window(target)
+            elif result == 'drag':
+                self.dragging_window = target
+                if self.drag_outline:
+                    self.outline.rect = target.rect.copy()
+            elif result:
+                if result == 'minimize':
+                    self.wm.minimize(target)
+                self.wm.focus(target)
+                self.wm.raise_window(target)
+        elif kind == 'icon':
+            self.select_icon(target)
+            if target.handle_click():
+                self.open_app(target.name, target.app_type)
+        else:
+            self.select_icon(None)
+    
+    def select_icon(self, icon):
+        if self.selected_icon is not icon:
+            if self.selected_icon:
+                self.selected_icon.set_selected(False)
+            if icon:
+                icon.set_selected(True)
+            self.selected_icon = icon
+    
+    def index_window(self, win):
+        if win.minimized:
+            self.hits.remove(('window', win))
+        else:
+            self.hits.set(('window', win), win.rect, win.z)
+    
+    def layout_taskbar(self):
+        # Files exactly the buttons draw_taskbar draws, minus the part the
+        # clock is drawn over
+        for _, win in self.taskbar_buttons:
+            self.hits.remove(('taskbar', win))
+        self.taskbar_buttons = []
+        clock = self.get_clock_rect()
+        for i, win in enumerate(self.wm):
+            if 70 + i * 105 >= SCREEN_WIDTH:
+                break
+            rect = pygame.Rect(70 + i * 105, SCREEN_HEIGHT - 28, 100, 24)
+            self.taskbar_buttons.append((rect, win))
+            self.hits.set(('taskbar', win), rect.clip(0, 0, clock.left, SCREEN_HEIGHT), HIT_Z_TASKBAR)
+    
+    def painted_in(self, clip):
+        # Windows showing inside clip, bottom first, and whether they cover it
+        found, covered = self.hits.stacked_in(clip, 'window')
+        return [win for _, win in reversed(found)], covered
+    
+    # Keeps the hit index, the taskbar buttons and the screen in step with the
+    # window manager: only the window that changed (and the taskbar listing
+    # it) is repainted, and the buttons are laid out again only when the
+    # stack order changes
+    def on_window_change(self, change, win):
+        if change in ('open', 'close', 'raise', 'lower'):
+            self.layout_taskbar()
+        if change == 'focus':
+            DAMAGE.add(self.get_taskbar_rect())
+            return
+        if change == 'close':
+            self.hits.remove(('window', win))
+        else:
+            self.index_window(win)
+        if change not in ('move', 'restack'):
+            win.invalidate()
+            DAMAGE.add(self.get_taskbar_rect())
+    
+    def close_window(self, win):
+        if self.dragging_window is win:
+            self.dragging_window = None
+            self.outline.rect = None
+        self.wm.close(win)
+    
+    def end_drag(self):
+        win = self.dragging_window
+        win.dragging = False
+        self.dragging_window = None
+        if self.outline.rect:
+            self.wm.move(win, *self.outline.rect.topleft)
+            self.outline.rect = None
+    
+    @property
+    def windows(self):
+        # Bottom-to-top snapshot, for tools and scripts driving CatOS
+        return list(self.wm)
+    
+    def set_start_menu(self, show):
+        if self.show_start_menu != show:
+            self.show_start_menu = show
+            DAMAGE.add(self.get_start_menu_rect())
+            DAMAGE.add(self.get_start_button_rect())
     
     def update_start_menu_hover(self, pos):
         mx, my = pos
         menu_x, menu_y = 4, SCREEN_HEIGHT - 32 - 200
         if menu_x + 30 <= mx <= menu_x + 180 and menu_y + 8 <= my <= menu_y + 190:
-            self.start_menu_hover = (my - menu_y - 8) // 26
+            hover = (my - menu_y - 8) // 26
         else:
-            self.start_menu_hover = -1
+            hover = -1
+        if hover != self.start_menu_hover:
+            self.start_menu_hover = hover
+            DAMAGE.add(self.get_start_menu_rect())
     
     def handle_start_menu_click(self, idx):
         apps = [('Terminal', 'terminal'), ('Documents', 'default'), ('Settings', 'settings'),
@@ -802,19 +2541,15 @@ class CatOS:
         elif name == 'Trash':
             content = "(Empty)\n\nNo deleted items."
         
-        offset = len([w for w in self.windows if not w.minimized]) * 25
-        for win in self.windows:
-            win.active = False
-        self.windows.append(Window(150 + offset, 50 + offset, w, h, title, content, app_type))
+        offset = self.wm.visible * 25
+        self.wm.open(Window(150 + offset, 50 + offset, w, h, title, content, app_type))
     
     def draw_boot_screen(self):
-        elapsed = time.time() - self.boot_start_time
+        elapsed = CLOCK.now - self.boot_start_time
+        self.update_boot_chime(elapsed)
         if elapsed < 0.5:
             screen.fill(COLORS['black'])
         elif elapsed < 2.0:
-            if elapsed >= 1.5 and not self.chime_played:
-                play_boot_chime()
-                self.chime_played = True
             screen.fill((0, 0, 32))
             self.draw_boot_logo()
         elif elapsed < 5.0:
@@ -823,88 +2558,231 @@ class CatOS:
             self.draw_boot_progress(elapsed - 2.0)
         else:
             self.state = 'desktop'
+            DAMAGE.add()
+    
+    def update_boot_chime(self, elapsed):
+        if self.chime_played or elapsed < CHIME_CUE_TIME:
+            return
+        if not chime_ready():
+            late = elapsed - CHIME_CUE_TIME
+            if CHIME_FALLBACK == 'stream' and NUMPY_AVAILABLE:
+                self.chime_stream = stream_boot_chime()
+            elif AUDIO_AVAILABLE and CHIME_FALLBACK != 'skip' and late < CHIME_MAX_DELAY:
+                return
+        else:
+            play_boot_chime(timeout=0)
+        self.chime_played = True
     
     def draw_boot_logo(self):
+        if self.boot_logo is None:
+            self.boot_logo = self.render_boot_logo()
+        logo, pos = self.boot_logo
+        screen.blit(logo, pos)
+    
+    def render_boot_logo(self):
+        logo = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
         cx, cy = SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 60
         size, x, y = 120, cx - 60, cy - 60
         
         for r in range(60, 0, -5):
             glow = int((60 - r) / 60 * 50)
-            pygame.draw.circle(screen, (glow, glow // 2, glow), (cx, cy + 20), r + 60)
+            pygame.draw.circle(logo, (glow, glow // 2, glow), (cx, cy + 20), r + 60)
         
         ear_h = size // 3
-        pygame.draw.polygon(screen, COLORS['cat_orange'], [(x + size//4, y + ear_h), (x + size//3, y), (x + size//2 - 4, y + ear_h)])
-        pygame.draw.polygon(screen, COLORS['cat_orange'], [(x + size//2 + 4, y + ear_h), (x + size*2//3, y), (x + size*3//4, y + ear_h)])
-        pygame.draw.polygon(screen, COLORS['cat_pink'], [(x + size//3 + 4, y + ear_h - 4), (x + size//3 + 8, y + 12), (x + size//2 - 10, y + ear_h - 4)])
-        pygame.draw.polygon(screen, COLORS['cat_pink'], [(x + size//2 + 10, y + ear_h - 4), (x + size*2//3 - 8, y + 12), (x + size*2//3 - 4, y + ear_h - 4)])
-        pygame.draw.ellipse(screen, COLORS['cat_orange'], (x + 4, y + ear_h - 10, size - 8, size - ear_h + 20))
+        pygame.draw.polygon(logo, COLORS['cat_orange'], [(x + size//4, y + ear_h), (x + size//3, y), (x + size//2 - 4, y + ear_h)])
+        pygame.draw.polygon(logo, COLORS['cat_orange'], [(x + size//2 + 4, y + ear_h), (x + size*2//3, y), (x + size*3//4, y + ear_h)])
+        pygame.draw.polygon(logo, COLORS['cat_pink'], [(x + size//3 + 4, y + ear_h - 4), (x + size//3 + 8, y + 12), (x + size//2 - 10, y + ear_h - 4)])
+        pygame.draw.polygon(logo, COLORS['cat_pink'], [(x + size//2 + 10, y + ear_h - 4), (x + size*2//3 - 8, y + 12), (x + size*2//3 - 4, y + ear_h - 4)])
+        pygame.draw.ellipse(logo, COLORS['cat_orange'], (x + 4, y + ear_h - 10, size - 8, size - ear_h + 20))
         
         eye_y = y + size // 2 + 10
-        pygame.draw.ellipse(screen, COLORS['black'], (x + size//4, eye_y - 8, 20, 24))
-        pygame.draw.ellipse(screen, COLORS['black'], (x + size*3//4 - 20, eye_y - 8, 20, 24))
-        pygame.draw.circle(screen, COLORS['white'], (x + size//4 + 6, eye_y - 2), 5)
-        pygame.draw.circle(screen, COLORS['white'], (x + size*3//4 - 14, eye_y - 2), 5)
-        pygame.draw.polygon(screen, COLORS['cat_pink'], [(cx, eye_y + 18), (cx - 10, eye_y + 28), (cx + 10, eye_y + 28)])
-        pygame.draw.arc(screen, COLORS['black'], (cx - 20, eye_y + 24, 20, 14), 3.14, 0, 2)
-        pygame.draw.arc(screen, COLORS['black'], (cx, eye_y + 24, 20, 14), 3.14, 0, 2)
+        pygame.draw.ellipse(logo, COLORS['black'], (x + size//4, eye_y - 8, 20, 24))
+        pygame.draw.ellipse(logo, COLORS['black'], (x + size*3//4 - 20, eye_y - 8, 20, 24))
+        pygame.draw.circle(logo, COLORS['white'], (x + size//4 + 6, eye_y - 2), 5)
+        pygame.draw.circle(logo, COLORS['white'], (x + size*3//4 - 14, eye_y - 2), 5)
+        pygame.draw.polygon(logo, COLORS['cat_pink'], [(cx, eye_y + 18), (cx - 10, eye_y + 28), (cx + 10, eye_y + 28)])
+        pygame.draw.arc(logo, COLORS['black'], (cx - 20, eye_y + 24, 20, 14), 3.14, 0, 2)
+        pygame.draw.arc(logo, COLORS['black'], (cx, eye_y + 24, 20, 14), 3.14, 0, 2)
         
         for i in range(3):
             offset = (i - 1) * 8
-            pygame.draw.line(screen, (180, 180, 180), (x + 10, eye_y + 30 + offset), (x - 30, eye_y + 25 + offset * 2), 1)
-            pygame.draw.line(screen, (180, 180, 180), (x + size - 10, eye_y + 30 + offset), (x + size + 30, eye_y + 25 + offset * 2), 1)
+            pygame.draw.line(logo, (180, 180, 180), (x + 10, eye_y + 30 + offset), (x - 30, eye_y + 25 + offset * 2), 1)
+            pygame.draw.line(logo, (180, 180, 180), (x + size - 10, eye_y + 30 + offset), (x + size + 30, eye_y + 25 + offset * 2), 1)
         
         title = "CAT OS 1.X"
-        draw_text(screen, title, cx - get_text_width(title, 3) // 2, cy + 100, COLORS['white'], 3)
+        draw_text(logo, title, cx - get_text_width(title, 3) // 2, cy + 100, COLORS['white'], 3)
         subtitle = "BY TEAM FLAMES / SAMSOFT"
-        draw_text(screen, subtitle, cx - get_text_width(subtitle) // 2, cy + 140, COLORS['window_dark'])
+        draw_text(logo, subtitle, cx - get_text_width(subtitle) // 2, cy + 140, COLORS['window_dark'])
+        
+        bounds = logo.get_bounding_rect()
+        logo = logo.subsurface(bounds).copy()
+        if pygame.display.get_surface():
+            logo = logo.convert_alpha()
+        return logo, bounds.topleft
     
     def draw_boot_progress(self, elapsed):
         cx, cy = SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 180
-        bar_width, bar_height = 300, 20
-        bar_x = cx - bar_width // 2
-        
-        pygame.draw.rect(screen, COLORS['window_shadow'], (bar_x - 2, cy - 2, bar_width + 4, bar_height + 4))
-        pygame.draw.rect(screen, COLORS['black'], (bar_x, cy, bar_width, bar_height))
-        
+        if self.boot_progress is None:
+            self.boot_progress = ProgressBar((cx - 150, cy, 300, 20))
         progress = min(1.0, elapsed / 3.0)
-        for i in range(int(bar_width * progress)):
-            t = i / bar_width
-            pygame.draw.line(screen, (int(100 + 155 * t), int(150 + 105 * t), int(200 - 100 * t)), (bar_x + i, cy + 2), (bar_x + i, cy + bar_height - 2))
+        self.boot_progress.set_progress(progress)
+        self.boot_progress.draw(screen)
         
         messages = ["Starting Cat OS...", "Loading drivers...", "Initializing meow...", "Calibrating purr...", "Welcome!"]
         msg = messages[min(int(progress * len(messages)), len(messages) - 1)]
         draw_text(screen, msg, cx - get_text_width(msg) // 2, cy + 30, COLORS['window_dark'])
     
     def draw_desktop(self):
-        screen.fill(COLORS['desktop'])
-        for icon in self.icons:
-            icon.draw(screen)
-        for win in self.windows:
+        self.update_clock()
+        self.desktop_layer.update()
+        for win in self.wm.animated:
+            win.update()
+        dirty = DAMAGE.take()
+        if self.debug_dirty:
+            dirty += self.expire_dirty_outlines()
+        erased = self.outline.erase(screen, dirty)
+        
+        for rect in dirty:
+            screen.set_clip(rect)
+            self.paint_desktop(rect)
+        screen.set_clip(None)
+        dirty += erased + self.outline.draw(screen)
+        
+        if self.debug_dirty and dirty:
+            self.outline_dirty(dirty)
+        return dirty
+    
+    def paint_desktop(self, clip):
+        windows, covered = self.painted_in(clip)
+        if not covered:
+            screen.blit(self.desktop_layer.surface, clip, clip)
+        for win in windows:
             win.draw(screen)
-        self.draw_taskbar()
-        if self.show_start_menu:
-            self.draw_start_menu()
+        if self.get_taskbar_rect().colliderect(clip):
+            with PROFILER.stage('draw_taskbar'):
+                self.draw_taskbar()
+        if self.show_start_menu and self.get_start_menu_rect().colliderect(clip):
+            with PROFILER.stage('draw_start_menu'):
+                self.draw_start_menu()
+    
+    def is_animating(self):
+        return (self.state == 'boot' or self.chime_stream is not None or self.dragging_window is not None
+                or bool(DAMAGE.rects))
+    
+    def next_wakeup(self):
+        now = CLOCK.now
+        wake = [now - now % 60 + 60]
+        wake.extend(expires for _, expires in self.dirty_outlines)
+        for win in self.wm.animated:
+            due = win.next_update()
+            if due is not None:
+                wake.append(due)
+        return min(wake)
+    
+    def update_clock(self):
+        time_str = datetime.fromtimestamp(CLOCK.now).strftime('%H:%M')
+        if time_str != self.clock_text:
+            self.clock_text = time_str
+            DAMAGE.add(self.get_clock_rect())
+    
+    def toggle_debug_dirty(self):
+        self.debug_dirty = not self.debug_dirty
+        self.dirty_outlines = []
+        DAMAGE.add()
+    
+    def expire_dirty_outlines(self):
+        now = CLOCK.now
+        expired = [rect for rect, expires in self.dirty_outlines if expires <= now]
+        self.dirty_outlines = [(rect, expires) for rect, expires in self.dirty_outlines if expires > now]
+        return expired
+    
+    def outline_dirty(self, dirty):
+        expires = CLOCK.now + DEBUG_DIRTY_HOLD
+        self.dirty_outlines.extend((rect, expires) for rect in dirty)
+        for rect, _ in self.dirty_outlines:
+            draw_outline(screen, DEBUG_DIRTY_COLOR, rect)
+    
+    def toggle_profiler(self):
+        PROFILER.set_enabled(not PROFILER.enabled)
+        if self.profile_rect:
+            DAMAGE.add(self.profile_rect)
+            self.profile_rect = None
+    
+    def draw_profile_overlay(self):
+        lines = [f"{'STAGE (MS)':16} {'P50':>6} {'P95':>6} {'P99':>6}"]
+        for name, p50, p95, p99 in PROFILER.get_summary():
+            lines.append(f"{name[:16]:16} {p50:6.2f} {p95:6.2f} {p99:6.2f}")
+        w = get_text_width(lines[0]) + 8
+        rect = pygame.Rect(SCREEN_WIDTH - w - 8, 8, w, len(lines) * 10 + 6)
+        if self.profile_rect and self.profile_rect != rect:
+            DAMAGE.add(self.profile_rect)
+        self.profile_rect = rect
+        pygame.draw.rect(screen, COLORS['black'], rect)
+        for i, line in enumerate(lines):
+            draw_text(screen, line, rect.x + 4, rect.y + 4 + i * 10, COLORS['white'])
+        return rect
+    
+    def latency_app(self, pos):
+        # What a click at pos lands on, as its latency histograms are keyed
+        if self.get_start_button_rect().collidepoint(pos) or (
+                self.show_start_menu and self.get_start_menu_rect().collidepoint(pos)):
+            return 'start_menu'
+        kind, target = self.hits.hit(pos) or ('desktop', None)
+        if kind == 'window':
+            return target.app_type
+        return 'desktop' if kind == 'icon' else kind
+    
+    def toggle_latency(self):
+        self.show_latency = not self.show_latency
+        if self.latency_rect:
+            DAMAGE.add(self.latency_rect)
+            self.latency_rect = None
+    
+    def draw_latency_overlay(self):
+        lines = ["PUMP-TO-FLIP LATENCY (MS)",
+                 f"{'APP':12} {'N':>5} {'P50':>6} {'P95':>6} {'H95':>6} {'D95':>6}"]
+        for app, count, p50, p95, handle, draw in LATENCY.get_summary():
+            lines.append(f"{app[:12]:12} {count:5d} {p50:6.1f} {p95:6.1f} {handle:6.1f} {draw:6.1f}")
+        w, h = get_text_width(lines[1]) + 8, len(lines) * 10 + 6
+        rect = pygame.Rect(SCREEN_WIDTH - w - 8, SCREEN_HEIGHT - 32 - h - 8, w, h)
+        if self.latency_rect and self.latency_rect != rect:
+            DAMAGE.add(self.latency_rect)
+        self.latency_rect = rect
+        pygame.draw.rect(screen, COLORS['black'], rect)
+        for i, line in enumerate(lines):
+            draw_text(screen, line, rect.x + 4, rect.y + 4 + i * 10, COLORS['white'])
+        return rect
+    
+    def get_taskbar_rect(self):
+        return pygame.Rect(0, SCREEN_HEIGHT - 32, SCREEN_WIDTH, 32)
+    
+    def get_start_button_rect(self):
+        return pygame.Rect(4, SCREEN_HEIGHT - 28, 60, 24)
+    
+    def get_clock_rect(self):
+        return pygame.Rect(SCREEN_WIDTH - 70, SCREEN_HEIGHT - 28, 66, 24)
+    
+    def get_start_menu_rect(self):
+        return pygame.Rect(4, SCREEN_HEIGHT - 32 - 200, 180, 200)
     
     def draw_taskbar(self):
-        draw_3d_rect(screen, (0, SCREEN_HEIGHT - 32, SCREEN_WIDTH, 32), True)
+        draw_3d_rect(screen, self.get_taskbar_rect(), True)
         
-        draw_3d_rect(screen, (4, SCREEN_HEIGHT - 28, 60, 24), not self.show_start_menu)
+        draw_3d_rect(screen, self.get_start_button_rect(), not self.show_start_menu)
         draw_cat_icon_mini(screen, 8, SCREEN_HEIGHT - 26)
         offset = 1 if self.show_start_menu else 0
         draw_text(screen, 'START', 22 + offset, SCREEN_HEIGHT - 22 + offset, COLORS['black'])
         
-        btn_x = 70
-        for win in self.windows:
+        for rect, win in self.taskbar_buttons:
             btn_pressed = win.active and not win.minimized
-            draw_3d_rect(screen, (btn_x, SCREEN_HEIGHT - 28, 100, 24), not btn_pressed)
-            draw_text(screen, win.title[:10], btn_x + 4, SCREEN_HEIGHT - 22, COLORS['black'])
-            btn_x += 105
+            draw_3d_rect(screen, rect, not btn_pressed)
+            draw_text(screen, win.title[:10], rect.x + 4, rect.y + 6, COLORS['black'])
         
-        draw_3d_rect(screen, (SCREEN_WIDTH - 70, SCREEN_HEIGHT - 28, 66, 24), False)
-        draw_text(screen, datetime.now().strftime('%H:%M'), SCREEN_WIDTH - 58, SCREEN_HEIGHT - 22, COLORS['black'])
+        draw_3d_rect(screen, self.get_clock_rect(), False)
+        draw_text(screen, self.clock_text, SCREEN_WIDTH - 58, SCREEN_HEIGHT - 22, COLORS['black'])
     
     def draw_start_menu(self):
-        menu_x, menu_y, menu_w, menu_h = 4, SCREEN_HEIGHT - 32 - 200, 180, 200
+        menu_x, menu_y, menu_w, menu_h = self.get_start_menu_rect()
         pygame.draw.rect(screen, COLORS['window_bg'], (menu_x, menu_y, menu_w, menu_h))
         draw_3d_rect(screen, (menu_x, menu_y, menu_w, menu_h), True)
         pygame.draw.rect(screen, COLORS['title_active'], (menu_x + 3, menu_y + 3, 24, menu_h - 6))
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Cat OS 1.X - Headless smoke run
+By Team Flames / Samsoft
+
+Launches each Cat OS script exactly as a user would (`python nt.py`), with
+dummy SDL video and audio drivers, an empty sound cache and a scripted input
+log replayed in real time: boot with the chime, then a little desktop use.
+A script that crashes, prints a traceback or doesn't exit on its own fails
+the run:
+
+    python smoke_run.py
+    python smoke_run.py --targets ntv0.a.py
+"""
+
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_common import HERE, load_cat_os
+
+TARGETS = ('nt.py', 'ntv0.a.py')
+FPS = 30
+BOOT_SECONDS = 7.0  # Past the chime cue and the end of the boot screen
+DESKTOP_SECONDS = 2.0
+
+def write_log(module, path):
+    """Write an input log for module's replay: boot, then open and close the Start menu"""
+    pygame = module.pygame
+    start_button = (30, module.SCREEN_HEIGHT - 16)
+    clicks = {
+        int(BOOT_SECONDS * FPS) + 5: start_button,
+        int(BOOT_SECONDS * FPS) + 20: start_button,
+        int(BOOT_SECONDS * FPS) + 35: (400, 300),
+    }
+    recorder = module.InputRecorder(path)
+    start = time.time()
+    recorder.write_start(start)
+    for frame in range(int((BOOT_SECONDS + DESKTOP_SECONDS) * FPS)):
+        pos = clicks.get(frame, (400, 300))
+        events = []
+        if frame in clicks:
+            events = [pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=pos, button=1),
+                      pygame.event.Event(pygame.MOUSEBUTTONUP, pos=pos, button=1)]
+        recorder.write_frame(start + frame / FPS, pos, events)
+    recorder.close()
+
+def smoke(target, timeout):
+    """Run one script headlessly; return None if it passed, else why it failed"""
+    module = load_cat_os(target)
+    with tempfile.TemporaryDirectory(prefix='catos-smoke-') as tmp:
+        log = os.path.join(tmp, 'input.bin')
+        write_log(module, log)
+        env = dict(os.environ, CATOS_REPLAY=log, CATOS_REPLAY_REALTIME='1',
+                   CATOS_SOUND_CACHE=os.path.join(tmp, 'sounds'))
+        try:
+            proc = subprocess.run([sys.executable, os.path.join(HERE, target)], cwd=tmp, env=env,
+                                  capture_output=True, text=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return f"still running after {timeout:.0f} s"
+    if proc.returncode != 0:
+        return f"exit status {proc.returncode}\n{proc.stderr.strip()}"
+    if 'Traceback' in proc.stderr:
+        return f"traceback on stderr\n{proc.stderr.strip()}"
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description='Boot every Cat OS script headlessly')
+    parser.add_argument('--targets', nargs='+', default=TARGETS, help='Cat OS scripts to run')
+    parser.add_argument('--timeout', type=float, default=60.0, help='seconds before a run counts as hung')
+    args = parser.parse_args()
+
+    failures = 0
+    for target in args.targets:
+        error = smoke(target, args.timeout)
+        print(f"{target:12} {'FAIL' if error else 'ok'}")
+        if error:
+            failures += 1
+            print('    ' + error.replace('\n', '\n    '))
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()